@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+"""
+Compare garbage collector strategies (see :py:mod:`gluetool.gctuning`).
+
+Two measurements are taken for each strategy:
+
+* startup - ``gluetool --list-modules`` is run repeatedly, with the strategy set by ``GLUETOOL_GC_STRATEGY``,
+  reporting the best wall-clock time and the peak RSS of the process;
+* fork - a startup-like amount of long-lived objects is created, then the process forks, and the child runs
+  a full collection, reporting how much memory, shared with the parent, the collection dirtied (Linux only).
+
+Usage::
+
+    python benchmarks/gc_strategies.py [--module-path DIR] [--repeat N] [--objects N]
+"""
+
+from __future__ import print_function
+
+import argparse
+import gc
+import os
+import subprocess
+import sys
+import time
+
+import tabulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# pylint: disable=wrong-import-position
+from gluetool.gctuning import GC_STRATEGIES, GCTuner  # noqa
+
+
+def measure_startup(strategy, module_path, repeat):
+    """
+    Run ``gluetool --list-modules`` several times, return the best wall-clock time and the peak RSS in kB.
+    """
+
+    env = os.environ.copy()
+    env['GLUETOOL_GC_STRATEGY'] = strategy
+
+    cmd = [sys.executable, '-c', 'import gluetool.tool; gluetool.tool.main()', '--list-modules']
+
+    if module_path:
+        cmd += ['--module-path', module_path]
+
+    best_time, peak_rss = None, 0
+
+    with open(os.devnull, 'w') as devnull:
+        for _ in range(repeat):
+            start = time.time()
+
+            process = subprocess.Popen(cmd, env=env, stdout=devnull, stderr=devnull)
+            _, _, usage = os.wait4(process.pid, 0)
+
+            # Popen must not try to reap the process again.
+            process.returncode = 0
+
+            elapsed = time.time() - start
+
+            best_time = elapsed if best_time is None else min(best_time, elapsed)
+            peak_rss = max(peak_rss, usage.ru_maxrss)
+
+    return best_time, peak_rss
+
+
+def _private_dirty():
+    """
+    Return size of private dirty memory of the current process, in kB, or ``None`` when not available.
+    """
+
+    try:
+        with open('/proc/self/smaps_rollup', 'r') as f:
+            for line in f:
+                if line.startswith('Private_Dirty:'):
+                    return int(line.split()[1])
+
+    except (IOError, OSError):
+        pass
+
+    return None
+
+
+def measure_fork(strategy, objects):
+    """
+    Simulate a startup and a fork, return how much memory did a full collection in the child dirty, in kB.
+    """
+
+    read_fd, write_fd = os.pipe()
+
+    pid = os.fork()
+
+    if pid == 0:
+        # "Startup" in a fresh child, so strategies do not affect each other.
+        os.close(read_fd)
+
+        tuner = GCTuner(strategy)
+        tuner.begin_startup()
+
+        startup_objects = [{'index': index, 'payload': [index]} for index in range(objects)]  # noqa
+
+        tuner.end_startup()
+
+        worker = os.fork()
+
+        if worker == 0:
+            before = _private_dirty()
+            gc.collect()
+            after = _private_dirty()
+
+            result = str(after - before) if before is not None and after is not None else ''
+
+            os.write(write_fd, result.encode('ascii'))
+            os._exit(0)  # pylint: disable=protected-access
+
+        os.waitpid(worker, 0)
+        os._exit(0)  # pylint: disable=protected-access
+
+    os.close(write_fd)
+    os.waitpid(pid, 0)
+
+    with os.fdopen(read_fd, 'r') as f:
+        result = f.read()
+
+    return int(result) if result else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare garbage collector strategies.')
+    parser.add_argument('--module-path', help='Directory with gluetool modules.')
+    parser.add_argument('--repeat', type=int, default=5, help='How many times to run each startup.')
+    parser.add_argument('--objects', type=int, default=500000, help='How many long-lived objects to create.')
+
+    options = parser.parse_args()
+
+    table = []
+
+    for strategy in GC_STRATEGIES:
+        startup_time, startup_rss = measure_startup(strategy, options.module_path, options.repeat)
+
+        table.append([
+            strategy,
+            '{:.3f}'.format(startup_time),
+            startup_rss,
+            measure_fork(strategy, options.objects)
+        ])
+
+    print(tabulate.tabulate(table, headers=['Strategy', 'Startup (s)', 'Startup peak RSS (kB)',
+                                            'Dirtied by GC after fork (kB)'], tablefmt='psql', missingval='-'))
+
+
+if __name__ == '__main__':
+    main()
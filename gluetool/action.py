@@ -199,6 +199,10 @@ class Action(object):
     #     ^ current action
     _thread_actions = threading.local()
 
+    # Lists of unfinished actions of all threads, by thread ID, for inspecting threads from other threads.
+    _all_action_stacks = {}  # type: Dict[Optional[int], List[Action]]
+    _all_action_stacks_lock = threading.Lock()
+
     @staticmethod
     def _action_stack():
         # type: () -> List[Action]
@@ -209,6 +213,19 @@ class Action(object):
         if not hasattr(Action._thread_actions, 'stack'):
             Action._thread_actions.stack = []
 
+            live_threads = [thread.ident for thread in threading.enumerate()]
+
+            with Action._all_action_stacks_lock:
+                # Forget stacks of threads that no longer exist. Use a copy, other threads may be reading
+                # the mapping.
+                all_stacks = {
+                    ident: stack for ident, stack in iteritems(Action._all_action_stacks) if ident in live_threads
+                }
+
+                all_stacks[threading.current_thread().ident] = Action._thread_actions.stack
+
+                Action._all_action_stacks = all_stacks
+
         return cast(
             List[Action],
             Action._thread_actions.stack
@@ -240,6 +257,18 @@ class Action(object):
 
             raise GlueError('Cannot remove action {}, it is not active'.format(action))
 
+    @staticmethod
+    def thread_action_stacks():
+        # type: () -> Dict[Optional[int], List[Action]]
+        """
+        Return lists of unfinished actions of all threads, by thread ID. Unlike :py:meth:`current_action`, usable
+        for inspecting other threads, e.g. when sampling their stacks.
+        """
+
+        return {
+            ident: stack[:] for ident, stack in iteritems(Action._all_action_stacks)
+        }
+
     @staticmethod
     def current_action():
         # type: () -> Action
@@ -0,0 +1,601 @@
+"""
+Content-addressed store of artifacts - files modules pass to each other, e.g. images, logs or packages.
+
+Artifacts are stored in a local directory, under names derived from hashes of their content, therefore
+each artifact is stored just once, no matter how many times and by how many pipelines it's been added.
+Adding artifacts to the store, and getting their copies out of it, is done by reflinking files, falling back
+to plain copy when reflinks are not supported, therefore files added to the store, as well as their copies, can be
+modified by their owners without affecting the stored artifacts. Callers not interested in the added files anymore
+can move them into the store instead. Paths of artifacts inside the store must never be modified.
+
+Artifacts can be given additional names - e.g. URLs they were downloaded from - which allows modules to
+check whether the artifact is already present in the store before they download it again.
+
+Each artifact added or requested by a pipeline is referenced by that pipeline until the pipeline finishes.
+The store is bounded in size, and when the limit is exceeded, the least recently used artifacts not
+referenced by any running pipeline are removed. Sizes of artifacts and times of their last use are kept
+in an index, a SQLite database in the store directory, since files in the store may share their metadata
+with the files they were added from. Referenced artifacts are protected from removal by other ``gluetool``
+processes by holding a shared lock of a lock file of the artifact.
+
+Modules access the store via ``artifact_store`` shared function, provided by :py:class:`gluetool.glue.Glue`:
+
+.. code-block:: python
+
+   store = self.shared('artifact_store')
+
+   if not store.has(url):
+       download(url, '/tmp/image.qcow2')
+       store.put('/tmp/image.qcow2', name=url, move=True)
+
+   image_path = store.get(url)
+"""
+
+import collections
+import errno
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+
+from .db import Database
+from .log import Logging, LoggerMixin
+
+try:
+    import fcntl
+
+except ImportError:
+    fcntl = None  # type: ignore  # pylint: disable=invalid-name
+
+# Type annotations
+# pylint: disable=unused-import, wrong-import-order
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, List, Optional, Tuple  # noqa
+
+if TYPE_CHECKING:
+    from .log import ContextAdapter  # noqa
+
+
+#: Default directory of the artifact store.
+DEFAULT_ARTIFACT_STORE = os.path.join(
+    os.getenv('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+    'gluetool',
+    'artifacts'
+)
+
+#: Default size limit of the artifact store, in bytes.
+DEFAULT_ARTIFACT_STORE_SIZE = 10 * 1024 * 1024 * 1024
+
+#: Artifact digests are SHA256 hex digests.
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+#: Size of blocks used when hashing files.
+HASH_BLOCK_SIZE = 1024 * 1024
+
+#: ``ioctl`` request cloning a file on filesystems supporting reflinks (``FICLONE`` from ``linux/fs.h``).
+FICLONE = 0x40049409
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS objects_last_used ON objects (last_used);
+
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    size INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO totals (id, size) VALUES (0, 0);
+"""
+
+
+def _hash_file(filepath):
+    # type: (str) -> str
+
+    digest = hashlib.sha256()
+
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def _tmp_path(dirpath):
+    # type: (str) -> str
+
+    return os.path.join(dirpath, '.tmp-{}'.format(uuid.uuid4().hex))
+
+
+def _reflink(src, dst):
+    # type: (str, str) -> None
+
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, 'reflinks are not supported')
+
+    with open(src, 'rb') as src_file, open(dst, 'wb') as dst_file:
+        try:
+            fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+
+        except (IOError, OSError):
+            dst_file.close()
+            os.unlink(dst)
+            raise
+
+
+def clone_file(src, dst):
+    # type: (str, str) -> str
+    """
+    Copy a file, using the cheapest method available: reflink or, as the last resort, a plain copy. Unlike
+    a hardlink, both methods give the destination its own content, changes of one file do not affect the other.
+
+    :param str src: source file.
+    :param str dst: destination path. It must not exist.
+    :returns: name of the method used, ``reflink`` or ``copy``.
+    """
+
+    try:
+        _reflink(src, dst)
+        return 'reflink'
+
+    except (IOError, OSError):
+        pass
+
+    shutil.copyfile(src, dst)
+    return 'copy'
+
+
+class ArtifactIndex(Database):
+    """
+    Index of stored artifacts, tracking their sizes, times of their last use, and the total size of the store.
+
+    :param str path: path to the database file.
+    :param ContextAdapter logger: logger used for logging.
+    """
+
+    def __init__(self, path, logger=None):
+        # type: (str, Optional[ContextAdapter]) -> None
+
+        super(ArtifactIndex, self).__init__(path, INDEX_SCHEMA, logger=logger)
+
+    def used(self, digest, size, when=None):
+        # type: (str, int, Optional[float]) -> None
+        """
+        Record use of an artifact, adding it to the index when it's not there yet.
+
+        :param str digest: digest of the artifact.
+        :param int size: size of the artifact, in bytes.
+        :param float when: time of use. Current time is used by default.
+        """
+
+        when = when if when is not None else time.time()
+
+        with self._transaction() as connection:
+            if connection.execute('UPDATE objects SET last_used = ? WHERE digest = ?', (when, digest)).rowcount:
+                return
+
+            connection.execute('INSERT INTO objects (digest, size, last_used) VALUES (?, ?, ?)', (digest, size, when))
+            connection.execute('UPDATE totals SET size = size + ?', (size,))
+
+    def removed(self, digest):
+        # type: (str) -> None
+        """
+        Remove an artifact from the index.
+
+        :param str digest: digest of the artifact.
+        """
+
+        with self._transaction() as connection:
+            row = connection.execute('SELECT size FROM objects WHERE digest = ?', (digest,)).fetchone()
+
+            if row is None:
+                return
+
+            connection.execute('DELETE FROM objects WHERE digest = ?', (digest,))
+            connection.execute('UPDATE totals SET size = size - ?', (row[0],))
+
+    @property
+    def size(self):
+        # type: () -> int
+        """
+        Total size of indexed artifacts, in bytes.
+        """
+
+        return int(self._connection().execute('SELECT size FROM totals').fetchone()[0])
+
+    def least_recently_used(self):
+        # type: () -> List[Tuple[str, int]]
+        """
+        Return digests and sizes of indexed artifacts, the least recently used first.
+        """
+
+        return [
+            (row[0], row[1])
+            for row in self._connection().execute('SELECT digest, size FROM objects ORDER BY last_used')
+        ]
+
+
+class ArtifactStore(LoggerMixin, object):
+    """
+    Content-addressed store of artifacts.
+
+    :param str path: directory of the store.
+    :param int max_size: maximal size of the store, in bytes. When exceeded, least recently used artifacts
+        are removed, unless referenced by a running pipeline.
+    :param callable owner: when called, returns an object to which references to artifacts would be tied, e.g.
+        the current pipeline. See :py:meth:`release`.
+    :param ContextAdapter logger: logger used for logging.
+    """
+
+    def __init__(self, path, max_size=DEFAULT_ARTIFACT_STORE_SIZE, owner=None, logger=None):
+        # type: (str, int, Optional[Callable[[], Hashable]], Optional[ContextAdapter]) -> None
+
+        super(ArtifactStore, self).__init__(logger or Logging.get_logger())
+
+        self.path = path
+        self.max_size = max_size
+
+        self._owner = owner or (lambda: None)
+
+        self._objects_dir = os.path.join(path, 'objects')
+        self._names_dir = os.path.join(path, 'names')
+        self._locks_dir = os.path.join(path, 'locks')
+
+        for dirpath in (self._objects_dir, self._names_dir, self._locks_dir):
+            if not os.path.exists(dirpath):
+                os.makedirs(dirpath)
+
+        index_path = os.path.join(path, 'index.db')
+        index_exists = os.path.exists(index_path)
+
+        self._index = ArtifactIndex(index_path, logger=self.logger)
+
+        if not index_exists:
+            self._index_objects()
+
+        self._lock = threading.Lock()
+
+        # Number of references of each artifact, references held by their owners, and descriptors of lock files
+        # of referenced artifacts.
+        self._refcounts = collections.Counter()  # type: Dict[str, int]
+        self._owner_refs = collections.defaultdict(list)  # type: Dict[Hashable, List[str]]
+        self._pins = {}  # type: Dict[str, Optional[int]]
+
+    def _index_objects(self):
+        # type: () -> None
+        """
+        Add artifacts stored before the index existed to the index.
+        """
+
+        for root, _, files in os.walk(self._objects_dir):
+            for filename in files:
+                if filename.startswith('.tmp-'):
+                    continue
+
+                try:
+                    stat = os.stat(os.path.join(root, filename))
+
+                except OSError:
+                    continue
+
+                self._index.used(filename, stat.st_size, when=stat.st_mtime)
+
+    def _object_path(self, digest):
+        # type: (str) -> str
+
+        return os.path.join(self._objects_dir, digest[:2], digest)
+
+    def _name_path(self, name):
+        # type: (str) -> str
+
+        return os.path.join(self._names_dir, hashlib.sha256(name.encode('utf-8')).hexdigest())
+
+    def _resolve(self, key):
+        # type: (str) -> Optional[str]
+        """
+        Find digest of an artifact given its digest or one of its names.
+        """
+
+        if DIGEST_PATTERN.match(key) and os.path.exists(self._object_path(key)):
+            return key
+
+        name_path = self._name_path(key)
+
+        if not os.path.exists(name_path):
+            return None
+
+        with open(name_path, 'r') as f:
+            digest = f.read().strip()
+
+        return digest if os.path.exists(self._object_path(digest)) else None
+
+    def _lock_path(self, digest):
+        # type: (str) -> str
+
+        return os.path.join(self._locks_dir, digest)
+
+    def _pin(self, digest):
+        # type: (str) -> Optional[int]
+        """
+        Take a shared lock of artifact's lock file, preventing other processes from removing the artifact.
+
+        :returns: descriptor of the locked file, or ``None`` when file locks are not supported.
+        """
+
+        if fcntl is None:
+            return None
+
+        lock_path = self._lock_path(digest)
+
+        while True:
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+
+            fcntl.flock(fd, fcntl.LOCK_SH)
+
+            # The lock file may have been removed together with the artifact while we were waiting for the lock.
+            try:
+                if os.fstat(fd).st_ino == os.stat(lock_path).st_ino:
+                    return fd
+
+            except OSError:
+                pass
+
+            os.close(fd)
+
+    def _acquire(self, digest):
+        # type: (str) -> Hashable
+
+        owner = self._owner()
+
+        with self._lock:
+            self._refcounts[digest] += 1
+            self._owner_refs[owner].append(digest)
+
+            if self._refcounts[digest] == 1:
+                self._pins[digest] = self._pin(digest)
+
+        return owner
+
+    def _drop(self, digest):
+        # type: (str) -> None
+
+        # Caller holds `self._lock`.
+
+        self._refcounts[digest] -= 1
+
+        if self._refcounts[digest] > 0:
+            return
+
+        del self._refcounts[digest]
+
+        fd = self._pins.pop(digest, None)
+
+        if fd is not None:
+            os.close(fd)
+
+    def has(self, key):
+        # type: (str) -> bool
+        """
+        Check whether an artifact exists in the store.
+
+        :param str key: digest or a name of the artifact.
+        :rtype: bool
+        """
+
+        return self._resolve(key) is not None
+
+    def put(self, filepath, name=None, move=False):
+        # type: (str, Optional[str], bool) -> str
+        """
+        Add a file to the store.
+
+        :param str filepath: file to add.
+        :param str name: if set, the artifact can be referred to by this name as well, e.g. by URL it's been
+            downloaded from.
+        :param bool move: if set, the file is moved into the store, and the store becomes its owner - the file
+            no longer exists at ``filepath``. Otherwise, the file is copied, and the caller remains free to modify
+            or remove it.
+        :returns: digest of the artifact.
+        """
+
+        # Copy (or move) the file into the store first, and hash what's been stored - concurrent readers should
+        # never see a partially written artifact, and changes of the original file must not affect the artifact.
+        tmp_path = _tmp_path(self._objects_dir)
+
+        try:
+            method = self._take_file(filepath, tmp_path, move)
+
+            digest = _hash_file(tmp_path)
+            object_path = self._object_path(digest)
+
+            # Reference the artifact first, to keep it around when it's already stored.
+            self._acquire(digest)
+
+            if os.path.exists(object_path):
+                self.debug("artifact '{}' already stored".format(digest))
+
+            else:
+                object_dir = os.path.dirname(object_path)
+
+                if not os.path.exists(object_dir):
+                    os.makedirs(object_dir)
+
+                os.rename(tmp_path, object_path)
+
+                self.debug("stored artifact '{}' from '{}' ({})".format(digest, filepath, method))
+
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+        if name is not None:
+            name_path = self._name_path(name)
+            tmp_path = _tmp_path(self._names_dir)
+
+            with open(tmp_path, 'w') as f:
+                f.write(digest)
+
+            os.rename(tmp_path, name_path)
+
+        self._index.used(digest, os.stat(object_path).st_size)
+
+        self._evict()
+
+        return digest
+
+    @staticmethod
+    def _take_file(filepath, tmp_path, move):
+        # type: (str, str, bool) -> str
+
+        if move:
+            try:
+                os.rename(filepath, tmp_path)
+                return 'move'
+
+            # Different filesystems - copy the file, and remove the original.
+            except OSError as exc:
+                if exc.errno != errno.EXDEV:
+                    raise
+
+            method = clone_file(filepath, tmp_path)
+            os.unlink(filepath)
+
+            return method
+
+        return clone_file(filepath, tmp_path)
+
+    def get(self, key, destination=None):
+        # type: (str, Optional[str]) -> Optional[str]
+        """
+        Get an artifact from the store.
+
+        :param str key: digest or a name of the artifact.
+        :param str destination: if set, the artifact is copied to this path - the path must not exist.
+            Otherwise, path of the artifact in the store is returned, and its content must not be modified.
+        :returns: path to the artifact, or ``None`` when there's no such artifact.
+        """
+
+        digest = self._resolve(key)
+
+        if digest is None:
+            return None
+
+        object_path = self._object_path(digest)
+        owner = self._acquire(digest)
+
+        # The artifact may have been removed before we referenced it.
+        if not os.path.exists(object_path):
+            with self._lock:
+                self._owner_refs[owner].remove(digest)
+                self._drop(digest)
+
+            return None
+
+        self._index.used(digest, os.stat(object_path).st_size)
+
+        if destination is None:
+            return object_path
+
+        method = clone_file(object_path, destination)
+
+        self.debug("artifact '{}' copied to '{}' ({})".format(digest, destination, method))
+
+        return destination
+
+    def release(self, owner):
+        # type: (Hashable) -> None
+        """
+        Release all references held by an owner, e.g. when a pipeline finishes.
+
+        :param owner: owner of the references.
+        """
+
+        with self._lock:
+            for digest in self._owner_refs.pop(owner, []):
+                self._drop(digest)
+
+        self._evict()
+
+    @property
+    def size(self):
+        # type: () -> int
+        """
+        Total size of all stored artifacts, in bytes.
+        """
+
+        return self._index.size
+
+    def _remove(self, digest):
+        # type: (str) -> bool
+        """
+        Remove an artifact, unless it's referenced by another process.
+
+        :returns: ``True`` when the artifact was removed.
+        """
+
+        fd = None
+
+        if fcntl is not None:
+            fd = os.open(self._lock_path(digest), os.O_RDWR | os.O_CREAT, 0o644)
+
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+            except (IOError, OSError):
+                os.close(fd)
+                return False
+
+        try:
+            try:
+                os.unlink(self._object_path(digest))
+
+            except OSError as exc:
+                if exc.errno != errno.ENOENT:
+                    self.warn("Cannot remove artifact '{}': {}".format(digest, exc))
+                    return False
+
+            self._index.removed(digest)
+
+            if fd is not None:
+                os.unlink(self._lock_path(digest))
+
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+        return True
+
+    def _evict(self):
+        # type: () -> None
+        """
+        Remove least recently used artifacts, not referenced by anyone, until the store fits into its size limit.
+        """
+
+        total_size = self._index.size
+
+        if total_size <= self.max_size:
+            return
+
+        for digest, size in self._index.least_recently_used():
+            if total_size <= self.max_size:
+                break
+
+            with self._lock:
+                if self._refcounts.get(digest, 0) > 0:
+                    continue
+
+            if not self._remove(digest):
+                continue
+
+            self.debug("evicted artifact '{}' ({} bytes)".format(digest, size))
+
+            total_size -= size
+
+        if total_size > self.max_size:
+            self.warn('Artifact store exceeds its size limit, all remaining artifacts are in use')
@@ -0,0 +1,226 @@
+"""
+Statistics of shared function calls.
+
+When enabled by ``--shared-stats`` option, every call of a shared function via :py:meth:`gluetool.glue.Glue.shared`
+is recorded: number of calls, number of calls that raised an exception, and a histogram of call latencies,
+for each pair of a shared function and the module calling it. The caller is the module whose shared function
+is being executed, if the call comes from another shared function, or the module currently being executed.
+
+Latencies are kept in HDR-style histograms: buckets grow exponentially, each power of two is split into
+``2 ** SUB_BUCKET_BITS`` linear sub-buckets - memory taken by a histogram stays small, while percentiles keep
+a bounded relative error.
+
+When ``gluetool`` finishes, the statistics are logged as a table, and included in the JSON log.
+"""
+
+import threading
+import time
+
+from six import iteritems
+
+from .log import Logging, LoggerMixin, log_table
+
+# Type annotations
+# pylint: disable=unused-import, wrong-import-order
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple  # noqa
+
+if TYPE_CHECKING:
+    from .log import ContextAdapter  # noqa
+
+
+#: Each power of two is split into ``2 ** SUB_BUCKET_BITS`` sub-buckets, i.e. percentiles are off by at most
+#: ``1 / 2 ** SUB_BUCKET_BITS`` of the actual value.
+SUB_BUCKET_BITS = 5
+
+#: Caller recorded for calls made outside of any module.
+NO_CALLER = '<none>'
+
+
+class LatencyHistogram(object):
+    """
+    HDR-style histogram of latencies, in microseconds.
+    """
+
+    def __init__(self):
+        # type: () -> None
+
+        #: Number of values in each bucket, by the lowest value of the bucket.
+        self.buckets = {}  # type: Dict[int, int]
+
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @staticmethod
+    def _bucket(value):
+        # type: (int) -> Tuple[int, int]
+        """
+        Return the lowest and the highest value of the bucket the value belongs to.
+        """
+
+        shift = max(0, value.bit_length() - SUB_BUCKET_BITS)
+        lowest = (value >> shift) << shift
+
+        return lowest, lowest + (1 << shift) - 1
+
+    def record(self, value):
+        # type: (int) -> None
+        """
+        Record a value.
+
+        :param int value: latency, in microseconds.
+        """
+
+        value = max(0, value)
+        lowest, _ = self._bucket(value)
+
+        self.buckets[lowest] = self.buckets.get(lowest, 0) + 1
+
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, pct):
+        # type: (float) -> Optional[int]
+        """
+        Return the highest value of the bucket in which the given percentile lies, never more than the largest
+        recorded value.
+
+        :param float pct: percentile, between 0 and 100.
+        :returns: the percentile, or ``None`` when there are no values.
+        """
+
+        if not self.count:
+            return None
+
+        threshold = self.count * pct / 100.0
+        seen = 0
+
+        for lowest in sorted(self.buckets):
+            seen += self.buckets[lowest]
+
+            if seen >= threshold:
+                return min(self._bucket(lowest)[1], self.max)
+
+        return self.max
+
+
+class CallStats(object):
+    # pylint: disable=too-few-public-methods
+    """
+    Statistics of calls of one shared function made by one caller.
+    """
+
+    def __init__(self):
+        # type: () -> None
+
+        self.calls = 0
+        self.errors = 0
+        self.latencies = LatencyHistogram()
+
+
+class SharedFunctionStats(LoggerMixin, object):
+    """
+    Collects statistics of shared function calls.
+
+    :param ContextAdapter logger: logger used for logging.
+    """
+
+    def __init__(self, logger=None):
+        # type: (Optional[ContextAdapter]) -> None
+
+        super(SharedFunctionStats, self).__init__(logger or Logging.get_logger())
+
+        #: Statistics, by function name and caller.
+        self.stats = {}  # type: Dict[Tuple[str, str], CallStats]
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _providers(self):
+        # type: () -> List[str]
+
+        if not hasattr(self._local, 'providers'):
+            self._local.providers = []
+
+        return self._local.providers  # type: ignore  # thread-local attribute
+
+    def call(self, funcname, provider, caller, func, *args, **kwargs):
+        # type: (str, str, Optional[str], Callable[..., Any], *Any, **Any) -> Any
+        """
+        Call a shared function, and record the call.
+
+        :param str funcname: name of the shared function.
+        :param str provider: name of the module providing the function.
+        :param str caller: name of the module being executed, if any. Used as the caller unless the call comes
+            from another shared function.
+        :param callable func: the shared function.
+        """
+
+        providers = self._providers()
+
+        if providers:
+            caller = providers[-1]
+
+        providers.append(provider)
+
+        failed = True
+        started = time.time()
+
+        try:
+            result = func(*args, **kwargs)
+            failed = False
+
+            return result
+
+        finally:
+            latency = int((time.time() - started) * 1000000)
+
+            providers.pop()
+
+            with self._lock:
+                stats = self.stats.get((funcname, caller or NO_CALLER))
+
+                if stats is None:
+                    stats = self.stats[(funcname, caller or NO_CALLER)] = CallStats()
+
+                stats.calls += 1
+                stats.latencies.record(latency)
+
+                if failed:
+                    stats.errors += 1
+
+    def report(self):
+        # type: () -> None
+        """
+        Log statistics of all shared functions.
+        """
+
+        if not self.stats:
+            return
+
+        def _ms(value):
+            # type: (Optional[int]) -> Optional[float]
+
+            return round(value / 1000.0, 3) if value is not None else None
+
+        with self._lock:
+            table = [
+                [
+                    funcname,
+                    caller,
+                    stats.calls,
+                    stats.errors,
+                    _ms(stats.latencies.percentile(50)),
+                    _ms(stats.latencies.percentile(90)),
+                    _ms(stats.latencies.percentile(99)),
+                    _ms(stats.latencies.max),
+                    _ms(stats.latencies.total)
+                ]
+                for (funcname, caller), stats in sorted(iteritems(self.stats))
+            ]  # type: List[List[Any]]
+
+        log_table(self.info, 'shared function calls', table,
+                  headers=['Function', 'Caller', 'Calls', 'Errors', 'p50 (ms)', 'p90 (ms)', 'p99 (ms)', 'Max (ms)',
+                           'Total (ms)'],
+                  tablefmt='psql')
@@ -0,0 +1,290 @@
+"""
+Recording and replaying shared function calls.
+
+Shared functions often talk to remote services, which makes pipelines slow and hard to reproduce. With
+``--cassette PATH`` and ``--record-shared FUNCTION,...``, arguments and return values - or exceptions - of calls
+of the chosen shared functions are recorded into a cassette file. Later, with ``--cassette PATH`` and
+``--replay-shared FUNCTION,...``, the chosen shared functions are served from the cassette: modules providing
+them do not need to be part of the pipeline at all, and no remote service is contacted.
+
+A call is replayed from the first recorded call of the same function with equal arguments, which was not replayed
+yet. When all such calls have been replayed already, the last one is replayed again.
+
+Calls are stored with :py:mod:`pickle` - arguments and return values must be picklable, calls that are not are
+not recorded. Exceptions are stored as their class and message. Never replay cassettes from untrusted sources,
+loading a cassette may execute arbitrary code.
+"""
+
+import os
+import pickle
+import threading
+
+from .log import Logging, LoggerMixin
+
+# Type annotations
+# pylint: disable=unused-import, wrong-import-order
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional  # noqa
+
+if TYPE_CHECKING:
+    from .log import ContextAdapter  # noqa
+
+
+#: Version of the cassette format.
+CASSETTE_VERSION = 1
+
+
+class Interaction(object):
+    # pylint: disable=too-few-public-methods
+    """
+    One recorded call of a shared function.
+
+    :param str funcname: name of the shared function.
+    :param tuple args: positional arguments of the call.
+    :param dict kwargs: keyword arguments of the call.
+    :param result: value returned by the call.
+    :param tuple exception: if set, the call raised an exception, described by its class and message.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, funcname, args, kwargs, result=None, exception=None):
+        # type: (str, Any, Dict[str, Any], Any, Optional[Any]) -> None
+
+        self.funcname = funcname
+        self.args = args
+        self.kwargs = kwargs
+        self.result = result
+        self.exception = exception
+
+        self.replayed = False
+
+    def matches(self, funcname, args, kwargs):
+        # type: (str, Any, Dict[str, Any]) -> bool
+
+        try:
+            return bool(self.funcname == funcname and self.args == args and self.kwargs == kwargs)
+
+        # Comparing arbitrary objects may fail.
+        # pylint: disable=broad-except
+        except Exception:
+            return False
+
+    def serialize(self):
+        # type: () -> Dict[str, Any]
+
+        return {
+            'function': self.funcname,
+            'args': self.args,
+            'kwargs': self.kwargs,
+            'result': self.result,
+            'exception': self.exception
+        }
+
+    @classmethod
+    def unserialize(cls, serialized):
+        # type: (Dict[str, Any]) -> Interaction
+
+        return Interaction(serialized['function'], serialized['args'], serialized['kwargs'],
+                           result=serialized['result'], exception=serialized['exception'])
+
+    def replay(self):
+        # type: () -> Any
+        """
+        Return the recorded result, or raise the recorded exception.
+        """
+
+        self.replayed = True
+
+        if self.exception is None:
+            return self.result
+
+        # Avoid circullar imports
+        # pylint: disable=cyclic-import
+        from .glue import GlueError
+
+        klass, message = self.exception
+
+        try:
+            exc = klass(message)
+
+        # Not all exceptions accept just a message.
+        # pylint: disable=broad-except
+        except Exception:
+            exc = GlueError(message)
+
+        raise exc
+
+
+class Cassette(LoggerMixin, object):
+    """
+    Recorded calls of shared functions.
+
+    :param str path: path to the cassette file.
+    :param list(str) record: names of shared functions to record. Calls of these functions already present
+        in the cassette are dropped.
+    :param list(str) replay: names of shared functions to replay.
+    :param ContextAdapter logger: logger used for logging.
+    """
+
+    def __init__(self, path, record=None, replay=None, logger=None):
+        # type: (str, Optional[List[str]], Optional[List[str]], Optional[ContextAdapter]) -> None
+
+        super(Cassette, self).__init__(logger or Logging.get_logger())
+
+        self.path = path
+
+        self.recorded_functions = record or []
+        self.replayed_functions = replay or []
+
+        self.interactions = []  # type: List[Interaction]
+
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            self.load()
+
+        elif self.replayed_functions:
+            # Avoid circullar imports
+            # pylint: disable=cyclic-import
+            from .glue import GlueError
+
+            raise GlueError("Cassette '{}' does not exist".format(path))
+
+        self.interactions = [
+            interaction for interaction in self.interactions if interaction.funcname not in self.recorded_functions
+        ]
+
+    def load(self):
+        # type: () -> None
+        """
+        Load the cassette file.
+        """
+
+        # Avoid circullar imports
+        # pylint: disable=cyclic-import
+        from .glue import GlueError
+
+        try:
+            with open(self.path, 'rb') as f:
+                serialized = pickle.load(f)
+
+        except Exception as exc:
+            raise GlueError("Cannot load cassette '{}': {}".format(self.path, exc))
+
+        if serialized.get('version') != CASSETTE_VERSION:
+            raise GlueError("Cassette '{}' has unsupported version {}".format(self.path, serialized.get('version')))
+
+        self.interactions = [
+            Interaction.unserialize(interaction) for interaction in serialized['interactions']
+        ]
+
+        self.debug("loaded {} calls from cassette '{}'".format(len(self.interactions), self.path))
+
+    def save(self):
+        # type: () -> None
+        """
+        Save the cassette file. Does nothing unless some functions are being recorded.
+        """
+
+        if not self.recorded_functions:
+            return
+
+        with self._lock:
+            serialized = {
+                'version': CASSETTE_VERSION,
+                'interactions': [interaction.serialize() for interaction in self.interactions]
+            }
+
+            tmp_path = '{}.tmp'.format(self.path)
+
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(serialized, f, protocol=2)
+
+            os.rename(tmp_path, self.path)
+
+        self.debug("saved {} calls to cassette '{}'".format(len(self.interactions), self.path))
+
+    def records(self, funcname):
+        # type: (str) -> bool
+        """
+        Check whether calls of a shared function are recorded.
+        """
+
+        return funcname in self.recorded_functions
+
+    def replays(self, funcname):
+        # type: (str) -> bool
+        """
+        Check whether calls of a shared function are replayed.
+        """
+
+        return funcname in self.replayed_functions
+
+    def record(self, funcname, args, kwargs, call):
+        # type: (str, Any, Dict[str, Any], Callable[[], Any]) -> Any
+        """
+        Call a shared function, and record the call.
+
+        :param str funcname: name of the shared function.
+        :param tuple args: positional arguments of the call.
+        :param dict kwargs: keyword arguments of the call.
+        :param callable call: calls the shared function with the arguments.
+        :returns: whatever the shared function returned.
+        """
+
+        try:
+            result = call()
+
+        except Exception as exc:
+            self._add(Interaction(funcname, args, kwargs, exception=(exc.__class__, str(exc))))
+            raise
+
+        self._add(Interaction(funcname, args, kwargs, result=result))
+
+        return result
+
+    def _add(self, interaction):
+        # type: (Interaction) -> None
+
+        # Make sure the call can be saved, the cassette would not be saved at all otherwise.
+        try:
+            pickle.dumps(interaction.serialize(), protocol=2)
+
+        # pylint: disable=broad-except
+        except Exception as exc:
+            self.warn("Cannot record call of shared function '{}': {}".format(interaction.funcname, exc))
+            return
+
+        with self._lock:
+            self.interactions.append(interaction)
+
+    def replay(self, funcname, *args, **kwargs):
+        # type: (str, *Any, **Any) -> Any
+        """
+        Replay a call of a shared function.
+
+        :param str funcname: name of the shared function.
+        :raises gluetool.glue.GlueError: when no such call was recorded.
+        """
+
+        with self._lock:
+            matching = [
+                interaction for interaction in self.interactions if interaction.matches(funcname, args, kwargs)
+            ]
+
+            fresh = [interaction for interaction in matching if not interaction.replayed]
+
+            chosen = fresh[0] if fresh else (matching[-1] if matching else None)
+
+            if chosen is not None:
+                chosen.replayed = True
+
+        if chosen is not None:
+            return chosen.replay()
+
+        # Avoid circullar imports
+        # pylint: disable=cyclic-import
+        from .glue import GlueError
+
+        raise GlueError("No call of shared function '{}' with arguments {}, {} recorded in cassette '{}'".format(
+            funcname, args, kwargs, self.path
+        ))
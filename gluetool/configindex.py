@@ -0,0 +1,186 @@
+"""
+Index of module configuration and data directories.
+
+Each module looks for its configuration files in all module configuration directories, and for its data
+directory in all module data directories. With many modules and directories on a network filesystem, these
+lookups turn into a lot of ``stat`` and ``open`` calls. Instead, :py:class:`ConfigIndex` lists each directory
+once, and reads all files of a configuration directory in one pass; modules are then served from memory.
+Parsed configurations are kept as well, for repeated instantiations of the same module.
+
+A directory is listed and read again when its modification time changes, which is checked at most once per
+:py:data:`DEFAULT_REVALIDATE_INTERVAL` seconds. Note that modification time of a directory changes when files
+are added, removed or replaced, e.g. by an editor saving a file, but not when a file is modified in place.
+"""
+
+import os
+import threading
+import time
+
+from six.moves import configparser, StringIO
+
+from .log import Logging, LoggerMixin
+
+# Type annotations
+# pylint: disable=unused-import, wrong-import-order
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple  # noqa
+
+if TYPE_CHECKING:
+    from .log import ContextAdapter  # noqa
+
+
+#: How often is a modification time of an indexed directory checked, in seconds.
+DEFAULT_REVALIDATE_INTERVAL = 5
+
+
+def _mtime(path):
+    # type: (str) -> Optional[float]
+
+    try:
+        return os.stat(path).st_mtime
+
+    except OSError:
+        return None
+
+
+class _IndexedDirectory(object):
+    # pylint: disable=too-few-public-methods
+    """
+    Entries of a directory, and - when asked for - contents of its files.
+
+    :param str path: path to the directory.
+    """
+
+    def __init__(self, path):
+        # type: (str) -> None
+
+        self.path = path
+        self.mtime = _mtime(path)
+        self.checked = time.time()
+
+        try:
+            self.names = set(os.listdir(path))  # type: Set[str]
+
+        except OSError:
+            self.names = set()
+
+        #: Contents of files, by their names. ``None`` until read.
+        self.contents = None  # type: Optional[Dict[str, str]]
+
+    def read(self):
+        # type: () -> Dict[str, str]
+
+        if self.contents is not None:
+            return self.contents
+
+        contents = {}
+
+        for name in self.names:
+            try:
+                with open(os.path.join(self.path, name), 'r') as f:
+                    contents[name] = f.read()
+
+            # Subdirectories and unreadable files are skipped, just like configparser skips them.
+            except (IOError, OSError):
+                continue
+
+        self.contents = contents
+
+        return contents
+
+
+class ConfigIndex(LoggerMixin, object):
+    """
+    Index of configuration and data directories.
+
+    :param float revalidate_interval: how often to check whether an indexed directory changed, in seconds.
+    :param ContextAdapter logger: logger used for logging.
+    """
+
+    def __init__(self, revalidate_interval=DEFAULT_REVALIDATE_INTERVAL, logger=None):
+        # type: (float, Optional[ContextAdapter]) -> None
+
+        super(ConfigIndex, self).__init__(logger or Logging.get_logger())
+
+        self.revalidate_interval = revalidate_interval
+
+        self._directories = {}  # type: Dict[str, _IndexedDirectory]
+
+        #: Parsed configurations, by paths of their files.
+        self._parsers = {}  # type: Dict[Tuple[str, ...], Tuple[configparser.ConfigParser, List[str]]]
+
+        self._lock = threading.RLock()
+
+    def _directory(self, path):
+        # type: (str) -> _IndexedDirectory
+
+        with self._lock:
+            directory = self._directories.get(path)
+            now = time.time()
+
+            if directory is not None:
+                if now - directory.checked < self.revalidate_interval:
+                    return directory
+
+                if _mtime(path) == directory.mtime:
+                    directory.checked = now
+                    return directory
+
+                self.debug("directory '{}' changed, indexing it again".format(path))
+
+                # Parsed configurations may depend on the directory.
+                self._parsers.clear()
+
+            directory = self._directories[path] = _IndexedDirectory(path)
+
+            return directory
+
+    def exists(self, path):
+        # type: (str) -> bool
+        """
+        Check whether a file or directory exists, by looking into the index of its parent directory.
+
+        :param str path: path to check.
+        :rtype: bool
+        """
+
+        return os.path.basename(path) in self._directory(os.path.dirname(path)).names
+
+    def read(self, paths):
+        # type: (List[str]) -> Tuple[configparser.ConfigParser, List[str]]
+        """
+        Parse configuration files, with the same result as :py:meth:`configparser.ConfigParser.read` would have.
+        Files that do not exist are skipped.
+
+        The parser is shared by all callers asking for the same files, and must not be modified.
+
+        :param list(str) paths: paths to configuration files.
+        :returns: parser, and the list of files it has read.
+        """
+
+        key = tuple(paths)
+
+        with self._lock:
+            # Revalidate directories first, this may invalidate parsed configurations.
+            files = [
+                (path, self._directory(os.path.dirname(path)).read().get(os.path.basename(path)))
+                for path in paths
+            ]
+
+            if key in self._parsers:
+                return self._parsers[key]
+
+            parser = configparser.ConfigParser()
+            read_file = getattr(parser, 'read_file', None) or getattr(parser, 'readfp')
+
+            parsed_paths = []
+
+            for path, content in files:
+                if content is None:
+                    continue
+
+                read_file(StringIO(content), path)
+                parsed_paths.append(path)
+
+            self._parsers[key] = parser, parsed_paths
+
+            return parser, parsed_paths
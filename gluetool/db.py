@@ -0,0 +1,120 @@
+"""
+Local SQLite databases used by gluetool, e.g. the work queue or the run history.
+
+Databases are opened in WAL mode, allowing multiple ``gluetool`` processes and threads to read the database while
+one of them is writing into it. Each thread uses its own connection.
+
+Schema changes are applied by migrations - SQL statements executed in order, each just once. The number of applied
+migrations is stored in the database as its ``user_version``, therefore databases created by older versions
+of gluetool are upgraded when opened.
+"""
+
+import contextlib
+import os
+import sqlite3
+import threading
+
+from .log import Logging, LoggerMixin
+
+# Type annotations
+# pylint: disable=unused-import, wrong-import-order
+from typing import TYPE_CHECKING, Iterator, Optional, Sequence  # noqa
+
+if TYPE_CHECKING:
+    from .log import ContextAdapter  # noqa
+
+
+class Database(LoggerMixin, object):
+    """
+    SQLite database, with a schema.
+
+    :param str path: path to the database file. It is created when it does not exist yet.
+    :param str schema: SQL script creating tables and indices of the database. It must be idempotent,
+        it is executed every time the database is opened.
+    :param list(str) migrations: SQL statements changing the initial schema, applied in order. New migrations
+        must be appended to the list, applied migrations must never change.
+    :param ContextAdapter logger: logger used for logging.
+    """
+
+    def __init__(self, path, schema, migrations=None, logger=None):
+        # type: (str, str, Optional[Sequence[str]], Optional[ContextAdapter]) -> None
+
+        super(Database, self).__init__(logger or Logging.get_logger())
+
+        self.path = path
+
+        # SQLite connections cannot be shared by threads.
+        self._connections = threading.local()
+
+        dirpath = os.path.dirname(path)
+
+        if dirpath and not os.path.exists(dirpath):
+            os.makedirs(dirpath)
+
+        self._connection().executescript(schema)
+
+        self._migrate(migrations or [])
+
+    def _connection(self):
+        # type: () -> sqlite3.Connection
+
+        connection = getattr(self._connections, 'connection', None)
+
+        if connection is None:
+            # Autocommit mode - transactions are started explicitly, by `_transaction`.
+            connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+
+            connection.execute('PRAGMA journal_mode=WAL')
+
+            self._connections.connection = connection
+
+        return connection
+
+    def _migrate(self, migrations):
+        # type: (Sequence[str]) -> None
+        """
+        Apply migrations not applied to the database yet.
+        """
+
+        with self._transaction() as connection:
+            version = connection.execute('PRAGMA user_version').fetchone()[0]
+
+            if version >= len(migrations):
+                return
+
+            self.debug('migrating database {} from version {} to {}'.format(self.path, version, len(migrations)))
+
+            for statement in migrations[version:]:
+                connection.execute(statement)
+
+            connection.execute('PRAGMA user_version = {:d}'.format(len(migrations)))
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        # type: () -> Iterator[sqlite3.Connection]
+
+        connection = self._connection()
+
+        # Take the write lock immediately, to make "select & update" sequences atomic.
+        connection.execute('BEGIN IMMEDIATE')
+
+        try:
+            yield connection
+
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+        connection.execute('COMMIT')
+
+    def close(self):
+        # type: () -> None
+        """
+        Close database connection of the current thread.
+        """
+
+        connection = getattr(self._connections, 'connection', None)
+
+        if connection is not None:
+            connection.close()
+            self._connections.connection = None
@@ -0,0 +1,173 @@
+"""
+Stream of pipeline lifecycle events, for real-time monitoring.
+
+When ``--event-socket PATH`` is set, ``gluetool`` emits structured events - pipeline started and finished, module
+phases (``setup``, ``sanity``, ``execute`` and ``destroy``) started and finished, failures, and registrations
+of shared functions - to a Unix datagram socket bound to ``PATH`` or, when ``PATH`` is a FIFO, to the FIFO.
+
+Each event is a single JSON object, one per datagram or one per line:
+
+.. code-block:: json
+
+   {
+       "event": "module-phase-started",
+       "monotonic": 91247.113,
+       "time": 1792359633.876,
+       "pid": 4242,
+       "thread": "MainThread",
+       "actions": ["running pipeline"],
+       "module": "koji",
+       "phase": "execute"
+   }
+
+``monotonic`` timestamps are suitable for measuring durations, ``actions`` lists labels of unfinished actions
+(see :py:mod:`gluetool.action`) of the emitting thread, from the root one.
+
+Emission never blocks: when there is no consumer, or when the consumer is too slow and the socket or FIFO buffer
+is full, events are dropped. Note that the kernel queues only a few datagrams for each socket (see
+``net.unix.max_dgram_qlen`` sysctl), consumers of the socket should read events as soon as possible.
+"""
+
+import errno
+import json
+import os
+import select
+import socket
+import stat
+import threading
+import time
+
+from six import iteritems
+
+from .action import Action
+from .log import Logging, LoggerMixin
+
+# Type annotations
+# pylint: disable=unused-import, wrong-import-order
+from typing import TYPE_CHECKING, Any, Dict, List, Optional  # noqa
+
+if TYPE_CHECKING:
+    from .log import ContextAdapter  # noqa
+
+
+# Python 2 has no monotonic clock.
+_monotonic = getattr(time, 'monotonic', time.time)  # pylint: disable=invalid-name
+
+#: Writes to a FIFO not larger than this are atomic - larger events are dropped, they could be interleaved
+#: with events written by other threads or processes.
+FIFO_MAX_EVENT_SIZE = getattr(select, 'PIPE_BUF', 512)
+
+#: Errors meaning there is no consumer, or it's not fast enough - events are dropped silently.
+_DROP_ERRNOS = (errno.EAGAIN, errno.EWOULDBLOCK, errno.ENOENT, errno.ECONNREFUSED, errno.ENXIO, errno.EPIPE,
+                errno.ENOBUFS)
+
+
+def _action_labels():
+    # type: () -> List[str]
+
+    # pylint: disable=protected-access
+    return [action.label for action in Action._action_stack()]
+
+
+class EventStream(LoggerMixin, object):
+    """
+    Emits events to a Unix datagram socket or a FIFO.
+
+    :param str path: path to the socket or FIFO.
+    :param ContextAdapter logger: logger used for logging.
+    """
+
+    def __init__(self, path, logger=None):
+        # type: (str, Optional[ContextAdapter]) -> None
+
+        super(EventStream, self).__init__(logger or Logging.get_logger())
+
+        self.path = path
+
+        #: Number of events dropped because there was no consumer or it was too slow.
+        self.dropped = 0
+
+        self._lock = threading.Lock()
+
+        self._socket = None  # type: Optional[socket.socket]
+        self._fifo_fd = None  # type: Optional[int]
+
+        self._is_fifo = os.path.exists(path) and stat.S_ISFIFO(os.stat(path).st_mode)
+
+        if not self._is_fifo:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._socket.setblocking(False)
+
+    def _write_fifo(self, data):
+        # type: (bytes) -> None
+
+        if len(data) > FIFO_MAX_EVENT_SIZE:
+            raise OSError(errno.ENOBUFS, 'event too large')
+
+        with self._lock:
+            if self._fifo_fd is None:
+                # Fails with ENXIO when there's no reader - we'll try again with the next event.
+                self._fifo_fd = os.open(self.path, os.O_WRONLY | os.O_NONBLOCK)
+
+            try:
+                os.write(self._fifo_fd, data)
+
+            except OSError as exc:
+                # Reader went away, reopen the FIFO next time.
+                if exc.errno == errno.EPIPE:
+                    os.close(self._fifo_fd)
+                    self._fifo_fd = None
+
+                raise
+
+    def emit(self, event, **fields):
+        # type: (str, **Any) -> None
+        """
+        Emit an event.
+
+        :param str event: name of the event.
+        :param fields: additional fields of the event. Values not serializable to JSON are represented by their
+            ``repr``.
+        """
+
+        payload = {
+            'event': event,
+            'monotonic': _monotonic(),
+            'time': time.time(),
+            'pid': os.getpid(),
+            'thread': threading.current_thread().name,
+            'actions': _action_labels()
+        }  # type: Dict[str, Any]
+
+        for name, value in iteritems(fields):
+            payload[name] = value
+
+        data = (json.dumps(payload, default=repr) + '\n').encode('utf-8')
+
+        try:
+            if self._is_fifo:
+                self._write_fifo(data)
+
+            elif self._socket is not None:
+                self._socket.sendto(data, self.path)
+
+        except (IOError, OSError, socket.error) as exc:
+            if getattr(exc, 'errno', None) not in _DROP_ERRNOS:
+                self.warn("Cannot emit event to '{}': {}".format(self.path, exc))
+
+            self.dropped += 1
+
+    def close(self):
+        # type: () -> None
+        """
+        Close the socket or FIFO.
+        """
+
+        with self._lock:
+            if self._socket is not None:
+                self._socket.close()
+                self._socket = None
+
+            if self._fifo_fd is not None:
+                os.close(self._fifo_fd)
+                self._fifo_fd = None
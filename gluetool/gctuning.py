@@ -0,0 +1,155 @@
+"""
+Garbage collector strategies.
+
+Startup of ``gluetool`` - importing modules, parsing configuration files and command-line options, discovering
+modules - creates a huge number of long-lived objects. Every few hundreds of them trigger a collection, and
+collections of the oldest generation have to walk all of them, over and over again, while nothing would be freed.
+
+``--gc-strategy`` option, or ``GLUETOOL_GC_STRATEGY`` environment variable, selects how the collector behaves:
+
+``default``
+    no changes, the collector runs with thresholds set by Python.
+
+``threshold``
+    during startup, threshold of the youngest generation is raised to :py:data:`DEFAULT_STARTUP_GC_THRESHOLD`,
+    collections are then much less frequent. Original thresholds are restored once startup is finished.
+
+``disable``
+    the collector is disabled during startup, and enabled once startup is finished.
+
+``freeze``
+    like ``disable``, and once startup is finished, all objects created so far are moved to the permanent
+    generation (see :py:func:`gc.freeze`) - collections no longer walk them, and they no longer dirty memory
+    pages shared with forked processes. Recommended for batch runs, work queue consumers and forking modes.
+    Available with Python 3.7 and newer, ``disable`` is used instead with older Pythons.
+
+Note that the option is parsed only after configuration files have been already loaded - to affect loading
+of configuration as well, use the environment variable.
+"""
+
+import gc
+import os
+
+from .log import Logging, LoggerMixin
+
+# Type annotations
+# pylint: disable=unused-import, wrong-import-order
+from typing import TYPE_CHECKING, Optional, Tuple  # noqa
+
+if TYPE_CHECKING:
+    from .log import ContextAdapter  # noqa
+
+
+#: Known strategies.
+GC_STRATEGIES = ('default', 'threshold', 'disable', 'freeze')
+
+#: Default strategy.
+DEFAULT_GC_STRATEGY = os.getenv('GLUETOOL_GC_STRATEGY', 'default')
+
+#: Threshold of the youngest generation used during startup by ``threshold`` strategy.
+DEFAULT_STARTUP_GC_THRESHOLD = 100000
+
+
+class GCTuner(LoggerMixin, object):
+    """
+    Applies a garbage collector strategy to the startup of ``gluetool``.
+
+    :param str strategy: one of :py:data:`GC_STRATEGIES`.
+    :param ContextAdapter logger: logger used for logging.
+    """
+
+    def __init__(self, strategy=DEFAULT_GC_STRATEGY, logger=None):
+        # type: (str, Optional[ContextAdapter]) -> None
+
+        super(GCTuner, self).__init__(logger or Logging.get_logger())
+
+        self.strategy = 'default'
+
+        #: Set while startup is in progress.
+        self.in_startup = False
+
+        self._original_enabled = gc.isenabled()
+        self._original_thresholds = gc.get_threshold()  # type: Tuple[int, ...]
+
+        self.switch(strategy)
+
+    @staticmethod
+    def _check_strategy(strategy):
+        # type: (str) -> str
+
+        # Avoid circular imports
+        # pylint: disable=cyclic-import
+        from .glue import GlueError
+
+        if strategy not in GC_STRATEGIES:
+            raise GlueError("Unknown GC strategy '{}', expected one of {}".format(strategy, ', '.join(GC_STRATEGIES)))
+
+        if strategy == 'freeze' and not hasattr(gc, 'freeze'):
+            return 'disable'
+
+        return strategy
+
+    def _restore(self):
+        # type: () -> None
+
+        gc.set_threshold(*self._original_thresholds)
+
+        if self._original_enabled:
+            gc.enable()
+
+    def begin_startup(self):
+        # type: () -> None
+        """
+        Mark the beginning of startup, applying the strategy.
+        """
+
+        self._original_enabled = gc.isenabled()
+        self._original_thresholds = gc.get_threshold()
+
+        self.in_startup = True
+
+        if self.strategy == 'threshold':
+            gc.set_threshold(DEFAULT_STARTUP_GC_THRESHOLD, *self._original_thresholds[1:])
+
+        elif self.strategy in ('disable', 'freeze'):
+            gc.disable()
+
+    def switch(self, strategy):
+        # type: (str) -> None
+        """
+        Change the strategy. When startup is in progress, the new strategy is applied to the rest of it.
+
+        :param str strategy: one of :py:data:`GC_STRATEGIES`.
+        """
+
+        strategy = self._check_strategy(strategy)
+
+        if strategy == self.strategy:
+            return
+
+        self.debug("GC strategy '{}'".format(strategy))
+
+        self.strategy = strategy
+
+        if self.in_startup:
+            self._restore()
+            self.begin_startup()
+
+    def end_startup(self):
+        # type: () -> None
+        """
+        Mark the end of startup, restoring the original collector settings - and freezing all objects created
+        so far, when ``freeze`` strategy is used.
+        """
+
+        if not self.in_startup:
+            return
+
+        self.in_startup = False
+
+        if self.strategy == 'freeze':
+            gc.freeze()
+
+            self.debug('{} objects moved to the permanent generation'.format(gc.get_freeze_count()))
+
+        self._restore()
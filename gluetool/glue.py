@@ -2,6 +2,7 @@
 
 import argparse
 import collections
+import copy
 import ast
 import enum
 import imp
@@ -9,21 +10,25 @@ import inspect
 import logging
 import os
 import sys
+import threading
+import time
+import traceback
 import warnings
 
 from functools import partial
 
-from six import iterkeys, itervalues, iteritems, ensure_str
+from six import iterkeys, itervalues, iteritems, ensure_str, string_types
 from six.moves import configparser
 
 import jinja2
-import mock
 import pkg_resources
 
 from .action import Action
 from .color import Colors, switch as switch_colors
-from .help import LineWrapRawTextHelpFormatter, option_help, docstring_to_help, trim_docstring, eval_context_help
+from .help import LineWrapRawTextHelpFormatter, docstring_to_help, trim_docstring, eval_context_help, \
+    extract_eval_context_info_from_ast
 from .log import Logging, LoggerMixin, ContextAdapter, ModuleAdapter, log_dict, VERBOSE
+from .log import STACK_SNAPSHOT_ATTRIBUTE, snapshot_stack
 
 # Type annotations
 # pylint: disable=unused-import,wrong-import-order
@@ -33,7 +38,19 @@ from types import TracebackType  # noqa
 from .log import LoggingFunctionType, ExceptionInfoType  # noqa
 
 if TYPE_CHECKING:
+    import gluetool.artifacts  # noqa
+    import gluetool.callstats  # noqa
+    import gluetool.cassette  # noqa
     import gluetool.color  # noqa
+    import gluetool.configindex  # noqa
+    import gluetool.events  # noqa
+    import gluetool.history  # noqa
+    import gluetool.incremental  # noqa
+    import gluetool.memory  # noqa
+    import gluetool.profiling  # noqa
+    import gluetool.resources  # noqa
+    import gluetool.shm  # noqa
+    import gluetool.timeouts  # noqa
     # pylint: disable=cyclic-import
     import gluetool.utils  # noqa
 
@@ -41,6 +58,9 @@ if TYPE_CHECKING:
 # pylint: disable=invalid-name
 SharedType = Callable[..., Any]
 
+#: Flat list of options, as ``(name, names, params)`` tuples.
+OptionTableType = List[Tuple[str, Any, Dict[str, Any]]]
+
 
 DEFAULT_MODULE_CONFIG_PATHS = [
     '/etc/gluetool.d/config',
@@ -58,6 +78,26 @@ DEFAULT_MODULE_PATHS = [
     '{}/gluetool_modules'.format(sys.prefix)
 ]  # type: List[str]
 
+#: Compact failures keep only this many innermost stack frames of each exception.
+DEFAULT_COMPACT_MAX_FRAMES = 50
+
+#: Compact failures keep local variables' ``repr`` truncated to this length.
+DEFAULT_COMPACT_MAX_REPR_LENGTH = 256
+
+#: Compact failures keep output of failed commands truncated to this length.
+DEFAULT_COMPACT_MAX_OUTPUT_LENGTH = 4096
+
+#: Arguments of :py:class:`argparse.ArgumentParser` affecting only how help and usage are presented. These do not
+#: prevent parsers from being reused, see :py:meth:`Configurable._get_args_parser`.
+ARGS_PARSER_PRESENTATION = ('prog', 'usage', 'description', 'epilog', 'formatter_class')
+
+#: Containers :py:class:`argparse.ArgumentParser` shares with its argument groups. See
+#: :py:meth:`ArgumentParser.__copy__`.
+ARGS_PARSER_SHARED_CONTAINERS = (
+    '_registries', '_actions', '_option_string_actions', '_defaults', '_has_negative_number_optionals',
+    '_mutually_exclusive_groups'
+)
+
 
 # Install workarounds from Six - this makes templates compatible with both Python 2 and 3 when it comes
 # to iterating over dictionaries.
@@ -83,6 +123,11 @@ jinja2.defaults.DEFAULT_NAMESPACE.update({
 # the module) is inspected, then its parent, after that parent's parent and so on. This is ensured by `Module`
 # API "secretly" calling `Glue` methods, which take care of checking all the layers.
 #
+# A pipeline can also spawn several named pipelines which then run concurrently, each in its own thread (see
+# `Glue.run_pipelines`). Each of these threads gets its own stack of pipelines: a copy of the parent's stack, with
+# the new pipeline on top. Each concurrent pipeline therefore has its own shared function registry, layered on top
+# of those of its parents, and it cannot see shared functions registered by its siblings.
+#
 
 
 class DryRunLevels(enum.IntEnum):
@@ -272,6 +317,8 @@ class Failure(object):
     :ivar Exception exception: Shortcut to ``exc_info[1]``, if available, or ``None``.
     :ivar tuple exc_info: Exception information as returned by :py:func:`sys.exc_info`.
     :ivar str sentry_event_id: If set, the failure was reported to the Sentry under this ID.
+    :ivar bool compacted: If set, the failure has been compacted by :py:meth:`compact`, and its tracebacks
+        were released.
     """
 
     def __init__(self, module, exc_info):
@@ -279,6 +326,7 @@ class Failure(object):
 
         self.module = module
         self.exc_info = exc_info
+        self.compacted = False
 
         self.sentry_event_id = None  # type: Optional[str]
         self.sentry_event_url = None  # type: Optional[str]
@@ -291,6 +339,114 @@ class Failure(object):
             self.exception = None
             self.soft = False
 
+    def serialize_to_json(self):
+        # type: () -> Dict[str, Any]
+        """
+        Return a JSON-friendly description of the failure, e.g. for storing it in a database.
+
+        :rtype: dict
+        """
+
+        return {
+            'module': self.module.unique_name if self.module is not None else None,
+            'exception': type(self.exception).__name__ if self.exception is not None else None,
+            'message': str(self.exception) if self.exception is not None else None,
+            'soft': self.soft,
+            'traceback': self._format_traceback() if self.exc_info else None,
+            'sentry_event_id': self.sentry_event_id
+        }
+
+    def _format_traceback(self):
+        # type: () -> str
+
+        if not self.compacted:
+            return ''.join(traceback.format_exception(*self.exc_info))
+
+        stack = getattr(self.exception, STACK_SNAPSHOT_ATTRIBUTE, None) or []
+
+        return ''.join(
+            ['Traceback (most recent call last):\n']
+            + traceback.format_list([(filename, lineno, fnname, text) for filename, lineno, fnname, text, _ in stack])
+            + traceback.format_exception_only(self.exc_info[0], self.exception)
+        )
+
+    def compact(self, max_frames=DEFAULT_COMPACT_MAX_FRAMES, max_repr_length=DEFAULT_COMPACT_MAX_REPR_LENGTH,
+                max_output_length=DEFAULT_COMPACT_MAX_OUTPUT_LENGTH):
+        # type: (int, int, int) -> None
+        """
+        Replace tracebacks of the exception, and of exceptions it was caused by, with size-bounded snapshots,
+        and release the tracebacks. Stack frames - and all their local variables - are then no longer kept
+        alive by the failure. Output of failed commands is truncated as well.
+
+        Snapshots are still used when the failure is logged, but they are not usable for anything requiring
+        real tracebacks - e.g. a submission to Sentry. Compact a failure only after it has been logged
+        and submitted.
+
+        :param int max_frames: keep only this many innermost frames of each traceback.
+        :param int max_repr_length: truncate ``repr`` of local variables to this length.
+        :param int max_output_length: truncate output of failed commands to this length.
+        """
+
+        if self.compacted or not self.exc_info:
+            return
+
+        exc_info = self.exc_info  # type: Any
+
+        self.exc_info = (exc_info[0], exc_info[1], None)
+
+        while exc_info:
+            exc, tb = exc_info[1], exc_info[2]
+
+            if isinstance(exc, BaseException):
+                _compact_exception(exc, tb, max_frames, max_repr_length, max_output_length)
+
+            exc_info = getattr(exc, 'caused_by', None)
+
+            if exc_info:
+                exc.caused_by = (exc_info[0], exc_info[1], None)  # type: ignore  # it *does* have `caused_by`
+
+        self.compacted = True
+
+
+def _compact_exception(exc, tb, max_frames, max_repr_length, max_output_length):
+    # type: (BaseException, Any, int, int, int) -> None
+
+    # An existing snapshot describes where the exception was originally raised, e.g. in a worker process.
+    if tb is not None and getattr(exc, STACK_SNAPSHOT_ATTRIBUTE, None) is None:
+        try:
+            setattr(exc, STACK_SNAPSHOT_ATTRIBUTE, snapshot_stack(tb, max_frames, max_repr_length))
+
+        except AttributeError:
+            pass
+
+    # Python 3 exceptions carry their tracebacks, and so do exceptions they were raised from, or while handling.
+    pending = [exc]  # type: List[Optional[BaseException]]
+    seen = set()
+
+    while pending:
+        chained = pending.pop()
+
+        if chained is None or id(chained) in seen:
+            continue
+
+        seen.add(id(chained))
+
+        if getattr(chained, '__traceback__', None) is not None:
+            chained.__traceback__ = None
+
+        pending += [getattr(chained, '__cause__', None), getattr(chained, '__context__', None)]
+
+    output = getattr(exc, 'output', None)
+
+    if isinstance(exc, GlueCommandError) and output is not None:
+        for stream in ('stdout', 'stderr'):
+            content = getattr(output, stream)
+
+            if content is not None and len(content) > max_output_length:
+                setattr(output, stream, '... ({} characters truncated)\n{}'.format(
+                    len(content) - max_output_length, content[-max_output_length:]
+                ))
+
 
 def retry(*args):
     # type: (*Any) -> Any
@@ -341,22 +497,35 @@ class PipelineStepModule(PipelineStep):
         a module class, whose instance is then given name ``module``.
     :param list(str) argv: list of options to be given to the module, in a form similar
         to :py:data:`sys.argv`.
+    :param dict(str, object) options: if set, a mapping between option names and their values. These
+        are validated against module's ``options`` and injected directly into module's configuration,
+        without the need to render them as command-line arguments first. See
+        :py:meth:`Configurable._inject_options`.
     """
 
-    def __init__(self, module, actual_module=None, argv=None):
-        # type: (str, Optional[str], Optional[List[str]]) -> None
+    def __init__(self, module, actual_module=None, argv=None, options=None):
+        # type: (str, Optional[str], Optional[List[str]], Optional[Dict[str, Any]]) -> None
 
         self.module = module
         self.actual_module = actual_module or module
         self.argv = argv or []
+        self.options = options
 
     def __repr__(self):
         # type: () -> str
 
-        return "PipelineStepModule('{}', actual_module='{}', argv={})".format(
+        if self.options is None:
+            return "PipelineStepModule('{}', actual_module='{}', argv={})".format(
+                self.module,
+                self.actual_module,
+                self.argv
+            )
+
+        return "PipelineStepModule('{}', actual_module='{}', argv={}, options={})".format(
             self.module,
             self.actual_module,
-            self.argv
+            self.argv,
+            self.options
         )
 
     def to_module(self, glue):
@@ -374,7 +543,7 @@ class PipelineStepModule(PipelineStep):
         # type: () -> Dict[str, Any]
 
         return {
-            field: getattr(self, field) for field in ('module', 'actual_module', 'argv')
+            field: getattr(self, field) for field in ('module', 'actual_module', 'argv', 'options')
         }
 
     @classmethod
@@ -384,7 +553,8 @@ class PipelineStepModule(PipelineStep):
         return PipelineStepModule(
             serialized['module'],
             actual_module=serialized['actual_module'],
-            argv=serialized['argv']
+            argv=serialized['argv'],
+            options=serialized.get('options', None)
         )
 
 
@@ -415,7 +585,7 @@ class PipelineStepCallback(PipelineStep):
     def to_module(self, glue):
         # type: (Glue) -> CallbackModule
 
-        return CallbackModule(self.name, glue, self.callback)
+        return CallbackModule(self.name, glue, self.callback, *self.args, **self.kwargs)
 
     def serialize_to_json(self):
         # type: () -> Dict[str, Any]
@@ -440,6 +610,23 @@ PipelineStepsType = Sequence[PipelineStep]
 # pylint: disable=invalid-name
 PipelineReturnType = Tuple[Optional[Failure], Optional[Failure]]
 
+#: Describes how long did a module spend in one phase of a pipeline.
+#:
+#: :ivar str module: name of the module.
+#: :ivar str unique_name: name of the module instance.
+#: :ivar str phase: ``setup``, ``sanity``, ``execute`` or ``destroy``.
+#: :ivar float started: when the phase started, as returned by :py:func:`time.time`.
+#: :ivar float duration: how long did the phase take, in seconds.
+#: :ivar str fingerprint: fingerprint of module's options, see :py:meth:`Module.options_fingerprint`.
+ModuleTiming = NamedTuple('ModuleTiming', (
+    ('module', str),
+    ('unique_name', str),
+    ('phase', str),
+    ('started', float),
+    ('duration', float),
+    ('fingerprint', Optional[str])
+))
+
 
 class PipelineAdapter(ContextAdapter):
     """
@@ -507,6 +694,20 @@ class Pipeline(LoggerMixin, object):
         # actions (e.g. executing modules) are children of this action.
         self.action = None  # type: Optional[Action]
 
+        #: When the pipeline started and finished running.
+        self.started = None  # type: Optional[float]
+        self.finished = None  # type: Optional[float]
+
+        #: Durations of phases of all modules.
+        self.timings = []  # type: List[ModuleTiming]
+
+        # Fingerprints of modules' options, by their unique names. Computed once per module, and only when
+        # runs are recorded.
+        self._fingerprints = {}  # type: Dict[str, Optional[str]]
+
+        #: Memory usage of modules, when ``--memory-accounting`` is set.
+        self.memory = []  # type: List[gluetool.memory.ModuleMemory]
+
     def _add_shared(self, funcname, module, func):
         # type: (str, Configurable, SharedType) -> None
         """
@@ -523,6 +724,8 @@ class Pipeline(LoggerMixin, object):
 
         self.shared_functions[funcname] = (module, func)
 
+        self._emit_event('shared-function-registered', function=funcname, module=module.unique_name)
+
     def add_shared(self, funcname, module):
         # type: (str, Module) -> None
         """
@@ -610,10 +813,122 @@ class Pipeline(LoggerMixin, object):
 
         return None
 
+    def _emit_event(self, event, **fields):
+        # type: (str, **Any) -> None
+        """
+        Emit a lifecycle event, tagged with the name of the pipeline. See :py:mod:`gluetool.events`.
+        """
+
+        self.glue.emit_event(event, pipeline=getattr(self, 'name', None), **fields)
+
+    def _options_fingerprint(self, module):
+        # type: (Module) -> Optional[str]
+        """
+        Return fingerprint of module's options for its timings, or ``None`` when runs are not recorded.
+        """
+
+        if module.unique_name not in self._fingerprints:
+            from .utils import normalize_bool_option
+
+            if isinstance(module, Module) and normalize_bool_option(self.glue.option('history')):
+                self._fingerprints[module.unique_name] = module.options_fingerprint()
+
+            else:
+                self._fingerprints[module.unique_name] = None
+
+        return self._fingerprints[module.unique_name]
+
+    def _timed(self, phase, callback):
+        # type: (str, Callable[..., Optional[Failure]]) -> Callable[..., Optional[Failure]]
+        """
+        Wrap a callback of :py:meth:`_for_each_module`, recording how long did it take for each module.
+
+        :param str phase: name of the pipeline phase the callback implements.
+        :param callable callback: callback to wrap.
+        """
+
+        def _wrapper(module, *args, **kwargs):
+            # type: (Module, *Any, **Any) -> Optional[Failure]
+
+            started = time.time()
+            failure = None  # type: Optional[Failure]
+
+            self._emit_event('module-phase-started', module=module.unique_name, phase=phase)
+
+            try:
+                failure = callback(module, *args, **kwargs)
+
+                return failure
+
+            finally:
+                duration = time.time() - started
+
+                self.timings.append(ModuleTiming(
+                    module.name, module.unique_name, phase, started, duration, self._options_fingerprint(module)
+                ))
+
+                self._emit_event('module-phase-finished', module=module.unique_name, phase=phase, duration=duration,
+                                 failed=failure is not None)
+
+        return _wrapper
+
+    def _measured(self, phase, callback):
+        # type: (str, Callable[..., Optional[Failure]]) -> Callable[..., Optional[Failure]]
+        """
+        Wrap a callback of :py:meth:`_for_each_module`, recording memory usage before and after it for each module.
+        Unless ``--memory-accounting`` is set, the callback is returned unchanged.
+
+        :param str phase: name of the pipeline phase the callback implements.
+        :param callable callback: callback to wrap.
+        """
+
+        if not self.glue.option('memory-accounting'):
+            return callback
+
+        # pylint: disable=cyclic-import
+        from .memory import ModuleMemory, take_snapshot
+
+        def _wrapper(module, *args, **kwargs):
+            # type: (Module, *Any, **Any) -> Optional[Failure]
+
+            before = take_snapshot()
+
+            try:
+                return callback(module, *args, **kwargs)
+
+            finally:
+                self.memory.append(ModuleMemory(module.name, module.unique_name, phase, before, take_snapshot()))
+
+        return _wrapper
+
+    def _profiled(self, phase, callback):
+        # type: (str, Callable[..., Optional[Failure]]) -> Callable[..., Optional[Failure]]
+        """
+        Wrap a callback of :py:meth:`_for_each_module`, profiling it for each module. Unless ``--profile-modules``
+        is set, the callback is returned unchanged.
+
+        :param str phase: name of the pipeline phase the callback implements.
+        :param callable callback: callback to wrap.
+        """
+
+        profiler = self.glue.module_profiler
+
+        if profiler is None:
+            return callback
+
+        def _wrapper(module, *args, **kwargs):
+            # type: (Module, *Any, **Any) -> Optional[Failure]
+
+            with profiler.profile(module.unique_name, phase):
+                return callback(module, *args, **kwargs)
+
+        return _wrapper
+
     def _log_failure(self, module, failure, label=None):
         # type: (Module, Failure, Optional[str]) -> None
         """
-        Log a failure, and submit it to Sentry.
+        Log a failure, and submit it to Sentry. When ``--compact-failures`` is set, the failure is then compacted,
+        see :py:meth:`Failure.compact`.
 
         :param Module module: module to use for logging - apparently, the failure appeared
             when this module was running.
@@ -636,6 +951,25 @@ class Pipeline(LoggerMixin, object):
 
         self.glue.sentry_submit_exception(failure, logger=self.logger)
 
+        self._emit_event('failure', module=module.unique_name,
+                         exception=type(failure.exception).__name__ if failure.exception else None,
+                         message=str(failure.exception) if failure.exception else None,
+                         soft=failure.soft)
+
+        if self.glue.option('compact-failures'):
+            failure.compact()
+
+    def _init_module(self, step):
+        # type: (PipelineStep) -> Module
+        """
+        Create a module instance for a given pipeline step.
+
+        :param PipelineStep step: step to materialize.
+        :rtype: Module
+        """
+
+        return cast(Module, step.to_module(self.glue))
+
     def _setup(self):
         # type: () -> Optional[Failure]
 
@@ -645,7 +979,7 @@ class Pipeline(LoggerMixin, object):
         steps = self.steps[:]
 
         for step in steps:
-            module = step.to_module(self.glue)
+            module = self._init_module(step)
             self.modules.append(module)
 
         def _do_setup(module):
@@ -656,11 +990,19 @@ class Pipeline(LoggerMixin, object):
             module.parse_config()
 
             if isinstance(step, PipelineStepModule):
-                module.parse_args(step.argv)
+                # With options given as a mapping, there's no need to involve argument parser - unless there
+                # are some command-line arguments as well, then they are parsed first, and the mapping is
+                # applied on top of them.
+                if step.argv or step.options is None:
+                    module.parse_args(step.argv)
+
+                if step.options is not None:
+                    # pylint: disable=protected-access
+                    module._inject_options(step.options)
 
             module.check_dryrun()
 
-        return self._for_each_module(self.modules, _do_setup)
+        return self._for_each_module(self.modules, self._timed('setup', _do_setup))
 
     def _sanity(self):
         # type: () -> Optional[Failure]
@@ -682,7 +1024,102 @@ class Pipeline(LoggerMixin, object):
 
             return None
 
-        return self._for_each_module(self.modules, _do_sanity)
+        return self._for_each_module(self.modules, self._timed('sanity', self._profiled('sanity', _do_sanity)))
+
+    def _execute_incremental(self, store, module):
+        # type: (gluetool.incremental.IncrementalStore, Module) -> None
+        """
+        Execute a deterministic module, unless its inputs did not change since its last execution. In such case,
+        results of the last execution are restored instead, and module's ``execute`` is not called.
+
+        Results of a module are values returned by shared functions listed in :py:attr:`Module.deterministic_results`,
+        called without any arguments. Other shared functions are not called.
+
+        :param gluetool.incremental.IncrementalStore store: store of results.
+        :param Module module: module to execute.
+        """
+
+        # pylint: disable=no-self-use,cyclic-import
+        from .incremental import RestoredResult, fingerprint
+
+        key = fingerprint(module.incremental_inputs())
+
+        results = store.load(key)
+
+        if results is not None:
+            module.info('inputs did not change, skipping execution')
+            log_dict(module.debug, "restoring results of fingerprint '{}'".format(key), results)
+
+            # Shadow module's shared functions with their stored values - `add_shared` will then register these
+            # instead of the real methods.
+            for funcname, value in iteritems(results):
+                setattr(module, funcname, RestoredResult(funcname, value))
+
+            return
+
+        self._call_execute(module)
+
+        results = {
+            funcname: getattr(module, funcname)() for funcname in module.deterministic_results
+        }
+
+        store.save(key, results)
+
+    def _execute_timeout(self, module):
+        # type: (Module) -> Optional[float]
+        """
+        Find out the timeout of module's ``execute`` method, as declared by :py:attr:`Module.execute_timeout`.
+
+        :param Module module: module about to be executed.
+        :returns: the timeout in seconds, or ``None`` when the module has no timeout.
+        """
+
+        # pylint: disable=cyclic-import
+        from .timeouts import AdaptiveTimeout
+
+        policy = getattr(module, 'execute_timeout', None)
+
+        if policy is None:
+            return None
+
+        if isinstance(policy, AdaptiveTimeout):
+            if self.glue.run_history is None:
+                module.warn('adaptive execute timeout needs run history, enable it with --history')
+
+            timeout, reason = policy.resolve(module, self.glue.run_history)
+
+        else:
+            timeout, reason = policy, 'fixed'
+
+        if timeout is None:
+            module.info('execute timeout not set ({})'.format(reason))
+
+        else:
+            module.info('execute timeout set to {:.3f} seconds ({})'.format(timeout, reason))
+
+        return timeout
+
+    def _call_execute(self, module):
+        # type: (Module) -> None
+        """
+        Call module's ``execute`` method, in a worker process when the module asks for it, either
+        by :py:attr:`Module.execute_in_process`, or by being listed in ``--execute-in-process`` option.
+
+        :param Module module: module to execute.
+        """
+
+        # pylint: disable=cyclic-import
+        from .utils import normalize_multistring_option
+        from .worker import execute_in_process
+
+        in_process = getattr(module, 'execute_in_process', False) \
+            or module.unique_name in normalize_multistring_option(self.glue.option('execute-in-process'))
+
+        if in_process:
+            execute_in_process(module)
+
+        else:
+            module.execute()
 
     def _execute(self):
         # type: () -> Optional[Failure]
@@ -695,6 +1132,24 @@ class Pipeline(LoggerMixin, object):
             # The failure would then be propagated to `run()` method and it would represent the cause
             # that killed the pipeline.
 
+            # pylint: disable=cyclic-import
+            from .timeouts import Watchdog
+
+            incremental_store = self.glue.incremental_store
+
+            def _guarded_execute(module):
+                # type: (Module) -> None
+
+                # The watchdog lives inside `_safe_call` - should its timer fire late, right after `execute`
+                # finished, the exception may be delivered while leaving the watchdog, and it must become
+                # a failure as well.
+                with Watchdog(self._execute_timeout(module), label='module', logger=module.logger):
+                    if incremental_store is not None and module.deterministic:
+                        self._execute_incremental(incremental_store, module)
+
+                    else:
+                        self._call_execute(module)
+
             # pylint: disable=bad-continuation
             with Action(
                 'executing module',
@@ -703,8 +1158,11 @@ class Pipeline(LoggerMixin, object):
                 tags={
                     'unique-name': module.unique_name
                 }
+            ), self.glue.resource_scheduler.admit(
+                module.resources.get('execute'),
+                command_claims=module.resources.get('command')
             ):
-                failure = self._safe_call(module.execute)
+                failure = self._safe_call(_guarded_execute, module)
 
             if failure:
                 self._log_failure(module, failure, label='Exception raised')
@@ -714,7 +1172,10 @@ class Pipeline(LoggerMixin, object):
 
             return failure
 
-        return self._for_each_module(self.modules, _do_execute)
+        return self._for_each_module(
+            self.modules,
+            self._timed('execute', self._measured('execute', self._profiled('execute', _do_execute)))
+        )
 
     def _destroy(self, failure=None):
         # type: (Optional[Failure]) -> Optional[Failure]
@@ -763,13 +1224,31 @@ class Pipeline(LoggerMixin, object):
             # or genuine `Failure` instance, representing the cause that killed the destroy stage.
             return destroy_failure
 
-        final_failure = self._for_each_module(reversed(self.modules), _destroy)
+        final_failure = self._for_each_module(
+            reversed(self.modules),
+            self._timed('destroy', self._measured('destroy', self._profiled('destroy', _destroy)))
+        )
 
-        self.current_module = None
-        self.modules = []
+        self._release_modules()
 
         return final_failure
 
+    def _release_modules(self):
+        # type: () -> None
+        """
+        Drop references to destroyed modules held by the pipeline and the modules themselves, so their memory
+        can be reclaimed even when something - e.g. a failure - still refers to one of them.
+        """
+
+        for module in self.modules:
+            if isinstance(module, Module):
+                module._overloaded_shared_functions = {}
+
+        # Empty the lists in place - frames of a traceback of a failure may still refer to them.
+        self.current_module = None
+        del self.modules[:]
+        self.shared_functions.clear()
+
     def run(self):
         # type: () -> PipelineReturnType
         """
@@ -782,6 +1261,33 @@ class Pipeline(LoggerMixin, object):
             exception was raised during the stage, and ``Failure`` wraps it.
         """
 
+        self.started = time.time()
+
+        self._emit_event('pipeline-started', modules=len(self.steps))
+
+        outcome = None  # type: Optional[PipelineReturnType]
+
+        try:
+            outcome = self._run()
+
+            return outcome
+
+        finally:
+            self.finished = time.time()
+
+            self._emit_event('pipeline-finished', duration=self.finished - self.started,
+                             failed=outcome is None or outcome[0] is not None,
+                             destroy_failed=outcome is None or outcome[1] is not None)
+
+            if self.memory:
+                # pylint: disable=cyclic-import
+                from .memory import log_memory_report
+
+                log_memory_report(self.memory, self.logger)
+
+    def _run(self):
+        # type: () -> PipelineReturnType
+
         with Action('running pipeline', logger=self.logger) as self.action:
             log_dict(self.debug, 'running a pipeline', self.steps)
 
@@ -829,6 +1335,16 @@ class NamedPipeline(Pipeline):
 
         self.name = name
 
+    def _init_module(self, step):
+        # type: (PipelineStep) -> Module
+
+        module = super(NamedPipeline, self)._init_module(step)
+
+        # Tag module's messages with pipeline name as well - especially useful when more pipelines run concurrently.
+        module.attach_logger(PipelineAdapter(module.logger, self.name))
+
+        return module
+
 
 class ArgumentParser(argparse.ArgumentParser):
     """
@@ -838,8 +1354,86 @@ class ArgumentParser(argparse.ArgumentParser):
 
     The original prints (for us) useless message, including the program name, and raises ``SystemExit``
     exception. Such action does not provide necessary information when encountered in Sentry, for example.
+
+    Description and epilog of the parser may be callables, returning the actual texts - generating them
+    is often expensive, and this way it happens only when help is really formatted.
+
+    Parsers can be copied with :py:func:`copy.copy`, and the copy can be modified - options can be added
+    to it, or defaults changed - without affecting the original parser.
     """
 
+    def __copy__(self):
+        # type: () -> ArgumentParser
+        """
+        Create a copy of the parser, with its own actions, groups and defaults. Values held by actions,
+        e.g. their defaults or choices, are still shared by both parsers.
+        """
+
+        # pylint: disable=protected-access
+
+        clone = self.__class__.__new__(self.__class__)
+        clone.__dict__.update(self.__dict__)
+
+        actions = {
+            id(action): copy.copy(action) for action in self._actions
+        }
+
+        clone._registries = {
+            name: registry.copy() for name, registry in iteritems(self._registries)
+        }
+        clone._actions = [actions[id(action)] for action in self._actions]
+        clone._option_string_actions = {
+            option: actions[id(action)] for option, action in iteritems(self._option_string_actions)
+        }
+        clone._defaults = self._defaults.copy()
+        clone._has_negative_number_optionals = self._has_negative_number_optionals[:]
+        clone._mutually_exclusive_groups = []
+
+        # Groups share containers with the parser, they must use those of the copy.
+        containers = {id(self): clone}  # type: Dict[int, Any]
+
+        def _copy_group(group):
+            # type: (Any) -> Any
+
+            group_clone = copy.copy(group)
+            group_clone._group_actions = [actions[id(action)] for action in group._group_actions]
+
+            for name in ARGS_PARSER_SHARED_CONTAINERS:
+                setattr(group_clone, name, getattr(clone, name))
+
+            containers[id(group)] = group_clone
+
+            return group_clone
+
+        clone._action_groups = [_copy_group(group) for group in self._action_groups]
+
+        for group in self._mutually_exclusive_groups:
+            group_clone = _copy_group(group)
+            group_clone._container = containers[id(group._container)]
+
+            clone._mutually_exclusive_groups.append(group_clone)
+
+        clone._positionals = containers[id(self._positionals)]
+        clone._optionals = containers[id(self._optionals)]
+
+        # Recent Python versions let actions know their group, e.g. to remove them when resolving conflicts.
+        for action in itervalues(actions):
+            if hasattr(action, 'container'):
+                action.container = containers.get(id(action.container), action.container)
+
+        return clone
+
+    def format_help(self):
+        # type: () -> str
+
+        for name in ('description', 'epilog'):
+            value = getattr(self, name)
+
+            if callable(value):
+                setattr(self, name, value())
+
+        return super(ArgumentParser, self).format_help()
+
     def error(self, message):  # type: ignore  # incompatible with supertype because of unicode
         # type: (str) -> None
 
@@ -927,6 +1521,11 @@ class Configurable(LoggerMixin, object):
     it must be declared here to make pylint happy :/
     """
 
+    #: Argument parsers built by :py:meth:`_get_args_parser`, by class, identity of its options and arguments
+    #: of the parser. Each entry keeps the options it was built from, to detect a change of ``options`` attribute.
+    _args_parsers = {}  # type: Dict[Tuple[Any, ...], Tuple[Any, ArgumentParser, OptionTableType]]
+    _args_parsers_lock = threading.Lock()
+
     def __repr__(self):
         # type: () -> str
 
@@ -998,6 +1597,10 @@ class Configurable(LoggerMixin, object):
         def _verify_option(name, names, params):
             # type: (str, List[str], Dict[str, Any]) -> None
 
+            # Help texts in `params` are left intact - they are rendered by the help formatter, and only
+            # when help is actually requested, see :py:class:`gluetool.help.LineWrapRawTextHelpFormatter`.
+            # pylint: disable=unused-argument
+
             if isinstance(names, str):
                 self._config[name] = None
 
@@ -1013,13 +1616,6 @@ class Configurable(LoggerMixin, object):
             else:
                 _fail_name(name)
 
-            if 'help' not in params:
-                return
-
-            # Long help texts can be written using triple quotes and docstring-like
-            # formatting. Convert every help string to a single line string.
-            params['help'] = option_help(params['help'])
-
         def _verify_options(options, **kwargs):
             # type: (Dict[str, Dict[str, Any]], **Any) -> None
 
@@ -1029,6 +1625,21 @@ class Configurable(LoggerMixin, object):
 
         Configurable._for_each_option_group(_verify_options, self.options)
 
+    def _read_config(self, paths):
+        # type: (List[str]) -> Tuple[configparser.ConfigParser, List[str]]
+
+        # pylint: disable=no-self-use
+        """
+        Read configuration files.
+
+        :param list paths: List of paths to possible configuration files.
+        :returns: parser holding the configuration, and the list of files actually read.
+        """
+
+        parser = configparser.ConfigParser()
+
+        return parser, parser.read(paths)
+
     def _parse_config(self, paths):
         # type: (List[str]) -> None
 
@@ -1041,8 +1652,7 @@ class Configurable(LoggerMixin, object):
 
         log_dict(self.debug, 'Loading configuration from following paths', paths)
 
-        parser = configparser.ConfigParser()
-        parsed_paths = parser.read(paths)
+        parser, parsed_paths = self._read_config(paths)
 
         log_dict(self.debug, 'Read configuration files', parsed_paths)
 
@@ -1098,9 +1708,11 @@ class Configurable(LoggerMixin, object):
         def _add_option(parser, name, names, params):
             # type: (ArgumentParser, str, Tuple[str, ...], Dict[str, Any]) -> None
 
-            if params.get('raw', False) is True:
+            # Do not modify the declaration, the parser may be created again.
+            params = params.copy()
+
+            if params.pop('raw', False) is True:
                 final_names = (name,)  # type: Tuple[str, ...]
-                del params['raw']
 
             else:
                 if isinstance(names, str):
@@ -1130,27 +1742,91 @@ class Configurable(LoggerMixin, object):
 
         return root_parser
 
-    def _parse_args(self, args, **kwargs):
-        # type: (Any, **Any) -> None
-
+    @classmethod
+    def _get_args_parser(cls, **kwargs):
+        # type: (**Any) -> Tuple[ArgumentParser, OptionTableType]
         """
-        Parse command-line arguments. Uses :py:mod:`argparse` for the actual parsing.
-        Updates module's configuration store with values returned by parser.
+        Return an argument parser, and a flat list of options it was built from, as ``(name, names, params)``
+        tuples. Building the parser is expensive for classes with many options, therefore parsers are built once
+        per class, and reused by its instances. Each caller gets its own copy of the parser, with
+        presentation arguments - ``prog``, ``usage``, ``description``, ``epilog`` and ``formatter_class`` -
+        applied. The copy may be extended without affecting other callers, see :py:meth:`ArgumentParser.__copy__`.
+        ``description`` and ``epilog`` may be callables, called only when help is formatted,
+        see :py:meth:`ArgumentParser.format_help`.
 
-        :param list args: arguments passed to this module. Similar to what :py:data:`sys.argv` provides on
-          program level.
+        :param dict kwargs: Additional arguments passed to :py:class:`argparse.ArgumentParser`.
         """
 
-        self.debug('Loading configuration from command-line arguments')
+        presentation = {
+            name: kwargs.pop(name) for name in ARGS_PARSER_PRESENTATION if name in kwargs
+        }
 
-        # construct the parser
-        parser = self._create_args_parser(**kwargs)
+        def _build():
+            # type: () -> Tuple[ArgumentParser, OptionTableType]
 
-        # parse the added args
-        args = parser.parse_args(args)
+            parser = cls._create_args_parser(**kwargs)
+            table = []  # type: OptionTableType
 
-        # add the parsed args to options
-        def _inject_value(name, names, params):
+            def _add_options(options, **kwargs):
+                # type: (Any, **Any) -> None
+
+                # pylint: disable=unused-argument
+
+                Configurable._for_each_option(lambda *option: table.append(option), options)
+
+            Configurable._for_each_option_group(_add_options, cls.options)
+
+            return parser, table
+
+        try:
+            key = (cls, id(cls.options), tuple(sorted(iteritems(kwargs))))
+            hash(key)
+
+        # Some arguments, e.g. `parents`, cannot be hashed, and parsers using them are not cached.
+        except TypeError:
+            parser, table = _build()
+
+        else:
+            with Configurable._args_parsers_lock:
+                cached = Configurable._args_parsers.get(key)
+
+            if cached is not None and cached[0] is cls.options:
+                _, parser, table = cached
+
+            else:
+                parser, table = _build()
+
+                with Configurable._args_parsers_lock:
+                    Configurable._args_parsers[key] = (cls.options, parser, table)
+
+            parser = copy.copy(parser)
+
+        for name, value in iteritems(presentation):
+            setattr(parser, name, value)
+
+        return parser, table
+
+    def _parse_args(self, args, **kwargs):
+        # type: (Any, **Any) -> None
+
+        """
+        Parse command-line arguments. Uses :py:mod:`argparse` for the actual parsing.
+        Updates module's configuration store with values returned by parser.
+
+        :param list args: arguments passed to this module. Similar to what :py:data:`sys.argv` provides on
+          program level.
+        """
+
+        self.debug('Loading configuration from command-line arguments')
+
+        # construct the parser
+        parser, table = self._get_args_parser(**kwargs)
+
+        # parse the added args
+        args = parser.parse_args(args)
+
+        # add the parsed args to options
+        def _inject_value(name, names, params):
             # type: (str, Tuple[str, ...], Dict[str, Any]) -> None
 
             # pylint: disable=unused-argument
@@ -1180,6 +1856,159 @@ class Configurable(LoggerMixin, object):
             self._config[name] = value
             self.debug("Option '{}' set to '{}' by command-line".format(name, value))
 
+        for name, names, params in table:
+            _inject_value(name, names, params)
+
+    @staticmethod
+    def _convert_option_value(name, params, value, check_choices=True):
+        # type: (str, Dict[str, Any], Any, bool) -> Any
+
+        """
+        Convert a single value given to an option the way argument parser would do: apply option's ``type``
+        on string values, and make sure the value is one of option's ``choices``.
+
+        :param str name: name of the option.
+        :param dict params: option properties.
+        :param value: value to convert.
+        :param bool check_choices: if unset, the value is not checked against option's ``choices``. Argument
+            parser does not check defaults either.
+        :returns: converted value.
+        :raises gluetool.glue.GlueError: when the value cannot be converted, or it is not one of allowed choices.
+        """
+
+        if 'type' in params and isinstance(value, string_types):
+            try:
+                value = params['type'](value)
+
+            except ValueError as exc:
+                raise GlueError(
+                    "Value of option '{}' expected to be '{}' but cannot be parsed: '{}'".format(
+                        name,
+                        params['type'].__name__,
+                        str(exc)
+                    )
+                )
+
+        if check_choices and params.get('choices') is not None and value not in params['choices']:
+            raise GlueError("Value of option '{}' must be one of {}, '{}' found".format(
+                name, ', '.join(["'{}'".format(choice) for choice in params['choices']]), value
+            ))
+
+        return value
+
+    def _inject_options(self, options):
+        # type: (Dict[str, Any]) -> None
+
+        """
+        Update configuration store with values given as a mapping between option names and values, bypassing
+        the argument parser. Values are checked against options' declarations - types are applied, choices are
+        enforced, and options not mentioned in the mapping receive their defaults, just like they would when
+        parsing command-line arguments. Required options are checked later, by
+        :py:meth:`check_required_options`, just like with any other source of option values.
+
+        Any long name of an option can be used as a key.
+
+        :param dict(str, object) options: option names and their values.
+        :raises gluetool.glue.GlueError: when an unknown option is used, or its value is not valid.
+        """
+
+        self.debug('Loading configuration from options mapping')
+
+        # Map all long names of all options to the canonical name of the option.
+        aliases = {}  # type: Dict[str, str]
+
+        def _add_aliases(name, names, params):
+            # type: (str, Union[str, Tuple[str, ...]], Dict[str, Any]) -> None
+
+            # pylint: disable=unused-argument
+
+            for alias in ((names,) if isinstance(names, str) else names[1:]):
+                aliases[alias] = name
+
+        def _add_group_aliases(options, **kwargs):
+            # type: (Any, **Any) -> None
+
+            # pylint: disable=unused-argument
+
+            Configurable._for_each_option(_add_aliases, options)
+
+        Configurable._for_each_option_group(_add_group_aliases, self.options)
+
+        unknown_options = [key for key in iterkeys(options) if key not in aliases]
+
+        if unknown_options:
+            raise GlueError('Unknown option(s) {}'.format(', '.join(["'{}'".format(key) for key in unknown_options])))
+
+        values = {
+            aliases[key]: value for key, value in iteritems(options)
+        }
+
+        def _inject_value(name, names, params):
+            # type: (str, Tuple[str, ...], Dict[str, Any]) -> None
+
+            # pylint: disable=unused-argument
+
+            action = params.get('action', 'store')
+
+            if name not in values:
+                # Do not replace value set by config file, or by command-line, with a default.
+                if self._config.get(name, None) is not None:
+                    return
+
+                if 'default' in params:
+                    value = params['default']
+
+                    # Like argument parser, apply option's type on string defaults.
+                    if isinstance(value, string_types):
+                        value = Configurable._convert_option_value(name, params, value, check_choices=False)
+
+                elif action == 'store_true':
+                    value = False
+
+                elif action == 'store_false':
+                    value = True
+
+                else:
+                    return
+
+                self._config[name] = value
+                return
+
+            value = values[name]
+
+            if action in ('store_true', 'store_false'):
+                from .utils import normalize_bool_option
+
+                value = value if isinstance(value, bool) else normalize_bool_option(value)
+
+            elif action == 'store_const':
+                value = params.get('const') if value else params.get('default')
+
+            elif action == 'count':
+                # Number of times the option would be given on the command line.
+                value = Configurable._convert_option_value(name, {'type': int}, value)
+
+                if not isinstance(value, int):
+                    raise GlueError("Value of option '{}' expected to be 'int', '{}' found".format(name, value))
+
+                value = int(value)
+
+            elif action == 'append_const':
+                value = (list(params.get('default') or []) + [params.get('const')]) if value else params.get('default')
+
+            elif action == 'append' or params.get('nargs') in ('*', '+', argparse.REMAINDER) \
+                    or isinstance(params.get('nargs'), int):
+                if not isinstance(value, (list, tuple)):
+                    value = [value]
+
+                value = [Configurable._convert_option_value(name, params, item) for item in value]
+
+            else:
+                value = Configurable._convert_option_value(name, params, value)
+
+            self._config[name] = value
+            self.debug("Option '{}' set to '{}' by options mapping".format(name, value))
+
         def _inject_values(options, **kwargs):
             # type: (Any, **Any) -> None
 
@@ -1382,11 +2211,11 @@ class Configurable(LoggerMixin, object):
         return {}
 
 
-class CallbackModule(mock.MagicMock):  # type: ignore  # MagicMock has type Any, complains about inheriting from it
+class CallbackModule(LoggerMixin, object):
     """
-    Stand-in replacement for common :py:`Module` instances which does not represent any real module. We need it only
-    to simplify code pipeline code - it can keep working with ``Module``-like instances, since this class mocks each
-    and every method, but calls given ``callback`` in its ``execute`` method.
+    Stand-in replacement for common :py:class:`Module` instances which does not represent any real module. We need it
+    only to simplify pipeline code - it can keep working with ``Module``-like instances, since this class provides
+    each and every method pipeline calls, as no-ops, but calls given ``callback`` in its ``execute`` method.
 
     :param str name: name of the pseudo-module.
     :param Glue glue: ``Glue`` instance governing the pipeline this module is part of.
@@ -1396,49 +2225,94 @@ class CallbackModule(mock.MagicMock):  # type: ignore  # MagicMock has type Any,
     :param dict kwargs: passed to ``callback``.
     """
 
+    options = {}  # type: Dict[str, Any]
+    required_options = []  # type: List[str]
+    shared_functions = []  # type: List[str]
+
+    description = None  # type: Optional[str]
+    data_path = None  # type: Optional[str]
+
+    deterministic = False
+    resources = {}  # type: Dict[str, Dict[str, int]]
+
     def __init__(self, name, glue, callback, *args, **kwargs):
         # type: (str, Glue, Callable[..., None], *Any, **Any) -> None
 
-        super(CallbackModule, self).__init__()
-
         self.glue = glue
         self.name = self.unique_name = name
 
+        # `ModuleAdapter` needs just the `unique_name` attribute, which we do have.
+        super(CallbackModule, self).__init__(ModuleAdapter(glue.logger, self))  # type: ignore
+
         self._callback = callback
         self._args = args
         self._kwargs = kwargs
 
-    def _get_child_mock(self, **kw):
-        # type: (**Any) -> mock.MagicMock
+    def __repr__(self):
+        # type: () -> str
 
-        # The default implementation uses the same class it's member of, i.e. ``CallbackModule``. Too complicated,
-        # we're perfectly fine with child mocks being of ``MagicMock``.
+        return '<CallbackModule {}:{}>'.format(self.unique_name, id(self))
 
-        return mock.MagicMock(**kw)
+    @property
+    def eval_context(self):
+        # type: () -> Dict[str, Any]
 
-    def execute(self):
-        # type: () -> None
+        # pylint: disable-msg=no-self-use
+        return {}
 
-        self._callback(self.glue, *self._args, **self._kwargs)
+    def option(self, *names):
+        # type: (*str) -> Any
 
-    def sanity(self):
+        # pylint: disable-msg=no-self-use
+        return None if len(names) == 1 else tuple(None for _ in names)
+
+    def parse_config(self):
         # type: () -> None
 
         # pylint: disable-msg=no-self-use
         return None
 
-    def destroy(self, failure=None):
-        # type: (Optional[Failure]) -> None
+    def parse_args(self, args):
+        # type: (Any) -> None
 
         # pylint: disable-msg=no-self-use,unused-argument
         return None
 
+    def check_dryrun(self):
+        # type: () -> None
+
+        # pylint: disable-msg=no-self-use
+        return None
+
     def check_required_options(self):
         # type: () -> None
 
         # pylint: disable-msg=no-self-use
         return None
 
+    def add_shared(self):
+        # type: () -> None
+
+        # pylint: disable-msg=no-self-use
+        return None
+
+    def sanity(self):
+        # type: () -> None
+
+        # pylint: disable-msg=no-self-use
+        return None
+
+    def execute(self):
+        # type: () -> None
+
+        self._callback(self.glue, *self._args, **self._kwargs)
+
+    def destroy(self, failure=None):
+        # type: (Optional[Failure]) -> None
+
+        # pylint: disable-msg=no-self-use,unused-argument
+        return None
+
 
 class Module(Configurable):
     """
@@ -1463,6 +2337,58 @@ class Module(Configurable):
     shared_functions = []  # type: List[str]
     """Iterable of names of shared functions exported by the module."""
 
+    deterministic = False
+    """
+    If set, module's ``execute`` depends only on its options and inputs declared by ``incremental_*`` attributes,
+    and its results are the values of shared functions listed in :py:attr:`deterministic_results`. In the incremental
+    mode (``--incremental``), such module is not executed when its inputs did not change since its last execution,
+    and its results are restored instead. See :py:mod:`gluetool.incremental`.
+    """
+
+    deterministic_results = []  # type: List[str]
+    """
+    Names of shared functions whose values are results of a deterministic module. These are called without any
+    arguments after ``execute`` finishes, and their values are stored. When the module is skipped, these values
+    are provided instead - other shared functions are registered as usual, and they must not depend on ``execute``
+    being called.
+    """
+
+    incremental_environment = []  # type: List[str]
+    """Names of environment variables module's ``execute`` depends on."""
+
+    incremental_files = []  # type: List[str]
+    """
+    Files module's ``execute`` depends on. Each item is either a name of module's option whose value is a path,
+    or a path relative to module's data path.
+    """
+
+    incremental_shared = []  # type: List[str]
+    """
+    Names of shared functions, provided by modules running sooner in the pipeline, module's ``execute``
+    depends on. These are called without any arguments, and their return values become part of inputs.
+    """
+
+    execute_timeout = None  # type: Optional[Union[float, gluetool.timeouts.AdaptiveTimeout]]
+    """
+    If set, module's ``execute`` is interrupted when it does not finish in time. Either a number of seconds,
+    or a policy deriving the timeout from durations of past executions. See :py:mod:`gluetool.timeouts`.
+    """
+
+    execute_in_process = False
+    """
+    If set, module's ``execute`` runs in a child process, and can use another CPU core than the rest of
+    the pipeline. Shared functions called by ``execute`` run in the parent process, and attributes of the module
+    changed by ``execute`` are sent back to the parent. See :py:mod:`gluetool.worker`.
+    """
+
+    resources = {}  # type: Dict[str, Dict[str, int]]
+    """
+    Resource classes claimed by the module, and weights of the claims: ``execute`` key describes module's
+    ``execute`` method, ``command`` key describes external commands run via :py:class:`gluetool.utils.Command`,
+    and names of shared functions describe these functions, e.g. ``{'execute': {'cpu': 2}, 'command': {'disk': 1},
+    'fetch_build': {'api:koji': 1}}``. See :py:mod:`gluetool.resources`.
+    """
+
     def _paths_with_module(self, roots):
         # type: (List[str]) -> List[str]
 
@@ -1489,8 +2415,10 @@ class Module(Configurable):
         # initialize data path if exists, else it will be None
         self.data_path = None
 
+        config_index = self.glue.config_index
+
         for path in self._paths_with_module(self.glue.module_data_paths):
-            if not os.path.exists(path):
+            if not config_index.exists(path):
                 continue
 
             self.data_path = path
@@ -1508,11 +2436,84 @@ class Module(Configurable):
 
         return self.glue.dryrun_level
 
+    def _read_config(self, paths):
+        # type: (List[str]) -> Tuple[configparser.ConfigParser, List[str]]
+
+        # Modules share the index of configuration directories, see `gluetool.configindex`.
+        return self.glue.config_index.read(paths)
+
     def parse_config(self):
         # type: () -> None
 
         self._parse_config(self._paths_with_module(self.glue.module_config_paths))
 
+    def incremental_inputs(self):
+        # type: () -> Dict[str, Any]
+        """
+        Describe inputs of the module, as declared by its ``incremental_*`` attributes. Used to decide whether
+        a deterministic module needs to run again.
+
+        :rtype: dict
+        """
+
+        # pylint: disable=cyclic-import
+        from .incremental import hash_file
+        from . import version
+
+        try:
+            source_file = inspect.getsourcefile(type(self))
+
+        # Classes defined in C or created on the fly have no source file to tell their versions apart.
+        except TypeError:
+            source_file = None
+
+        files = {}  # type: Dict[str, Optional[str]]
+
+        for name in self.incremental_files:
+            if name in self._config:
+                path = self.option(name)
+
+            elif self.data_path is not None:
+                path = os.path.join(self.data_path, name)
+
+            else:
+                path = name
+
+            files[name] = hash_file(path) if path else None
+
+        return {
+            'class': '{}.{}'.format(self.__class__.__module__, self.__class__.__name__),
+            'name': self.unique_name,
+            # Changes of module's code or of gluetool may change the results as well.
+            'code': hash_file(source_file) if source_file else None,
+            'gluetool': getattr(version, '__version__', None),
+            'options': self._config,
+            'environment': {
+                name: os.getenv(name) for name in self.incremental_environment
+            },
+            'files': files,
+            'shared': {
+                name: self.shared(name) for name in self.incremental_shared
+            }
+        }
+
+    def options_fingerprint(self):
+        # type: () -> str
+        """
+        Reduce module's name and values of its options to a fingerprint. Used to tell apart runs of the same module
+        with different options, e.g. when deriving timeouts from durations of past runs.
+
+        :rtype: str
+        """
+
+        # pylint: disable=cyclic-import
+        from .incremental import fingerprint
+
+        return fingerprint({
+            'name': self.name,
+            'options': self._config
+        })
+
     def _generate_shared_functions_help(self):
         # type: () -> str
 
@@ -1545,8 +2546,25 @@ class Module(Configurable):
             ).render(FUNCTIONS=functions_help(functions))
         )
 
-    def parse_args(self, args):
-        # type: (Any) -> None
+    def _generate_help_description(self):
+        # type: () -> str
+
+        """
+        Generate description of the module for its command-line help.
+
+        :returns: Formatted module docstring.
+        """
+
+        return docstring_to_help(self.__doc__ or '')
+
+    def _generate_help_epilog(self):
+        # type: () -> str
+
+        """
+        Generate epilog of the module's command-line help - options note, shared functions and evaluation context.
+
+        :returns: Formatted epilog.
+        """
 
         epilog = [
             '' if self.options_note is None else docstring_to_help(self.options_note),
@@ -1554,11 +2572,17 @@ class Module(Configurable):
             eval_context_help(self)
         ]
 
+        return '\n'.join(epilog).strip()
+
+    def parse_args(self, args):
+        # type: (Any) -> None
+
+        # Description and epilog are expensive to generate, and needed only when help is shown.
         # pylint: disable=not-callable
         self._parse_args(args,
                          usage='{} [options]'.format(Colors.style(self.unique_name, fg='cyan')),
-                         description=docstring_to_help(self.__doc__ or ''),
-                         epilog='\n'.join(epilog).strip(),
+                         description=self._generate_help_description,
+                         epilog=self._generate_help_epilog,
                          formatter_class=LineWrapRawTextHelpFormatter)
 
     def add_shared(self):
@@ -1684,24 +2708,58 @@ class Module(Configurable):
           on provided information, e.g. send different notifications.
         """
 
-    def run_module(self, module, args=None):
-        # type: (str, Optional[List[str]]) -> PipelineReturnType
+    def run_module(self, module, args=None, options=None):
+        # type: (str, Optional[List[str]], Optional[Dict[str, Any]]) -> PipelineReturnType
 
-        return self.glue.run_module(module, args or [])
+        return self.glue.run_module(module, args or [], module_options=options)
 
 
 #: Describes one discovered ``gluetool`` module.
 #:
 #: :ivar Module klass: a module class.
 #: :ivar str group: group the module belongs to.
+#: :ivar callable eval_context_info: when called, returns information on module's evaluation context content,
+#:     extracted statically from its source parsed during discovery, or ``None`` when it was not possible
+#:     to extract it this way. See :py:func:`gluetool.help.extract_eval_context_info_from_ast`. The extraction
+#:     is postponed until the information is really needed, e.g. when listing modules' evaluation contexts.
 DiscoveredModule = NamedTuple('DiscoveredModule', (
     ('klass', Type[Module]),
-    ('group', str)
+    ('group', str),
+    ('eval_context_info', Optional[Callable[[], Optional[Dict[str, str]]]])
 ))
 
+# Not known unless the module was discovered in a file.
+DiscoveredModule.__new__.__defaults__ = (None,)  # type: ignore  # setting defaults of a named tuple
+
 #: Module registry type.
 ModuleRegistryType = Dict[str, DiscoveredModule]
 
+#: Features affecting calls of shared functions, resolved from Glue options. See :py:attr:`Glue._shared_calls`.
+#:
+#: :ivar gluetool.cassette.Cassette cassette: cassette recording and replaying calls, if enabled.
+#: :ivar gluetool.profiling.ModuleProfiler profiler: profiler of shared functions, if enabled.
+#: :ivar gluetool.callstats.SharedFunctionStats stats: statistics of calls, if enabled.
+#: :ivar gluetool.resources.ResourceScheduler scheduler: scheduler admitting calls, if any resource class
+#:     is limited.
+#: :ivar bool plain: if set, no feature is enabled, and shared functions are called directly.
+SharedCallsSetup = NamedTuple('SharedCallsSetup', (
+    ('cassette', Optional['gluetool.cassette.Cassette']),
+    ('profiler', Optional['gluetool.profiling.ModuleProfiler']),
+    ('stats', Optional['gluetool.callstats.SharedFunctionStats']),
+    ('scheduler', Optional['gluetool.resources.ResourceScheduler']),
+    ('plain', bool)
+))
+
+
+class _ThreadPipelines(threading.local):
+    # pylint: disable=too-few-public-methods
+    """
+    Pipeline stack of a thread running concurrent pipelines. Threads not running them have no stack,
+    and a class attribute serves them without a failed lookup of an instance attribute.
+    """
+
+    stack = None  # type: Optional[List[Pipeline]]
+
 
 class Glue(Configurable):
     # pylint: disable=too-many-public-methods
@@ -1818,28 +2876,277 @@ class Glue(Configurable):
                 'action': 'store_true'
             }
         }),
-        ('Directories', {
-            'module-path': {
-                'help': 'Specify directory with modules.',
-                'metavar': 'DIR',
-                'action': 'append',
-                'default': []
-            },
-            'module-data-path': {
-                'help': 'Specify directory with module data files.',
-                'metavar': 'DIR',
+        ('Directories', {
+            'module-path': {
+                'help': 'Specify directory with modules.',
+                'metavar': 'DIR',
+                'action': 'append',
+                'default': []
+            },
+            'module-data-path': {
+                'help': 'Specify directory with module data files.',
+                'metavar': 'DIR',
+                'action': 'append',
+                'default': []
+            },
+            'module-config-path': {
+                'help': 'Specify directory with module configuration files.',
+                'metavar': 'DIR',
+                'action': 'append',
+                'default': []
+            },
+            'module-entry-point': {
+                'help': 'Specify setuptools entry point for modules.',
+                'metavar': 'ENTRY-POINT',
+                'action': 'append',
+                'default': []
+            }
+        }),
+        ('Incremental runs', {
+            'incremental': {
+                'help': """
+                        Do not execute deterministic modules whose inputs did not change since their last execution,
+                        restore their results instead.
+                        """,
+                'action': 'store_true',
+                'default': False
+            },
+            'incremental-store': {
+                'help': 'Directory for storing results of deterministic modules (default: %(default)s).',
+                'metavar': 'DIR',
+                'default': None
+            }
+        }),
+        ('Artifact store', {
+            'artifact-store': {
+                'help': 'Directory of the store of artifacts shared by modules (default: %(default)s).',
+                'metavar': 'DIR',
+                'default': None
+            },
+            'artifact-store-size': {
+                'help': 'Maximal size of the artifact store, in MiB (default: %(default)s).',
+                'metavar': 'MIB',
+                'type': int,
+                'default': None
+            }
+        }),
+        ('Resource limits', {
+            'resource-limits': {
+                'help': """
+                        Comma-separated list of resource classes and their capacities, e.g. ``cpu=4,api:koji=10``.
+                        Work claiming a resource class is admitted only when its weight fits into the available
+                        capacity of the class.
+                        """,
+                'metavar': 'CLASS=CAPACITY,...',
+                'action': 'append',
+                'default': []
+            }
+        }),
+        ('Run history', {
+            'history': {
+                'help': 'Record every pipeline run in the history database.',
+                'action': 'store_true',
+                'default': False
+            },
+            'history-db': {
+                'help': 'Path to the history database (default: %(default)s).',
+                'metavar': 'FILE',
+                'default': None
+            },
+            'history-report': {
+                'help': """
+                        Show percentiles of module phase durations, and flag modules which got slower when
+                        compared with the preceding runs.
+                        """,
+                'action': 'store_true',
+                'default': False
+            }
+        }),
+        ('Event stream', {
+            'event-socket': {
+                'help': """
+                        Emit pipeline lifecycle events to this Unix datagram socket or FIFO. Events are dropped when
+                        there is no reader.
+                        """,
+                'metavar': 'PATH',
+                'default': None
+            }
+        }),
+        ('Work queue', {
+            'queue': {
+                'help': 'SQLite database serving as a queue of pipelines.',
+                'metavar': 'FILE',
+                'default': None
+            },
+            'enqueue': {
+                'help': 'Add the pipeline to the queue instead of running it.',
+                'action': 'store_true',
+                'default': False
+            },
+            'consume': {
+                'help': 'Run pipelines claimed from the queue.',
+                'action': 'store_true',
+                'default': False
+            },
+            'workers': {
+                'help': 'Number of pipelines to run concurrently when consuming the queue (default: %(default)s).',
+                'metavar': 'N',
+                'type': int,
+                'default': 1
+            },
+            'lease-timeout': {
+                'help': """
+                        Return jobs of crashed consumers to the queue when they were not seen for this many seconds
+                        (default: %(default)s).
+                        """,
+                'metavar': 'SECONDS',
+                'type': int,
+                'default': None
+            },
+            'max-attempts': {
+                'help': """
+                        Mark jobs as failed when they were claimed by crashed consumers this many times
+                        (default: %(default)s).
+                        """,
+                'metavar': 'N',
+                'type': int,
+                'default': None
+            },
+            'exit-when-empty': {
+                'help': 'Stop consuming the queue when there are no pending pipelines.',
+                'action': 'store_true',
+                'default': False
+            },
+            'queue-stats': {
+                'help': 'Show queue depth and throughput statistics.',
+                'action': 'store_true',
+                'default': False
+            }
+        }),
+        ('Failures', {
+            'compact-failures': {
+                'help': """
+                        Once logged and submitted to Sentry, replace tracebacks of failures with size-bounded
+                        snapshots, releasing stack frames and their local variables (default: %(default)s).
+                        """,
+                'action': 'store_true',
+                'default': False
+            }
+        }),
+        ('Profiling', {
+            'profile-modules': {
+                'help': """
+                        Profile sanity, execute and destroy of each module, and write the profiles into this
+                        directory, one per module and phase.
+                        """,
+                'metavar': 'DIR',
+                'default': None
+            },
+            'profile-shared': {
+                'help': 'With --profile-modules, profile shared functions as well (default: %(default)s).',
+                'action': 'store_true',
+                'default': False
+            },
+            'shared-stats': {
+                'help': """
+                        Record counts, errors and latency histograms of shared function calls, and report them
+                        when gluetool finishes (default: %(default)s).
+                        """,
+                'action': 'store_true',
+                'default': False
+            },
+            'profile-top': {
+                'help': 'Number of the most expensive functions to log when profiling (default: 30).',
+                'metavar': 'N',
+                'type': int,
+                'default': None
+            },
+            'stack-dump-signal': {
+                'help': """
+                        When this signal is received, log stacks of all threads, and start sampling them if
+                        --sampling-duration is set. Use an empty string to disable (default: SIGUSR2).
+                        """,
+                'metavar': 'SIGNAL',
+                'default': None
+            },
+            'sampling-interval': {
+                'help': 'Sample stacks every N milliseconds (default: 10).',
+                'metavar': 'N',
+                'type': int,
+                'default': None
+            },
+            'sampling-duration': {
+                'help': """
+                        When --stack-dump-signal is received, sample stacks for this many seconds, and write them
+                        into a collapsed stacks file for flame graph tools (default: %(default)s).
+                        """,
+                'metavar': 'SECONDS',
+                'type': float,
+                'default': None
+            },
+            'sampling-output': {
+                'help': """
+                        Path of the collapsed stacks file. {pid} and {time} are replaced by the process ID and
+                        the current time (default: gluetool-stacks-{pid}-{time}.collapsed).
+                        """,
+                'metavar': 'PATH',
+                'default': None
+            }
+        }),
+        ('Memory', {
+            'memory-accounting': {
+                'help': """
+                        Record memory usage before and after execute and destroy phases of each module, and report
+                        it when the pipeline finishes (default: %(default)s).
+                        """,
+                'action': 'store_true',
+                'default': False
+            },
+            'gc-strategy': {
+                'help': """
+                        How the garbage collector behaves during startup: default, threshold (less frequent
+                        collections), disable (no collections), or freeze (no collections, objects created during
+                        startup are frozen) (default: GLUETOOL_GC_STRATEGY environment variable, or default).
+                        """,
+                'metavar': 'STRATEGY',
+                'default': None
+            }
+        }),
+        ('Worker processes', {
+            'execute-in-process': {
+                'help': """
+                        Run execute method of these modules in child processes, making use of other CPU cores.
+                        Accepts comma-separated names, and can be used multiple times.
+                        """,
+                'metavar': 'MODULE,...',
                 'action': 'append',
                 'default': []
+            }
+        }),
+        ('Cassettes', {
+            'cassette': {
+                'help': """
+                        Cassette file to record shared function calls into, or to replay them from. See
+                        --record-shared and --replay-shared.
+                        """,
+                'metavar': 'PATH',
+                'default': None
             },
-            'module-config-path': {
-                'help': 'Specify directory with module configuration files.',
-                'metavar': 'DIR',
+            'record-shared': {
+                'help': """
+                        Record arguments and results of calls of these shared functions into the cassette.
+                        Accepts comma-separated names, and can be used multiple times.
+                        """,
+                'metavar': 'FUNCTION,...',
                 'action': 'append',
                 'default': []
             },
-            'module-entry-point': {
-                'help': 'Specify setuptools entry point for modules.',
-                'metavar': 'ENTRY-POINT',
+            'replay-shared': {
+                'help': """
+                        Serve calls of these shared functions from the cassette, without running modules
+                        providing them. Accepts comma-separated names, and can be used multiple times.
+                        """,
+                'metavar': 'FUNCTION,...',
                 'action': 'append',
                 'default': []
             }
@@ -1916,6 +3223,276 @@ class Glue(Configurable):
 
         return DEFAULT_MODULE_CONFIG_PATHS
 
+    @property
+    def config_index(self):
+        # type: () -> gluetool.configindex.ConfigIndex
+
+        """
+        Index of module configuration and data directories, see :py:mod:`gluetool.configindex`.
+        """
+
+        if self._config_index is None:
+            # pylint: disable=cyclic-import
+            from .configindex import ConfigIndex
+
+            self._config_index = ConfigIndex(logger=self.logger)
+
+        return self._config_index
+
+    @property
+    def incremental_store(self):
+        # type: () -> Optional[gluetool.incremental.IncrementalStore]
+
+        """
+        Store of results of deterministic modules, or ``None`` when incremental mode is not enabled.
+        """
+
+        from .utils import normalize_bool_option
+
+        if not normalize_bool_option(self.option('incremental')):
+            return None
+
+        if self._incremental_store is None:
+            # pylint: disable=cyclic-import
+            from .incremental import IncrementalStore, DEFAULT_INCREMENTAL_STORE
+
+            from .utils import normalize_path
+
+            path = normalize_path(self.option('incremental-store') or DEFAULT_INCREMENTAL_STORE)
+
+            self._incremental_store = IncrementalStore(path, logger=self.logger)
+
+        return self._incremental_store
+
+    @property
+    def event_stream(self):
+        # type: () -> Optional[gluetool.events.EventStream]
+
+        """
+        Stream of lifecycle events, or ``None`` when events are not emitted. See :py:mod:`gluetool.events`.
+        """
+
+        path = self.option('event-socket')
+
+        if not path:
+            return None
+
+        if self._event_stream is None:
+            # pylint: disable=cyclic-import
+            from .events import EventStream
+
+            from .utils import normalize_path
+
+            self._event_stream = EventStream(normalize_path(path), logger=self.logger)
+
+        return self._event_stream
+
+    def emit_event(self, event, **fields):
+        # type: (str, **Any) -> None
+        """
+        Emit a lifecycle event, when events are enabled by ``--event-socket`` option.
+
+        :param str event: name of the event.
+        :param fields: additional fields of the event.
+        """
+
+        event_stream = self.event_stream
+
+        if event_stream is not None:
+            event_stream.emit(event, **fields)
+
+    @property
+    def shared_function_stats(self):
+        # type: () -> Optional[gluetool.callstats.SharedFunctionStats]
+
+        """
+        Statistics of shared function calls, or ``None`` when they are not collected. See
+        :py:mod:`gluetool.callstats`.
+        """
+
+        if self._shared_function_stats is None:
+            if not self.option('shared-stats'):
+                return None
+
+            # pylint: disable=cyclic-import
+            from .callstats import SharedFunctionStats
+
+            self._shared_function_stats = SharedFunctionStats(logger=self.logger)
+
+        return self._shared_function_stats
+
+    @property
+    def cassette(self):
+        # type: () -> Optional[gluetool.cassette.Cassette]
+
+        """
+        Cassette recording and replaying shared function calls, or ``None`` when ``--cassette`` is not set.
+        See :py:mod:`gluetool.cassette`.
+        """
+
+        if self._cassette is None:
+            if not self.option('cassette'):
+                return None
+
+            # pylint: disable=cyclic-import
+            from .cassette import Cassette
+            from .utils import normalize_multistring_option, normalize_path
+
+            self._cassette = Cassette(
+                normalize_path(self.option('cassette')),
+                record=normalize_multistring_option(self.option('record-shared')),
+                replay=normalize_multistring_option(self.option('replay-shared')),
+                logger=self.logger
+            )
+
+        return self._cassette
+
+    @property
+    def _shared_calls(self):
+        # type: () -> SharedCallsSetup
+
+        """
+        Features affecting calls of shared functions. Shared functions are called very often, therefore options
+        are looked up just once, on the first call, and again only after options are parsed.
+        """
+
+        if self._shared_calls_setup is None:
+            cassette = self.cassette
+            profiler = self.module_profiler if self.option('profile-shared') else None
+            stats = self.shared_function_stats
+
+            # Without limits, the scheduler would admit everything immediately.
+            scheduler = self.resource_scheduler if self.resource_scheduler.classes else None
+
+            self._shared_calls_setup = SharedCallsSetup(
+                cassette=cassette,
+                profiler=profiler,
+                stats=stats,
+                scheduler=scheduler,
+                plain=cassette is None and profiler is None and stats is None and scheduler is None
+            )
+
+        return self._shared_calls_setup
+
+    @property
+    def module_profiler(self):
+        # type: () -> Optional[gluetool.profiling.ModuleProfiler]
+
+        """
+        Profiler of module phases, or ``None`` when profiling is not enabled. See :py:mod:`gluetool.profiling`.
+        """
+
+        directory = self.option('profile-modules')
+
+        if not directory:
+            return None
+
+        if self._module_profiler is None:
+            # pylint: disable=cyclic-import
+            from .profiling import ModuleProfiler
+            from .utils import normalize_path
+
+            self._module_profiler = ModuleProfiler(normalize_path(directory), logger=self.logger)
+
+        return self._module_profiler
+
+    @property
+    def run_history(self):
+        # type: () -> Optional[gluetool.history.RunHistory]
+
+        """
+        Database of pipeline runs, or ``None`` when recording of runs is not enabled. See :py:mod:`gluetool.history`.
+        """
+
+        from .utils import normalize_bool_option
+
+        if not normalize_bool_option(self.option('history')):
+            return None
+
+        if self._run_history is None:
+            # pylint: disable=cyclic-import
+            from .history import RunHistory, DEFAULT_HISTORY_DB
+
+            from .utils import normalize_path
+
+            self._run_history = RunHistory(
+                normalize_path(self.option('history-db') or DEFAULT_HISTORY_DB),
+                logger=self.logger
+            )
+
+        return self._run_history
+
+    @property
+    def resource_scheduler(self):
+        # type: () -> gluetool.resources.ResourceScheduler
+
+        """
+        Scheduler admitting work through resource classes. See :py:mod:`gluetool.resources`.
+        """
+
+        if self._resource_scheduler is None:
+            # pylint: disable=cyclic-import
+            from .resources import ResourceScheduler, parse_limits
+
+            from .utils import normalize_multistring_option
+
+            self._resource_scheduler = ResourceScheduler(
+                limits=parse_limits(normalize_multistring_option(self.option('resource-limits'))),
+                logger=self.logger
+            )
+
+        return self._resource_scheduler
+
+    def _artifact_store(self):
+        # type: () -> gluetool.artifacts.ArtifactStore
+        """
+        Return the store of artifacts. Modules can use it to pass large files between each other, and to avoid
+        downloading the same artifacts over and over again. See :py:mod:`gluetool.artifacts` for details.
+
+        Provided as a shared function, registered by the Glue instance itself.
+
+        :rtype: gluetool.artifacts.ArtifactStore
+        """
+
+        if self._artifact_store_instance is None:
+            # pylint: disable=cyclic-import
+            from .artifacts import ArtifactStore, DEFAULT_ARTIFACT_STORE, DEFAULT_ARTIFACT_STORE_SIZE
+
+            from .utils import normalize_path
+
+            max_size = self.option('artifact-store-size')
+
+            self._artifact_store_instance = ArtifactStore(
+                normalize_path(self.option('artifact-store') or DEFAULT_ARTIFACT_STORE),
+                max_size=max_size * 1024 * 1024 if max_size else DEFAULT_ARTIFACT_STORE_SIZE,
+                owner=lambda: self.current_pipeline,
+                logger=self.logger
+            )
+
+        return self._artifact_store_instance
+
+    def _shared_memory(self):
+        # type: () -> gluetool.shm.SharedMemoryRegistry
+        """
+        Return the registry of shared memory blocks. Modules can use it to pass large data to each other without
+        copying it. See :py:mod:`gluetool.shm` for details.
+
+        Provided as a shared function, registered by the Glue instance itself.
+
+        :rtype: gluetool.shm.SharedMemoryRegistry
+        """
+
+        if self._shared_memory_registry is None:
+            # pylint: disable=cyclic-import
+            from .shm import SharedMemoryRegistry
+
+            self._shared_memory_registry = SharedMemoryRegistry(
+                owner=lambda: self.current_pipeline,
+                logger=self.logger
+            )
+
+        return self._shared_memory_registry
+
     # pylint: disable=method-hidden
     def sentry_submit_exception(self, *args, **kwargs):
         # type: (*Any, **Any) -> None
@@ -1963,6 +3540,11 @@ class Glue(Configurable):
         :rtype: bool
         """
 
+        cassette = self._shared_calls.cassette
+
+        if cassette is not None and cassette.replays(funcname):
+            return True
+
         # Check all running pieplines, start with the most recent one.
 
         for pipeline in reversed(self.pipelines):
@@ -2009,11 +3591,30 @@ class Glue(Configurable):
         :returns: a callable (shared function), or ``None`` if no such shared function exists.
         """
 
+        entry = self._get_shared_entry(funcname)
+
+        return entry[1] if entry is not None else None
+
+    def _get_shared_entry(self, funcname):
+        # type: (str) -> Optional[Tuple[Configurable, SharedType]]
+        """
+        Return a shared function and the module providing it.
+
+        :param str funcname: name of the shared function.
+        :returns: a tuple of module and callable (shared function), or ``None`` if no such shared function exists.
+        """
+
+        cassette = self._shared_calls.cassette
+
+        # Replayed functions are served by the cassette, even when a module providing them is present.
+        if cassette is not None and cassette.replays(funcname):
+            return self, partial(cassette.replay, funcname)
+
         # Check all running pieplines, start with the most recent one.
 
         for pipeline in reversed(self.pipelines):
             if pipeline.has_shared(funcname):
-                return pipeline.get_shared(funcname)
+                return pipeline.shared_functions[funcname]
 
         return None
 
@@ -2023,12 +3624,64 @@ class Glue(Configurable):
         Call a shared function, passing it all positional and keyword arguments.
         """
 
-        func = self.get_shared(funcname)
+        setup = self._shared_calls
+
+        # Nothing to wrap the call with - find the function and call it, as fast as possible.
+        if setup.plain:
+            for pipeline in reversed(self.pipelines):
+                if funcname in pipeline.shared_functions:
+                    return pipeline.shared_functions[funcname][1](*args, **kwargs)
+
+            return None
+
+        entry = self._get_shared_entry(funcname)
 
-        if not func:
+        if entry is None:
             return None
 
-        return func(*args, **kwargs)
+        module, func = entry
+
+        provider = getattr(module, 'unique_name', None) or getattr(module, 'name', None) or '<unknown>'
+        resources = getattr(module, 'resources', {})
+
+        call = partial(func, *args, **kwargs)
+
+        cassette = setup.cassette
+
+        if cassette is not None and cassette.records(funcname):
+            call = partial(cassette.record, funcname, args, kwargs, call)
+
+        profiler = setup.profiler
+
+        if profiler is not None:
+            call = partial(self._call_profiled, profiler, provider, 'shared.{}'.format(funcname), call)
+
+        shared_function_stats = setup.stats
+
+        if shared_function_stats is not None:
+            pipelines = self.pipelines
+            current_module = pipelines[-1].current_module if pipelines else None
+
+            call = partial(
+                shared_function_stats.call,
+                funcname,
+                provider,
+                current_module.unique_name if current_module is not None else None,
+                call
+            )
+
+        if setup.scheduler is None:
+            return call()
+
+        with setup.scheduler.admit(resources.get(funcname), command_claims=resources.get('command')):
+            return call()
+
+    @staticmethod
+    def _call_profiled(profiler, module_name, phase, call):
+        # type: (gluetool.profiling.ModuleProfiler, str, str, Callable[[], Any]) -> Any
+
+        with profiler.profile(module_name, phase):
+            return call()
 
     @property
     def eval_context(self):
@@ -2112,6 +3765,23 @@ class Glue(Configurable):
 
         return context
 
+    @property
+    def pipelines(self):
+        # type: () -> List[Pipeline]
+        """
+        Stack of pipelines, the most recent one being the last one. Threads running concurrent pipelines
+        have their own stacks, see :py:meth:`run_pipelines`.
+
+        :rtype: list(Pipeline)
+        """
+
+        stack = self._thread_pipelines.stack
+
+        if stack is None:
+            return self._pipelines
+
+        return stack
+
     @property
     def current_pipeline(self):
         # type: () -> Pipeline
@@ -2127,8 +3797,8 @@ class Glue(Configurable):
     #
     # Module discovery and loading
     #
-    def _register_module(self, registry, group_name, klass, filepath):
-        # type: (ModuleRegistryType, str, Type[Module], str) -> None
+    def _register_module(self, registry, group_name, klass, filepath, eval_context_info=None):
+        # type: (ModuleRegistryType, str, Type[Module], str, Optional[Callable[[], Optional[Dict[str, str]]]]) -> None
         """
         Register one discovered ``gluetool`` module.
 
@@ -2136,6 +3806,8 @@ class Glue(Configurable):
         :param str group_name: group the module belongs to.
         :param Module klass: module class.
         :param str filepath: path to a file module comes from.
+        :param callable eval_context_info: if set, returns information on module's evaluation context content
+            when called.
         """
 
         names = getattr(klass, 'name', None)  # type: Union[None, List[str], Tuple[str]]
@@ -2153,7 +3825,7 @@ class Glue(Configurable):
 
             self.debug("registering module '{}' from {}:{}".format(name, filepath, klass.__name__))
 
-            registry[name] = DiscoveredModule(klass, group_name)
+            registry[name] = DiscoveredModule(klass, group_name, eval_context_info)
 
         if isinstance(names, (list, tuple)):
             for alias in names:
@@ -2162,8 +3834,8 @@ class Glue(Configurable):
         else:
             _do_register_module(names)
 
-    def _check_pm_file(self, filepath):
-        # type: (str) -> bool
+    def _check_pm_file(self, filepath, node=None):
+        # type: (str, Optional[ast.Module]) -> bool
 
         """
         Make sure a file looks like a ``gluetool`` module:
@@ -2173,6 +3845,7 @@ class Glue(Configurable):
         - contains child class of :py:class:`gluetool.glue.Module`.
 
         :param str filepath: path to a file.
+        :param ast.Module node: parsed content of the file. If not set, the file is read and parsed.
         :returns: ``True`` if file contains ``gluetool`` module, ``False`` otherwise.
         :raises gluetool.glue.GlueError: when it's not possible to finish the check.
         """
@@ -2180,8 +3853,9 @@ class Glue(Configurable):
         self.debug("check possible module file '{}'".format(filepath))
 
         try:
-            with open(filepath) as f:
-                node = ast.parse(f.read())
+            if node is None:
+                with open(filepath) as f:
+                    node = ast.parse(f.read())
 
             # check for gluetool import
             def imports_gluetool(item):
@@ -2259,8 +3933,8 @@ class Glue(Configurable):
         except Exception as exc:
             raise GlueError("Unable to import file '{}' as a module: {}".format(filepath, exc))
 
-    def _import_pm(self, filepath, pm_name):
-        # type: (str, str) -> Any
+    def _import_pm(self, filepath, pm_name, node=None):
+        # type: (str, str, Optional[ast.Module]) -> Any
         """
         If a file contains ``gluetool`` modules, import the file as a Python module. If the file does not look
         like it contains ``gluetool`` modules, or when it's not possible to import the Python module successfully,
@@ -2268,13 +3942,14 @@ class Glue(Configurable):
 
         :param str filepath: file to load.
         :param str pm_name: Python module name for the loaded module.
+        :param ast.Module node: parsed content of the file, if available.
         :returns: loaded Python module.
         :raises gluetool.glue.GlueError: when import failed.
         """
 
         # Check content of the file, look for Glue and Module stuff.
         try:
-            if not self._check_pm_file(filepath):
+            if not self._check_pm_file(filepath, node=node):
                 return
 
         except GlueError as exc:
@@ -2308,11 +3983,50 @@ class Glue(Configurable):
             in the file.
         """
 
-        pm = self._import_pm(filepath, pm_name)
+        # Parse the file just once - the content is checked before importing, and it is a source
+        # of information on modules' evaluation contexts as well.
+        try:
+            with open(filepath) as f:
+                node = ast.parse(f.read())  # type: Optional[ast.Module]
+
+        # Leave reporting of the problem to the check of the file.
+        # pylint: disable=broad-except
+        except Exception:
+            node = None
+
+        pm = self._import_pm(filepath, pm_name, node=node)
 
         if not pm:
             return
 
+        # Extracting eval context info is not for free, and it is rarely needed - keep the parsed source,
+        # and extract the info (for all classes in the file at once) only when it's asked for.
+        eval_context_info = {}  # type: Dict[str, Dict[str, Dict[str, str]]]
+
+        def _file_eval_context_info():
+            # type: () -> Dict[str, Dict[str, str]]
+
+            if 'info' not in eval_context_info:
+                eval_context_info['info'] = {} if node is None \
+                    else extract_eval_context_info_from_ast(node, logger=self.logger)
+
+            return eval_context_info['info']
+
+        def _module_eval_context_info(klass):
+            # type: (Type[Module]) -> Optional[Dict[str, str]]
+
+            # Find the class providing module's eval context - it may have been inherited.
+            owner = [owner for owner in klass.__mro__ if 'eval_context' in vars(owner)][0]
+
+            if owner is Configurable:
+                return {}
+
+            # Static information is available only for classes defined in this very file.
+            if owner.__module__ != pm.__name__:
+                return None
+
+            return _file_eval_context_info().get(owner.__name__)
+
         # Look for gluetool modules in imported Python module's members, and register them.
         for _, member in inspect.getmembers(pm, inspect.isclass):
             if not isinstance(member, type) or not issubclass(member, Module) or member == Module:
@@ -2320,7 +4034,8 @@ class Glue(Configurable):
 
             assert issubclass(member, Module)
 
-            self._register_module(registry, group_name, member, filepath)
+            self._register_module(registry, group_name, member, filepath,
+                                  eval_context_info=partial(_module_eval_context_info, member))
 
     def _discover_gm_in_dir(self, dirpath, registry, pm_prefix):
         # type: (str, ModuleRegistryType, str) -> None
@@ -2425,16 +4140,33 @@ class Glue(Configurable):
 
         self._dryrun_level = DryRunLevels.DEFAULT
 
+        self._config_index = None  # type: Optional[gluetool.configindex.ConfigIndex]
+        self._incremental_store = None  # type: Optional[gluetool.incremental.IncrementalStore]
+        self._artifact_store_instance = None  # type: Optional[gluetool.artifacts.ArtifactStore]
+        self._shared_memory_registry = None  # type: Optional[gluetool.shm.SharedMemoryRegistry]
+        self._resource_scheduler = None  # type: Optional[gluetool.resources.ResourceScheduler]
+        self._run_history = None  # type: Optional[gluetool.history.RunHistory]
+        self._event_stream = None  # type: Optional[gluetool.events.EventStream]
+        self._module_profiler = None  # type: Optional[gluetool.profiling.ModuleProfiler]
+        self._shared_function_stats = None  # type: Optional[gluetool.callstats.SharedFunctionStats]
+        self._cassette = None  # type: Optional[gluetool.cassette.Cassette]
+        self._shared_calls_setup = None  # type: Optional[SharedCallsSetup]
+
         # module types dictionary
         self.modules = {}  # type: ModuleRegistryType
 
         # Pipeline stack - start with a mock pipeline: we need a place to register our shared functions.
-        self.pipelines = [
+        self._pipelines = [
             Pipeline(self, [])
         ]
 
+        # Pipeline stacks of threads running concurrent pipelines, see `run_pipelines`.
+        self._thread_pipelines = _ThreadPipelines()
+
         # pylint: disable=protected-access
         self.current_pipeline._add_shared('eval_context', self, self._eval_context)
+        self.current_pipeline._add_shared('artifact_store', self, self._artifact_store)
+        self.current_pipeline._add_shared('shared_memory', self, self._shared_memory)
 
     # pylint: disable=arguments-differ
     def parse_config(self, paths):  # type: ignore  # signature differs on purpose
@@ -2442,6 +4174,8 @@ class Glue(Configurable):
 
         self._parse_config(paths)
 
+        self._shared_calls_setup = None
+
     def parse_args(self, args):
         # type: (Any) -> None
 
@@ -2467,6 +4201,7 @@ class Glue(Configurable):
 
         * GLUETOOL_CONFIG_PATHS (string) - colon-separated list of gluetool configuration directories
         * GLUETOOL_MODULE_CONFIG_PATHS (string) - colon-separated list of gluetool modules configuration directories
+        * GLUETOOL_HELP_CACHE (string) - file caching rendered help texts, empty string disables the cache
         * GLUETOOL_TRACING_DISABLE - when set, tracing won't be enabled
         * GLUETOOL_TRACING_SERVICE_NAME (string) - name of the trace produced by tool execution
         * GLUETOOL_TRACING_REPORTING_HOST (string) - a hostname where tracing collector listens
@@ -2478,6 +4213,8 @@ class Glue(Configurable):
                          epilog=epilog,
                          formatter_class=LineWrapRawTextHelpFormatter)
 
+        self._shared_calls_setup = None
+
         # re-create logger - now we have all necessary configuration
         if self.option('verbose'):
             level = VERBOSE
@@ -2556,19 +4293,141 @@ class Glue(Configurable):
 
         self.pipelines.append(pipeline)
 
+        outcome = None  # type: Optional[PipelineReturnType]
+
+        run_history = self.run_history
+        rss_baseline = None  # type: Optional[int]
+
+        if run_history is not None:
+            # pylint: disable=cyclic-import
+            from .history import peak_rss
+
+            rss_baseline = peak_rss()
+
         try:
-            return pipeline.run()
+            outcome = pipeline.run()
+
+            return outcome
 
         finally:
             self.pipelines.pop(-1)
 
+            if run_history is not None:
+                try:
+                    run_history.record(pipeline, outcome, rss_baseline=rss_baseline)
+
+                # Failing to record the run must not affect the pipeline itself.
+                # pylint: disable=broad-except
+                except Exception as exc:
+                    self.warn('Cannot record pipeline run in history: {}'.format(exc))
+
+            # Artifacts used by the pipeline are no longer needed by it, and its modules have been destroyed,
+            # therefore no one should be using shared memory blocks the pipeline published.
+            if self._artifact_store_instance is not None:
+                self._artifact_store_instance.release(pipeline)
+
+            if self._shared_memory_registry is not None:
+                self._shared_memory_registry.release(pipeline)
+
+            # Save recorded calls once the outermost pipeline finishes - only the mock pipeline, holding Glue's
+            # own shared functions, remains. Nested pipelines may still call shared functions of their parents.
+            if self._cassette is not None and len(self.pipelines) == 1:
+                try:
+                    self._cassette.save()
+
+                except (IOError, OSError) as exc:
+                    self.warn("Cannot save cassette '{}': {}".format(self._cassette.path, exc))
+
+    def _thread_context(self):
+        # type: () -> Tuple[List[Pipeline], Optional[Action]]
+        """
+        Capture the current pipeline stack and action, to be inherited by pipelines running in other threads.
+        See :py:meth:`_run_pipeline_in_thread`.
+        """
+
+        try:
+            parent_action = Action.current_action()  # type: Optional[Action]
+
+        except RuntimeError:
+            parent_action = None
+
+        return self.pipelines[:], parent_action
+
+    def _run_pipeline_in_thread(self, pipeline, parent_stack, parent_action):
+        # type: (Pipeline, List[Pipeline], Optional[Action]) -> PipelineReturnType
+        """
+        Run a pipeline in a thread other than the main one, on top of a given pipeline stack.
+
+        :param Pipeline pipeline: pipeline to run.
+        :param list(Pipeline) parent_stack: pipelines whose shared functions are available to the pipeline.
+        :param Action parent_action: if set, it becomes the root action of the thread.
+        """
+
+        self._thread_pipelines.stack = parent_stack[:]
+
+        if parent_action is not None:
+            Action.set_thread_root(parent_action)
+
+        try:
+            return self.run_pipeline(pipeline)
+
+        # pylint: disable=broad-except
+        except Exception:
+            return Failure(module=pipeline.current_module, exc_info=sys.exc_info()), None
+
+        finally:
+            self._thread_pipelines.stack = None
+
+    def run_pipelines(self, pipelines):
+        # type: (List[Pipeline]) -> List[PipelineReturnType]
+        """
+        Run multiple pipelines concurrently, each in its own thread, and wait for all of them to finish.
+
+        Each pipeline gets its own shared function registry, layered on top of the registries of the current
+        pipeline stack - modules of a pipeline can use shared functions of its parents, but they cannot see
+        shared functions of their siblings. Use :py:class:`NamedPipeline` to have log messages of each pipeline
+        tagged with its name.
+
+        :param list(Pipeline) pipelines: pipelines to run.
+        :rtype: list(tuple(Failure, Failure))
+        :returns: list of pipeline outcomes, in the same order as ``pipelines``. See :py:meth:`Pipeline.run`.
+        """
+
+        # Avoid circullar imports
+        # pylint: disable=cyclic-import
+        from .utils import WorkerThread
+
+        parent_stack, parent_action = self._thread_context()
+
+        threads = [
+            WorkerThread(
+                self.logger,
+                self._run_pipeline_in_thread,
+                fn_args=(pipeline, parent_stack, parent_action),
+                name=getattr(pipeline, 'name', 'pipeline-{}'.format(index))
+            )
+            for index, pipeline in enumerate(pipelines)
+        ]
+
+        log_dict(self.debug, 'running pipelines concurrently', pipelines)
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        return [
+            cast(PipelineReturnType, thread.result) for thread in threads
+        ]
+
     def run_modules(self, steps):
         # type: (PipelineStepsType) -> PipelineReturnType
 
         return self.run_pipeline(Pipeline(self, steps))
 
-    def run_module(self, module_name, module_argv=None, actual_module_name=None):
-        # type: (str, Optional[List[str]], Optional[str]) -> PipelineReturnType
+    def run_module(self, module_name, module_argv=None, actual_module_name=None, module_options=None):
+        # type: (str, Optional[List[str]], Optional[str], Optional[Dict[str, Any]]) -> PipelineReturnType
 
         """
         Syntax sugar for :py:meth:`run_modules`, in the case you want to run just a one-shot module.
@@ -2579,9 +4438,12 @@ class Glue(Configurable):
             ``module_name`` - ``actual_module_name`` refers to the list of known ``gluetool`` modules
             while ``module_name`` is basically an arbitrary name new instance calls itself. If it's
             not set, which is the most common situation, it defaults to ``module_name``.
+        :param dict(str, object) module_options: Options of the module, as a mapping between option names
+            and their values. See :py:class:`PipelineStepModule`.
         """
 
-        step = PipelineStepModule(module_name, actual_module=actual_module_name, argv=module_argv)
+        step = PipelineStepModule(module_name, actual_module=actual_module_name, argv=module_argv,
+                                  options=module_options)
 
         return self.run_modules([step])
 
@@ -10,18 +10,16 @@ separated in their own file to keep things clean.
 
 import argparse
 import ast
+import atexit
+import hashlib
 import inspect
+import json
 import os
 import sys
+import tempfile
 import textwrap
-
-import docutils.core
-import docutils.nodes
-import docutils.parsers.rst
-import docutils.writers
-import sphinx.writers.text
-import sphinx.locale
-import sphinx.util.nodes
+import threading
+import time
 
 import six
 from six import PY2, ensure_str, iteritems
@@ -31,16 +29,12 @@ from .log import Logging
 
 # Type annotations
 # pylint: disable=unused-import, wrong-import-order
-from typing import TYPE_CHECKING, cast, Any, Callable, Dict, List, Optional, Tuple, Union  # noqa
+from typing import TYPE_CHECKING, cast, Any, Callable, Dict, List, Optional, Set, Tuple, Union  # noqa
 
 if TYPE_CHECKING:
     import gluetool  # noqa
     import gluetool.glue  # noqa
 
-
-# Initialize Sphinx locale settings
-sphinx.locale.init([os.path.split(sphinx.locale.__file__)], None)
-
 # If not told otherwise, the default maximal length of lines is this many columns.
 DEFAULT_WIDTH = 120
 
@@ -54,8 +48,28 @@ except (KeyError, ValueError):
 # Crop the maximal width to account for various explicit indents.
 CROP_WIDTH = WIDTH - 10
 
-# Tell Sphinx to render text into a slightly narrower space to account for some indenting
-sphinx.writers.text.MAXWIDTH = CROP_WIDTH
+#: Rendered option help texts, by their raw texts, widths and whether colors were enabled, like keys
+#: of :py:class:`HelpCache`. See :py:func:`option_help`.
+_OPTION_HELP_CACHE = {}  # type: Dict[Tuple[str, int, bool], str]
+
+# Docutils and Sphinx are needed only when help is actually shown, and importing and setting them up
+# is not cheap. They are imported and set up on the first use, by :py:func:`_setup_rst`.
+_RST_SETUP_LOCK = threading.Lock()
+_RST_READY = False
+
+#: Default path of the persistent cache of rendered help texts. ``GLUETOOL_HELP_CACHE`` environment variable
+#: can be used to change it, setting the variable to an empty string disables the cache.
+DEFAULT_HELP_CACHE = os.path.join(
+    os.getenv('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+    'gluetool',
+    'help.json'
+)
+
+#: Maximal number of entries of the persistent cache of rendered help texts.
+DEFAULT_HELP_CACHE_SIZE = 5000
+
+#: The persistent cache of rendered help texts, created on the first use. See :py:func:`help_cache`.
+_HELP_CACHE = None  # type: Optional[HelpCache]
 
 
 FUNCTIONS_HELP_TEMPLATE = """
@@ -101,50 +115,53 @@ def C_LITERAL(text):
     return Colors.style(text, fg='cyan', reset=True)
 
 
-# Our custom TextTranslator which does the same as Sphinx' original but colorizes some of the text bits.
-#
-# We must save a reference to the original class because we must use it when calling parent's __init__,
-# since we cannot use "sphinx.writers.text.TextTranslator" - when we try to call
-# sphinx.writers.text.TextTranslator.__init__, it's already set to our custom class => recursion...
+def _create_text_translator(original):
+    # type: (Any) -> Any
 
-# pylint: disable=invalid-name
-_original_TextTranslator = sphinx.writers.text.TextTranslator
+    """
+    Create our custom ``TextTranslator`` which does the same as Sphinx' original but colorizes some
+    of the text bits.
 
+    We must keep a reference to the original class because we must use it when calling parent's methods,
+    since we cannot use "sphinx.writers.text.TextTranslator" - it's already set to our custom class
+    => recursion...
 
-# pylint: disable=abstract-method
-class TextTranslator(sphinx.writers.text.TextTranslator):  # type: ignore  # no type info in TextTranslator
-    # literals, ``foo``
-    def visit_literal(self, node):
-        # type: (Any) -> None
+    :param original: the original ``sphinx.writers.text.TextTranslator`` class.
+    """
 
-        # pylint: disable=not-callable
-        self.add_text(Colors.style('', fg='cyan', reset=False))
+    # pylint: disable=abstract-method
+    class TextTranslator(original):  # type: ignore  # no type info in TextTranslator
+        # literals, ``foo``
+        def visit_literal(self, node):
+            # type: (Any) -> None
 
-    def depart_literal(self, node):
-        # type: (Any) -> None
+            # pylint: disable=not-callable
+            self.add_text(Colors.style('', fg='cyan', reset=False))
 
-        # pylint: disable=not-callable
-        self.add_text(Colors.style('', reset=True))
+        def depart_literal(self, node):
+            # type: (Any) -> None
 
-    # "fields" are used to represent (shared) function parameters
-    def visit_field_name(self, node):
-        # type: (Any) -> None
+            # pylint: disable=not-callable
+            self.add_text(Colors.style('', reset=True))
 
-        _original_TextTranslator.visit_field_name(self, node)
+        # "fields" are used to represent (shared) function parameters
+        def visit_field_name(self, node):
+            # type: (Any) -> None
 
-        # pylint: disable=not-callable
-        self.add_text(Colors.style('', fg='blue', reset=False))
+            original.visit_field_name(self, node)
 
-    def depart_field_name(self, node):
-        # type: (Any) -> None
+            # pylint: disable=not-callable
+            self.add_text(Colors.style('', fg='blue', reset=False))
 
-        # pylint: disable=not-callable
-        self.add_text(Colors.style('', reset=True))
+        def depart_field_name(self, node):
+            # type: (Any) -> None
 
-        _original_TextTranslator.depart_field_name(self, node)
+            # pylint: disable=not-callable
+            self.add_text(Colors.style('', reset=True))
 
+            original.depart_field_name(self, node)
 
-sphinx.writers.text.TextTranslator = TextTranslator
+    return TextTranslator
 
 
 # Custom help formatter that let's us control line length
@@ -157,6 +174,17 @@ class LineWrapRawTextHelpFormatter(argparse.RawDescriptionHelpFormatter):
 
         super(LineWrapRawTextHelpFormatter, self).__init__(*args, **kwargs)
 
+    def _get_help_string(self, action):
+        # type: (argparse.Action) -> Optional[str]
+
+        # Long help texts of options can be written using triple quotes, docstring-like formatting
+        # and RST. Render them when help is actually being formatted, before argparse expands
+        # format specifiers like ``%(default)s``.
+        if not action.help:
+            return action.help
+
+        return option_help(action.help)
+
     def _split_lines(self, text, width):  # type: ignore  # incompatible with super type because of unicode
         # type: (str, int) -> List[str]
 
@@ -178,12 +206,9 @@ def py_default_role(role, rawtext, text, lineno, inliner, options=None, content=
     Default handler we use for ``py:...`` roles, translates text to literal node.
     """
 
-    return [docutils.nodes.literal(rawsource=rawtext, text='{}'.format(text))], []
-
+    import docutils.nodes
 
-# register default handler for roles we're interested in
-for python_role in ('py:class', 'py:meth', 'py:mod'):
-    docutils.parsers.rst.roles.register_canonical_role(python_role, py_default_role)
+    return [docutils.nodes.literal(rawsource=rawtext, text='{}'.format(text))], []
 
 
 def doc_role_handler(role, rawtext, text, lineno, inliner, options=None, context=None):
@@ -194,6 +219,9 @@ def doc_role_handler(role, rawtext, text, lineno, inliner, options=None, context
     Format ``:doc:`` roles, used to reference another bits of documentation.
     """
 
+    import docutils.nodes
+    import sphinx.util.nodes
+
     _, title, target = sphinx.util.nodes.split_explicit_title(text)
 
     if target and target[0] == '/':
@@ -202,7 +230,40 @@ def doc_role_handler(role, rawtext, text, lineno, inliner, options=None, context
     return [docutils.nodes.literal(rawsource=text, text='{} (See {})'.format(title, target))], []
 
 
-docutils.parsers.rst.roles.register_canonical_role('doc', doc_role_handler)
+def _setup_rst():
+    # type: () -> None
+
+    """
+    Import docutils and Sphinx, and set them up for rendering RST as plain text - initialize Sphinx locale
+    settings, register handlers of roles we're interested in, and install our custom ``TextTranslator``.
+    Done just once, the first time some help is rendered.
+    """
+
+    # pylint: disable=global-statement
+    global _RST_READY
+
+    with _RST_SETUP_LOCK:
+        if _RST_READY:
+            return
+
+        import docutils.parsers.rst
+        import sphinx.locale
+        import sphinx.writers.text
+
+        sphinx.locale.init([os.path.split(sphinx.locale.__file__)], None)
+
+        # Tell Sphinx to render text into a slightly narrower space to account for some indenting
+        sphinx.writers.text.MAXWIDTH = CROP_WIDTH
+
+        # register default handler for roles we're interested in
+        for python_role in ('py:class', 'py:meth', 'py:mod'):
+            docutils.parsers.rst.roles.register_canonical_role(python_role, py_default_role)
+
+        docutils.parsers.rst.roles.register_canonical_role('doc', doc_role_handler)
+
+        sphinx.writers.text.TextTranslator = _create_text_translator(sphinx.writers.text.TextTranslator)
+
+        _RST_READY = True
 
 
 class DummyTextBuilder:
@@ -229,17 +290,255 @@ class DummyTextBuilder:
     translator_class = None
 
 
+def _gluetool_version():
+    # type: () -> str
+
+    try:
+        # pylint: disable=cyclic-import
+        from .version import __version__
+
+    except ImportError:
+        return 'unknown'
+
+    return ensure_str(__version__.strip())
+
+
+class HelpCache(object):
+    """
+    Persistent cache of rendered help texts. Rendering docstrings of many modules is slow, and listings
+    of modules, shared functions or evaluation context, and help of modules, are often requested repeatedly.
+
+    Entries are keyed by a hash of the raw text, width it was rendered for and whether colors were enabled,
+    and kept in a single JSON file, together with the version of ``gluetool`` they were rendered by - when
+    the version changes, all entries are dropped. The file is read on the first use, and new entries are
+    saved when the process exits. Failures to read or save the file are not fatal, texts are simply rendered
+    again.
+
+    The file also tracks when each entry was used the last time - when saving, entries used by the process are
+    marked as used, and when there are too many entries, the least recently used ones are dropped.
+
+    :param str path: path to the cache file. If not set, nothing is stored, and every lookup misses.
+    :param str version: version of ``gluetool``.
+    :param int max_entries: maximal number of entries kept in the file.
+    """
+
+    def __init__(self, path, version=None, max_entries=DEFAULT_HELP_CACHE_SIZE):
+        # type: (Optional[str], Optional[str], int) -> None
+
+        self.path = path
+        self.version = version or _gluetool_version()
+        self.max_entries = max_entries
+
+        self._entries = None  # type: Optional[Dict[str, str]]
+        self._added = {}  # type: Dict[str, str]
+        self._used = set()  # type: Set[str]
+        self._save_registered = False
+
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text, width, colors):
+        # type: (str, int, bool) -> str
+        """
+        Compute key of a rendered text.
+
+        :param str text: raw text.
+        :param int width: width of rendered text.
+        :param bool colors: whether the rendered text contains colors.
+        :rtype: str
+        """
+
+        digest = hashlib.sha256(u'{}:{}:'.format(width, int(colors)).encode('utf-8'))
+        digest.update(six.ensure_binary(text))
+
+        return digest.hexdigest()
+
+    def _load(self):
+        # type: () -> Tuple[Dict[str, str], Dict[str, float]]
+        """
+        Load entries and times of their last use from the file.
+        """
+
+        if self.path is None:
+            return {}, {}
+
+        try:
+            with open(self.path, 'r') as f:
+                content = json.load(f)
+
+        except (IOError, OSError, ValueError):
+            return {}, {}
+
+        if not isinstance(content, dict) or content.get('version') != self.version:
+            return {}, {}
+
+        entries = content.get('entries')
+        used = content.get('used')
+
+        return (
+            entries if isinstance(entries, dict) else {},
+            used if isinstance(used, dict) else {}
+        )
+
+    def get(self, key):
+        # type: (str) -> Optional[str]
+        """
+        Get a rendered text.
+
+        :param str key: key of the text, as returned by :py:meth:`key`.
+        :returns: rendered text, or ``None`` when there is no such entry.
+        """
+
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load()[0]
+
+            text = self._entries.get(key)
+
+            if text is not None:
+                self._used.add(key)
+
+            return text
+
+    def put(self, key, text):
+        # type: (str, str) -> None
+        """
+        Add a rendered text.
+
+        :param str key: key of the text, as returned by :py:meth:`key`.
+        :param str text: rendered text.
+        """
+
+        if self.path is None:
+            return
+
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load()[0]
+
+            if not self._save_registered:
+                atexit.register(self.save)
+                self._save_registered = True
+
+            self._entries[key] = self._added[key] = text
+            self._used.add(key)
+
+    def save(self):
+        # type: () -> None
+        """
+        Save new entries. Entries saved by other processes in the meantime are kept, unless there are too many
+        entries.
+        """
+
+        with self._lock:
+            if self.path is None or not self._added:
+                return
+
+            entries, used = self._load()
+            entries.update(self._added)
+
+            now = time.time()
+
+            for key in self._used:
+                used[key] = now
+
+            if len(entries) > self.max_entries:
+                # Entries saved by older versions of the cache have no time of use, they go first.
+                by_use = sorted(entries, key=lambda entry: used.get(entry, 0))
+
+                for key in by_use[:len(entries) - self.max_entries]:
+                    del entries[key]
+
+            used = {key: used.get(key, 0) for key in entries}
+
+            cache_dir = os.path.dirname(self.path)
+
+            try:
+                if not os.path.exists(cache_dir):
+                    os.makedirs(cache_dir)
+
+                # Write into a temporary file first, and rename it - concurrent readers should never see
+                # a partially written cache.
+                fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix='.tmp-')
+
+                try:
+                    with os.fdopen(fd, 'w') as f:
+                        json.dump({'version': self.version, 'entries': entries, 'used': used}, f)
+
+                    os.rename(tmp_path, self.path)
+
+                except Exception:
+                    os.unlink(tmp_path)
+                    raise
+
+            # pylint: disable=broad-except
+            except Exception as exc:
+                Logging.get_logger().debug("Cannot save help cache to '{}': {}".format(self.path, exc))
+                return
+
+            self._added = {}
+            self._used = set()
+
+
+def help_cache():
+    # type: () -> HelpCache
+    """
+    Return the persistent cache of rendered help texts, creating it on the first call.
+
+    :rtype: HelpCache
+    """
+
+    # pylint: disable=global-statement
+    global _HELP_CACHE
+
+    if _HELP_CACHE is None:
+        _HELP_CACHE = HelpCache(os.getenv('GLUETOOL_HELP_CACHE', DEFAULT_HELP_CACHE) or None)
+
+    return _HELP_CACHE
+
+
+def _colors_enabled():
+    # type: () -> bool
+
+    # Colors are part of rendered texts.
+    return Colors.style('', fg='red') != ''
+
+
 def rst_to_text(text):
     # type: (str) -> str
 
     """
     Render given text, written with RST, as plain text.
 
+    Rendered texts are served from the persistent cache when possible, see :py:class:`HelpCache`.
+
     :param str text: string to render.
     :rtype: str
     :returns: plain text representation of ``text``.
     """
 
+    cache = help_cache()
+
+    key = cache.key(text, CROP_WIDTH, _colors_enabled())
+
+    rendered = cache.get(key)
+
+    if rendered is None:
+        rendered = _render_rst(text)
+
+        cache.put(key, rendered)
+
+    return ensure_str(rendered)
+
+
+def _render_rst(text):
+    # type: (str) -> str
+
+    _setup_rst()
+
+    import docutils.core
+    import sphinx.writers.text
+
     return ensure_str(docutils.core.publish_string(text, writer=sphinx.writers.text.TextWriter(DummyTextBuilder)))
 
 
@@ -341,17 +640,27 @@ def option_help(txt):
     Options can provide a single line of text, or mutiple lines (using triple
     quotes and docstring-like indentation).
 
+    Rendering is expensive, and help of the same option is often needed repeatedly, therefore
+    rendered texts are cached.
+
     :param str txt: Raw option help text.
     :returns: Formatted option help text.
     """
 
+    key = (txt, CROP_WIDTH, _colors_enabled())
+
+    if key in _OPTION_HELP_CACHE:
+        return _OPTION_HELP_CACHE[key]
+
     # Remove leading whitespace - this won't hurt anyone, and helps docstring-like texts
     trimmed = trim_docstring(txt)
 
     processed = rst_to_text(trimmed)
 
     # Merge all lines into a single line
-    return ' '.join(processed.splitlines())
+    rendered = _OPTION_HELP_CACHE[key] = ' '.join(processed.splitlines())
+
+    return rendered
 
 
 def function_help(func, name=None):
@@ -434,12 +743,76 @@ def functions_help(functions):
     )
 
 
+def _find_eval_context_content(function_node):
+    # type: (Any) -> Optional[ast.Assign]
+
+    """
+    Find ``__content__ = { ...`` assignment inside the body of an ``eval_context`` getter.
+
+    :param function_node: AST node of the getter definition.
+    :returns: the assignment, or ``None`` when there is no such assignment.
+    """
+
+    for node in function_node.body:
+        if not isinstance(node, ast.Assign):
+            continue
+
+        target = node.targets[0]
+
+        if not isinstance(target, ast.Name) or target.id != '__content__':
+            continue
+
+        if not isinstance(node.value, ast.Dict):
+            continue
+
+        return node
+
+    return None
+
+
+def _evaluate_eval_context_content(assign):
+    # type: (ast.Assign) -> Dict[str, str]
+
+    """
+    Evaluate ``__content__ = { ...`` assignment, and return the assigned dictionary.
+
+    :param ast.Assign assign: the assignment.
+    :rtype: dict(str, str)
+    """
+
+    # wrap this assignment into a dummy Module node, to create an execution unit with just a single
+    # statement (__content__ assignment), so we could slip it to compile/eval.
+    if sys.version_info >= (3, 8):
+        # https://github.com/pallets/werkzeug/issues/1551
+        # https://bugs.python.org/issue35894
+        dummy_module = ast.Module([assign], [])
+    else:
+        dummy_module = ast.Module([assign])
+
+    # compile the module to an executable code
+    code = compile(dummy_module, '', 'exec')
+
+    # We prepare our "locals" mapping - when we eval our dummy module, its "__content__ = ..." will be executed
+    # within a context of some globals/locals mappings. We give eval our custom locals mapping, which will
+    # result in __content__ being created in it - and we can just pick it up from this mapping when eval
+    # is done.
+    module_locals = {}  # type: Dict[str, Any]
+
+    # this should be reasonably safe, don't raise a warning then...
+    # pylint: disable=eval-used
+    eval(code, {}, module_locals)
+
+    return {
+        name: trim_docstring(description) for name, description in iteritems(module_locals['__content__'])
+    }
+
+
 def extract_eval_context_info(source, logger=None):
-    # type: (gluetool.glue.Configurable, Optional[gluetool.log.ContextAdapter]) -> Dict[str, str]
+    # type: (Any, Optional[gluetool.log.ContextAdapter]) -> Dict[str, str]
 
     """
     Extract information of evaluation context content from the ``source`` - a module
-    or any other object with ``eval_context`` property. The information we're looking
+    or any other object with ``eval_context`` property, or its class. The information we're looking
     for is represented by an assignment to special variable, ``__content__``, in the
     body of ``eval_context`` getter. ``__content__`` is expected to be assigned
     a dictionary, listing context variables (keys) and their descriptions (values).
@@ -447,7 +820,7 @@ def extract_eval_context_info(source, logger=None):
     If it's not possible to find such information, or an exception is raised, the function
     returns an empty dictionary.
 
-    :param gluetool.glue.Configurable source: object to extract information from.
+    :param source: object to extract information from, or its class.
     :rtype: dict(str, str)
     """
 
@@ -458,7 +831,7 @@ def extract_eval_context_info(source, logger=None):
     # Cannot do "source.eval_context" because we'd get the value of property, which
     # is usualy a dict. We cannot let it evaluate and return the value, therefore
     # we must get it via its parent class.
-    eval_context = source.__class__.eval_context
+    eval_context = (source if inspect.isclass(source) else source.__class__).eval_context
 
     # this is not a cyclic import, yet pylint thinks so :/
     # pylint: disable=cyclic-import
@@ -484,59 +857,63 @@ def extract_eval_context_info(source, logger=None):
         # now, parse getter source, and create its AST
         tree = ast.parse(getter_source_trimmed)
 
-        # find ``__content__ = { ...`` assignment inside the function
         # ``tree`` is the whole module, ``tree.body[0]`` is the function definition
-        for node in tree.body[0].body:  # type: ignore  # if `body` is missing, we can handle it
-            if not isinstance(node, ast.Assign):
-                continue
+        assign = _find_eval_context_content(tree.body[0])
+
+        if assign is None:
+            # No "__content__ = {..." found? So be it, return empty info.
+            logger.debug('eval context exists but does not describe its content')
+            return {}
+
+        return _evaluate_eval_context_content(assign)
 
-            target = node.targets[0]
+    # pylint: disable=broad-except
+    except Exception as exc:
+        logger.warning("Cannot read eval context info from '{}': {}".format(source.name, exc))
 
-            if not isinstance(target, ast.Name) or target.id != '__content__':
-                continue
+        return {}
 
-            if not isinstance(node.value, ast.Dict):
-                continue
 
-            assign = node
-            break
+def extract_eval_context_info_from_ast(tree, logger=None):
+    # type: (ast.Module, Optional[gluetool.log.ContextAdapter]) -> Dict[str, Dict[str, str]]
 
-        else:
-            # No "__content__ = {..." found? So be it, return empty info.
-            logger.debug('eval context exists but does not describe its content')
-            return {}
+    """
+    Extract information of evaluation context content statically, from a parsed source of a Python module,
+    without importing the module or instantiating anything. Looks for ``eval_context`` getters of classes defined
+    at the top level of the module, just like :py:func:`extract_eval_context_info` does for a single object.
 
-        # wrap this assignment into a dummy Module node, to create an execution unit with just a single
-        # statement (__content__ assignment), so we could slip it to compile/eval.
-        if sys.version_info >= (3, 8):
-            # https://github.com/pallets/werkzeug/issues/1551
-            # https://bugs.python.org/issue35894
-            dummy_module = ast.Module([assign], [])
-        else:
-            dummy_module = ast.Module([assign])
+    :param ast.Module tree: parsed source of a Python module.
+    :returns: mapping between names of classes and information on their evaluation context content. Classes
+        which do not define their own ``eval_context`` are not included.
+    """
 
-        # compile the module to an executable code
-        code = compile(dummy_module, '', 'exec')
+    logger = logger or Logging.get_logger()
 
-        # We prepare our "locals" mapping - when we eval our dummy module, its "__content__ = ..." will be executed
-        # within a context of some globals/locals mappings. We give eval our custom locals mapping, which will
-        # result in __content__ being created in it - and we can just pick it up from this mapping when eval
-        # is done.
-        module_locals = {}  # type: Dict[str, Any]
+    info = {}  # type: Dict[str, Dict[str, str]]
 
-        # this should be reasonably safe, don't raise a warning then...
-        # pylint: disable=eval-used
-        eval(code, {}, module_locals)
+    for class_node in tree.body:
+        if not isinstance(class_node, ast.ClassDef):
+            continue
 
-        return {
-            name: trim_docstring(description) for name, description in iteritems(module_locals['__content__'])
-        }
+        for node in class_node.body:
+            if isinstance(node, ast.FunctionDef) and node.name == 'eval_context':
+                break
 
-    # pylint: disable=broad-except
-    except Exception as exc:
-        logger.warning("Cannot read eval context info from '{}': {}".format(source.name, exc))
+        else:
+            continue
 
-        return {}
+        try:
+            assign = _find_eval_context_content(node)
+
+            info[class_node.name] = {} if assign is None else _evaluate_eval_context_content(assign)
+
+        # pylint: disable=broad-except
+        except Exception as exc:
+            logger.warning("Cannot read eval context info from '{}': {}".format(class_node.name, exc))
+
+            info[class_node.name] = {}
+
+    return info
 
 
 def eval_context_help(source):
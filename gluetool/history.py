@@ -0,0 +1,286 @@
+"""
+Persistent history of pipeline runs.
+
+When enabled by ``--history`` option, every pipeline run is recorded in a local SQLite database: when it started
+and finished, how long did each module spend in each phase of the pipeline (``setup``, ``sanity``, ``execute``
+and ``destroy``), how much did the peak RSS of the process grow during the run, and the failure which killed
+the pipeline, if any.
+
+``gluetool --history-report`` then shows percentiles of phase durations per module, and flags modules whose
+recent runs got slower when compared with a rolling baseline, formed by runs preceding the recent ones.
+"""
+
+import collections
+import os
+import time
+
+from six import iteritems
+
+from .db import Database
+
+try:
+    import resource
+
+except ImportError:
+    resource = None  # type: ignore  # pylint: disable=invalid-name
+
+# Type annotations
+# pylint: disable=unused-import, wrong-import-order
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple  # noqa
+
+if TYPE_CHECKING:
+    from .glue import Pipeline, PipelineReturnType  # noqa
+    from .log import ContextAdapter  # noqa
+
+
+#: Default path of the history database.
+DEFAULT_HISTORY_DB = os.path.join(
+    os.getenv('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+    'gluetool',
+    'history.db'
+)
+
+#: Default length of the "recent" window of the report, in seconds.
+DEFAULT_REPORT_WINDOW = 7 * 24 * 3600
+
+#: Default length of the baseline window, preceding the recent one, in seconds.
+DEFAULT_BASELINE_WINDOW = 28 * 24 * 3600
+
+#: Recent p95 larger than the baseline p95 by this fraction is considered a regression.
+DEFAULT_REGRESSION_THRESHOLD = 0.2
+
+#: Minimal number of samples in each window necessary for flagging a regression.
+DEFAULT_MIN_SAMPLES = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started REAL NOT NULL,
+    finished REAL NOT NULL,
+    peak_rss INTEGER,
+    failure_class TEXT,
+    failure_module TEXT,
+    failure_soft INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS phases (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    module TEXT NOT NULL,
+    unique_name TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    started REAL NOT NULL,
+    duration REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS phases_module ON phases (module, phase, started);
+"""
+
+#: Changes of the initial schema, see :py:class:`gluetool.db.Database`.
+MIGRATIONS = [
+    # Fingerprints of module options, for adaptive timeouts.
+    'ALTER TABLE phases ADD COLUMN fingerprint TEXT',
+    'CREATE INDEX phases_fingerprint ON phases (module, fingerprint, phase, started)',
+    # Peak RSS is a lifetime peak of the process - record its growth during the run instead, ``peak_rss``
+    # is no longer set.
+    'ALTER TABLE runs ADD COLUMN peak_rss_growth INTEGER'
+]
+
+
+def peak_rss():
+    # type: () -> Optional[int]
+    """
+    Return peak resident set size of the current process, in kilobytes, or ``None`` when it's not available.
+    """
+
+    if resource is None:
+        return None
+
+    return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def percentile(values, pct):
+    # type: (Sequence[float], float) -> Optional[float]
+    """
+    Compute a percentile of values, interpolating between the closest ranks.
+
+    :param list(float) values: values, in any order.
+    :param float pct: percentile to compute, between 0 and 100.
+    :returns: the percentile, or ``None`` when there are no values.
+    """
+
+    if not values:
+        return None
+
+    ordered = sorted(values)
+
+    rank = (len(ordered) - 1) * pct / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+class RunHistory(Database):
+    """
+    Database of pipeline runs.
+
+    :param str path: path to the database file.
+    :param ContextAdapter logger: logger used for logging.
+    """
+
+    def __init__(self, path, logger=None):
+        # type: (str, Optional[ContextAdapter]) -> None
+
+        super(RunHistory, self).__init__(path, SCHEMA, migrations=MIGRATIONS, logger=logger)
+
+    def record(self, pipeline, outcome=None, rss_baseline=None):
+        # type: (Pipeline, Optional[PipelineReturnType], Optional[int]) -> int
+        """
+        Record a finished pipeline run.
+
+        :param Pipeline pipeline: pipeline that finished running.
+        :param tuple outcome: return value of :py:meth:`gluetool.glue.Pipeline.run`.
+        :param int rss_baseline: peak RSS of the process when the pipeline started, as returned by
+            :py:func:`peak_rss`. The growth of the peak during the run is recorded. Note that pipelines running
+            in parallel share the process, and its peak.
+        :returns: ID of the run.
+        """
+
+        current_rss = peak_rss()
+
+        if current_rss is not None and rss_baseline is not None:
+            rss_growth = current_rss - rss_baseline  # type: Optional[int]
+
+        else:
+            rss_growth = None
+
+        failure, destroy_failure = outcome or (None, None)
+        failure = failure or destroy_failure
+
+        exception = failure.exception if failure is not None else None
+        failure_module = failure.module if failure is not None else None
+
+        with self._transaction() as connection:
+            run_id = connection.execute(
+                'INSERT INTO runs (started, finished, peak_rss_growth, failure_class, failure_module, failure_soft) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (
+                    pipeline.started,
+                    pipeline.finished,
+                    rss_growth,
+                    type(exception).__name__ if exception is not None else None,
+                    failure_module.unique_name if failure_module is not None else None,
+                    int(failure.soft) if failure is not None else None
+                )
+            ).lastrowid
+
+            connection.executemany(
+                'INSERT INTO phases (run_id, module, unique_name, phase, started, duration, fingerprint) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [
+                    (
+                        run_id, timing.module, timing.unique_name, timing.phase, timing.started, timing.duration,
+                        timing.fingerprint
+                    )
+                    for timing in pipeline.timings
+                ]
+            )
+
+        self.debug('recorded pipeline run {}'.format(run_id))
+
+        return run_id
+
+    def durations(self, since=None, until=None):
+        # type: (Optional[float], Optional[float]) -> Dict[Tuple[str, str], List[float]]
+        """
+        Return durations of module phases.
+
+        :param float since: if set, only phases started at this time or later are returned.
+        :param float until: if set, only phases started before this time are returned.
+        :returns: mapping between ``(module, phase)`` pairs and lists of durations.
+        """
+
+        query = 'SELECT module, phase, duration FROM phases WHERE started >= ? AND started < ?'
+
+        durations = collections.defaultdict(list)  # type: Dict[Tuple[str, str], List[float]]
+
+        for module, phase, duration in self._connection().execute(query, (
+                since if since is not None else float('-inf'),
+                until if until is not None else float('inf')
+        )):
+            durations[(module, phase)].append(duration)
+
+        return durations
+
+    def execute_durations(self, module, fingerprint, since=None):
+        # type: (str, str, Optional[float]) -> List[float]
+        """
+        Return durations of successful executions of a module with given options.
+
+        :param str module: name of the module.
+        :param str fingerprint: fingerprint of module's options, see
+            :py:meth:`gluetool.glue.Module.options_fingerprint`.
+        :param float since: if set, only executions started at this time or later are returned.
+        :rtype: list(float)
+        """
+
+        # Executions killed by an exception raised by the module are left out - their durations, e.g. of those
+        # interrupted by a timeout, say nothing about how long the module takes to finish.
+        query = """
+            SELECT phases.duration FROM phases JOIN runs ON phases.run_id = runs.id
+            WHERE phases.module = ? AND phases.fingerprint = ? AND phases.phase = 'execute' AND phases.started >= ?
+            AND (runs.failure_module IS NULL OR runs.failure_module != phases.unique_name)
+        """
+
+        return [
+            row[0] for row in self._connection().execute(query, (
+                module, fingerprint, since if since is not None else float('-inf')
+            ))
+        ]
+
+    # pylint: disable=too-many-arguments
+    def report(self, now=None, window=DEFAULT_REPORT_WINDOW, baseline_window=DEFAULT_BASELINE_WINDOW,
+               threshold=DEFAULT_REGRESSION_THRESHOLD, min_samples=DEFAULT_MIN_SAMPLES):
+        # type: (Optional[float], int, int, float, int) -> List[Dict[str, Any]]
+        """
+        Compute percentiles of phase durations of recent runs, and compare them with the baseline.
+
+        :param float now: end of the recent window. Current time is used by default.
+        :param int window: length of the recent window, in seconds.
+        :param int baseline_window: length of the baseline window, preceding the recent one, in seconds.
+        :param float threshold: when p95 of recent durations exceeds p95 of the baseline by this fraction, the phase
+            is flagged as a regression.
+        :param int min_samples: regressions are flagged only when both windows have at least this many samples.
+        :returns: list of report rows, one for each module and phase, sorted by module and phase.
+        """
+
+        now = now if now is not None else time.time()
+
+        recent = self.durations(since=now - window, until=now)
+        baseline = self.durations(since=now - window - baseline_window, until=now - window)
+
+        rows = []
+
+        for (module, phase), values in sorted(iteritems(recent)):
+            baseline_values = baseline.get((module, phase), [])
+
+            p95 = percentile(values, 95)
+            baseline_p95 = percentile(baseline_values, 95)
+
+            regression = len(values) >= min_samples \
+                and len(baseline_values) >= min_samples \
+                and baseline_p95 is not None and p95 is not None \
+                and p95 > baseline_p95 * (1.0 + threshold)
+
+            rows.append({
+                'module': module,
+                'phase': phase,
+                'runs': len(values),
+                'p50': percentile(values, 50),
+                'p95': p95,
+                'p99': percentile(values, 99),
+                'baseline-p95': baseline_p95,
+                'regression': regression
+            })
+
+        return rows
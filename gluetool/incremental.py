@@ -0,0 +1,190 @@
+"""
+Support for incremental pipelines.
+
+When enabled by ``--incremental`` option, execution of modules which declare themselves as *deterministic*
+(see :py:attr:`gluetool.glue.Module.deterministic`) is skipped when their inputs did not change since the last
+time they ran, in the spirit of ``make``. Inputs of a module - its options, selected environment variables,
+files and values of shared functions provided by modules running sooner in the pipeline - are reduced to
+a fingerprint. After a successful execution, values returned by module's shared functions listed in
+:py:attr:`gluetool.glue.Module.deterministic_results` are stored under this fingerprint, and when the module
+is about to run again with the same fingerprint, the stored values are restored instead, and ``execute`` is not
+called at all.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+from .glue import GlueError
+from .log import Logging, LoggerMixin
+
+# Type annotations
+# pylint: disable=unused-import, wrong-import-order
+from typing import TYPE_CHECKING, Any, Dict, Optional  # noqa
+
+if TYPE_CHECKING:
+    from .log import ContextAdapter  # noqa
+
+
+#: Default directory of the incremental store.
+DEFAULT_INCREMENTAL_STORE = os.path.join(
+    os.getenv('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+    'gluetool',
+    'incremental'
+)
+
+#: Size of blocks used when hashing files.
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def hash_file(filepath):
+    # type: (str) -> Optional[str]
+    """
+    Compute a hash of file content.
+
+    :param str filepath: path to a file.
+    :returns: hex digest of file content, or ``None`` when the file does not exist.
+    """
+
+    if not os.path.exists(filepath):
+        return None
+
+    digest = hashlib.sha256()
+
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def fingerprint(inputs):
+    # type: (Dict[str, Any]) -> str
+    """
+    Reduce a description of inputs to a fingerprint.
+
+    :param dict inputs: mapping describing inputs, e.g. as returned by
+        :py:meth:`gluetool.glue.Module.incremental_inputs`. Values that cannot be serialized to JSON
+        are represented by their ``repr``.
+    :rtype: str
+    """
+
+    serialized = json.dumps(inputs, sort_keys=True, default=repr)
+
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+
+class RestoredResult(object):
+    # pylint: disable=too-few-public-methods
+    """
+    Stand-in for a shared function of a skipped module: returns the value stored when the module
+    was executed. Only values returned by shared functions called without arguments are stored, therefore
+    calling the stand-in with any arguments is an error.
+
+    :param str funcname: name of the shared function.
+    :param value: value to return.
+    """
+
+    def __init__(self, funcname, value):
+        # type: (str, Any) -> None
+
+        self.funcname = funcname
+        self.value = value
+
+    def __call__(self, *args, **kwargs):
+        # type: (*Any, **Any) -> Any
+
+        if args or kwargs:
+            raise GlueError(
+                "Shared function '{}' of a skipped deterministic module cannot be called with arguments".format(
+                    self.funcname
+                )
+            )
+
+        return self.value
+
+
+class IncrementalStore(LoggerMixin, object):
+    """
+    Local store of results of deterministic modules, indexed by fingerprints of their inputs.
+
+    :param str path: directory of the store.
+    :param ContextAdapter logger: logger used for logging.
+    """
+
+    def __init__(self, path, logger=None):
+        # type: (str, Optional[ContextAdapter]) -> None
+
+        super(IncrementalStore, self).__init__(logger or Logging.get_logger())
+
+        self.path = path
+
+    def _entry_path(self, key):
+        # type: (str) -> str
+
+        return os.path.join(self.path, key[:2], key)
+
+    def load(self, key):
+        # type: (str) -> Optional[Dict[str, Any]]
+        """
+        Load results stored under a given fingerprint.
+
+        :param str key: fingerprint of inputs.
+        :returns: mapping between shared function names and their values, or ``None`` when there are
+            no usable results stored.
+        """
+
+        entry_path = self._entry_path(key)
+
+        if not os.path.exists(entry_path):
+            self.debug("no stored results for fingerprint '{}'".format(key))
+            return None
+
+        try:
+            with open(entry_path, 'rb') as f:
+                return pickle.load(f)  # type: ignore  # pickle returns Any
+
+        # pylint: disable=broad-except
+        except Exception as exc:
+            self.warn("Cannot load stored results from '{}': {}".format(entry_path, exc))
+            return None
+
+    def save(self, key, results):
+        # type: (str, Dict[str, Any]) -> None
+        """
+        Store results under a given fingerprint. Failure to store results is not fatal, it is merely
+        logged, and the next run will execute the module again.
+
+        :param str key: fingerprint of inputs.
+        :param dict results: mapping between shared function names and their values.
+        """
+
+        entry_path = self._entry_path(key)
+        entry_dir = os.path.dirname(entry_path)
+
+        try:
+            if not os.path.exists(entry_dir):
+                os.makedirs(entry_dir)
+
+            # Write into a temporary file first, and rename it - concurrent readers should never see
+            # a partially written entry.
+            fd, tmp_path = tempfile.mkstemp(dir=entry_dir, prefix='.tmp-')
+
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(results, f, protocol=2)
+
+                os.rename(tmp_path, entry_path)
+
+            except Exception:
+                os.unlink(tmp_path)
+                raise
+
+        # pylint: disable=broad-except
+        except Exception as exc:
+            self.warn("Cannot store results to '{}': {}".format(entry_path, exc))
+            return
+
+        self.debug("stored results for fingerprint '{}'".format(key))
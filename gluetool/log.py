@@ -98,7 +98,9 @@ _TRACEBACK_TEMPLATE = """
 {%- set label = '{}:'.format(label) %}
 ---v---v---v---v---v--- {{ label | center(10) }} ---v---v---v---v---v---
 
-At {{ stack[-1][0] }}:{{ stack[-1][1] }}, in {{ stack[-1][2] }}:
+{% if stack %}At {{ stack[-1][0] }}:{{ stack[-1][1] }}, in {{ stack[-1][2] }}:
+
+{% endif -%}
 
 {{ exception.__class__.__module__ }}.{{ exception.__class__.__name__ }}: {{ exception }}
 
@@ -436,6 +438,89 @@ def _extract_stack(tb):
     return stack
 
 
+#: Name of the exception attribute holding a snapshot of its stack, see :py:func:`snapshot_stack`.
+STACK_SNAPSHOT_ATTRIBUTE = 'gluetool_stack_snapshot'
+
+
+def _truncate(text, length):
+    # type: (str, int) -> str
+
+    if len(text) <= length:
+        return text
+
+    return '{}... ({} characters truncated)'.format(text[:length], len(text) - length)
+
+
+def _safe_repr(value, length):
+    # type: (Any, int) -> str
+
+    try:
+        return _truncate(repr(value), length)
+
+    # pylint: disable=broad-except
+    except Exception as exc:
+        return '<repr failed: {}>'.format(exc)
+
+
+class FrameSnapshot(object):
+    # pylint: disable=too-few-public-methods
+    """
+    Stand-in for a stack frame, keeping just truncated representations of its local variables.
+    Unlike a real frame, it does not keep the variables alive.
+
+    :ivar dict(str, str) f_locals: truncated ``repr`` of local variables.
+    :ivar dict(str, str) f_local_types: ``repr`` of types of local variables.
+    """
+
+    def __init__(self, frame, max_repr_length):
+        # type: (Any, int) -> None
+
+        self.f_locals = {
+            name: _safe_repr(value, max_repr_length) for name, value in iteritems(frame.f_locals)
+        }
+
+        self.f_local_types = {
+            name: repr(type(value)) for name, value in iteritems(frame.f_locals)
+        }
+
+
+def snapshot_stack(tb, max_frames, max_repr_length):
+    # type: (Any, int, int) -> List[Any]
+    """
+    Construct a size-bounded "stack" of a traceback, with the same structure as the one constructed by
+    :py:func:`_extract_stack`, but with frames replaced by :py:class:`FrameSnapshot` instances.
+
+    :param tb: traceback to snapshot.
+    :param int max_frames: only this many innermost frames are kept.
+    :param int max_repr_length: representations of local variables are truncated to this length.
+    :rtype: list(list(str, int, str, str, FrameSnapshot))
+    """
+
+    return [
+        [filename, lineno, fnname, text, FrameSnapshot(frame, max_repr_length)]
+        for filename, lineno, fnname, text, frame in _extract_stack(tb)[-max_frames:]
+    ]
+
+
+def _exception_stack(exc, tb):
+    # type: (Any, Any) -> List[Any]
+    """
+    Return a "stack" of an exception - its snapshot, if it has one, or a stack extracted from its traceback.
+    Snapshot exists when the traceback has been already released, or when the exception was raised in another
+    process, and the traceback does not describe where the exception came from.
+    """
+
+    snapshot = getattr(exc, STACK_SNAPSHOT_ATTRIBUTE, None)
+
+    if snapshot:
+        return snapshot  # type: ignore  # snapshot is a list
+
+    if tb is not None:
+        return _extract_stack(tb)
+
+    return []
+
+
 class SingleLogLevelFileHandler(logging.FileHandler):
     def __init__(self, level, *args, **kwargs):
         # type: (int, *Any, **Any) -> None
@@ -829,7 +914,7 @@ class LoggingFormatter(logging.Formatter):
         def _add_block(label, exc, trace):
             # type: (str, Exception, Any) -> None
 
-            stack = _extract_stack(trace)
+            stack = _exception_stack(exc, trace)
 
             output.append(
                 ensure_str(tmpl.render(label=label, exception=exc, stack=stack, iterkeys=iterkeys))
@@ -918,6 +1003,25 @@ class LoggingFormatter(logging.Formatter):
         return msg
 
 
+def _serialize_frame_locals(frame):
+    # type: (Any) -> Dict[str, Dict[str, Any]]
+
+    if isinstance(frame, FrameSnapshot):
+        return {
+            name: {
+                'type': frame.f_local_types[name],
+                'value': value
+            } for name, value in iteritems(frame.f_locals)
+        }
+
+    return {
+        name: {
+            'type': type(value),
+            'value': value
+        } for name, value in iteritems(frame.f_locals)
+    }
+
+
 class JSONLoggingFormatter(logging.Formatter):
     """
     Custom logging formatter producing a JSON dictionary describing the log record.
@@ -959,7 +1063,7 @@ class JSONLoggingFormatter(logging.Formatter):
             else:
                 exc_module, exc_class, exc_message = '', '', ''
 
-            stack = _extract_stack(tb) if tb else []
+            stack = _exception_stack(exc, tb)
 
             serialized['caused_by'].append({
                 'exception': {
@@ -972,12 +1076,7 @@ class JSONLoggingFormatter(logging.Formatter):
                         'lineno': lineno,
                         'fnname': fnname,
                         'text': text,
-                        'locals': {
-                            local_var_name: {
-                                'type': type(local_var_value),
-                                'value': local_var_value
-                            } for local_var_name, local_var_value in iteritems(frame.f_locals)
-                        }
+                        'locals': _serialize_frame_locals(frame)
                     }
                     for filename, lineno, fnname, text, frame in stack
                 ]
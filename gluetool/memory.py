@@ -0,0 +1,136 @@
+"""
+Per-module memory accounting.
+
+When enabled by ``--memory-accounting`` option, resident set size of the process, number of objects tracked by
+the garbage collector and - when :py:mod:`tracemalloc` is tracing, e.g. because of ``PYTHONTRACEMALLOC``
+environment variable - current and peak size of traced memory blocks are recorded before and after ``execute``
+and ``destroy`` methods of each module. When the pipeline finishes, the measurements are logged as a table.
+
+All values describe the whole process: when more pipelines run concurrently, modules running at the same time
+share the blame.
+"""
+
+import gc
+import os
+
+from .log import log_table
+
+try:
+    import tracemalloc
+
+except ImportError:
+    tracemalloc = None  # type: ignore  # pylint: disable=invalid-name
+
+# Type annotations
+# pylint: disable=unused-import, wrong-import-order
+from typing import TYPE_CHECKING, Any, List, NamedTuple, Optional  # noqa
+
+if TYPE_CHECKING:
+    from .log import ContextAdapter  # noqa
+
+
+#: Memory usage of the process at one moment.
+#:
+#: :ivar int rss: resident set size, in kilobytes, or ``None`` when not available.
+#: :ivar int traced: size of memory blocks traced by :py:mod:`tracemalloc`, in bytes, or ``None`` when not tracing.
+#: :ivar int traced_peak: peak size of traced memory blocks since the previous snapshot, in bytes, or ``None``
+#:     when not tracing.
+#: :ivar int gc_objects: number of objects tracked by the garbage collector.
+MemorySnapshot = NamedTuple('MemorySnapshot', (
+    ('rss', Optional[int]),
+    ('traced', Optional[int]),
+    ('traced_peak', Optional[int]),
+    ('gc_objects', int)
+))
+
+#: Memory usage of the process before and after one phase of a module.
+#:
+#: :ivar str module: name of the module.
+#: :ivar str unique_name: name of the module instance.
+#: :ivar str phase: ``execute`` or ``destroy``.
+#: :ivar MemorySnapshot before: memory usage before the phase started.
+#: :ivar MemorySnapshot after: memory usage after the phase finished.
+ModuleMemory = NamedTuple('ModuleMemory', (
+    ('module', str),
+    ('unique_name', str),
+    ('phase', str),
+    ('before', MemorySnapshot),
+    ('after', MemorySnapshot)
+))
+
+
+def current_rss():
+    # type: () -> Optional[int]
+    """
+    Return current resident set size of the process, in kilobytes, or ``None`` when it's not available.
+    """
+
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            resident_pages = int(f.read().split()[1])
+
+    except (IOError, OSError, IndexError, ValueError):
+        return None
+
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def take_snapshot():
+    # type: () -> MemorySnapshot
+    """
+    Measure current memory usage of the process.
+
+    When :py:mod:`tracemalloc` is tracing, its peak is reset, the next snapshot then reports the peak reached
+    since this one.
+    """
+
+    traced = traced_peak = None  # type: Optional[int]
+
+    if tracemalloc is not None and tracemalloc.is_tracing():
+        traced, traced_peak = tracemalloc.get_traced_memory()
+
+        # Not available before Python 3.9 - peak is then the one since the start of tracing.
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+
+    return MemorySnapshot(current_rss(), traced, traced_peak, len(gc.get_objects()))
+
+
+def _delta(before, after):
+    # type: (Optional[int], Optional[int]) -> Optional[int]
+
+    if before is None or after is None:
+        return None
+
+    return after - before
+
+
+def log_memory_report(measurements, logger):
+    # type: (List[ModuleMemory], ContextAdapter) -> None
+    """
+    Log memory usage of modules as a table.
+
+    :param list(ModuleMemory) measurements: measurements to report.
+    :param ContextAdapter logger: logger to use.
+    """
+
+    if not measurements:
+        return
+
+    table = [
+        [
+            measurement.unique_name,
+            measurement.phase,
+            measurement.after.rss,
+            _delta(measurement.before.rss, measurement.after.rss),
+            _delta(measurement.before.traced, measurement.after.traced),
+            measurement.after.traced_peak,
+            _delta(measurement.before.gc_objects, measurement.after.gc_objects)
+        ]
+        for measurement in measurements
+    ]  # type: List[List[Any]]
+
+    log_table(logger.info, 'memory usage per module', table,
+              headers=['Module', 'Phase', 'RSS (kB)', 'RSS delta (kB)', 'Traced delta (B)', 'Traced peak (B)',
+                       'GC objects delta'],
+              tablefmt='psql', missingval='-')
@@ -0,0 +1,178 @@
+"""
+Profiling of modules.
+
+When ``--profile-modules DIR`` is set, ``sanity``, ``execute`` and ``destroy`` methods of each module - and, with
+``--profile-shared``, shared functions as well - run under their own :py:class:`cProfile.Profile`. When
+``gluetool`` finishes, profiles are written into ``DIR``, one ``.pstats`` file per module and phase (e.g.
+``koji.execute.pstats`` or ``koji.shared.get_build.pstats``), and the top functions of all profiles merged
+together are logged.
+
+When a profiled phase calls another profiled phase, e.g. ``execute`` calls a shared function, the outer profile
+is paused until the inner one finishes - time spent by the shared function is recorded in its own profile only.
+
+Profiles cover only the thread running the phase, threads started by modules are not profiled. Only one thread
+is profiled at a time: profiles of the same phase cannot be shared by threads, and since Python 3.12, a profiler
+observes all threads of the process. When pipelines run in parallel, phases starting while another thread is being
+profiled are not profiled, and a warning is logged.
+"""
+
+import cProfile
+import contextlib
+import os
+import pstats
+import re
+import threading
+
+from six.moves import StringIO
+
+from .log import Logging, LoggerMixin, log_blob
+
+# Type annotations
+# pylint: disable=unused-import, wrong-import-order
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Set  # noqa
+
+if TYPE_CHECKING:
+    from .log import ContextAdapter  # noqa
+
+
+#: Number of functions listed by the summary of profiles.
+DEFAULT_PROFILE_TOP = 30
+
+#: Characters not allowed in names of profile files.
+_UNSAFE_CHARS = re.compile(r'[^a-zA-Z0-9_.\-]')
+
+
+class ModuleProfiler(LoggerMixin, object):
+    """
+    Collects profiles of module phases.
+
+    :param str directory: directory to write profiles into.
+    :param ContextAdapter logger: logger used for logging.
+    """
+
+    def __init__(self, directory, logger=None):
+        # type: (str, Optional[ContextAdapter]) -> None
+
+        super(ModuleProfiler, self).__init__(logger or Logging.get_logger())
+
+        self.directory = directory
+
+        #: Profiles, one for each module and phase.
+        self.profiles = {}  # type: Dict[str, cProfile.Profile]
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        # Thread being profiled, and names of phases left out because another thread was being profiled.
+        self._owner = None  # type: Optional[threading.Thread]
+        self._skipped = set()  # type: Set[str]
+
+    def _stack(self):
+        # type: () -> List[cProfile.Profile]
+
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+
+        return self._local.stack  # type: ignore  # thread-local attribute
+
+    def _profile(self, name):
+        # type: (str) -> Optional[cProfile.Profile]
+        """
+        Return profile of the given name, or ``None`` when another thread is being profiled.
+        """
+
+        current_thread = threading.current_thread()
+
+        with self._lock:
+            if self._owner is not None and self._owner is not current_thread:
+                if name not in self._skipped:
+                    self._skipped.add(name)
+
+                    self.warn("Not profiling '{}', thread '{}' is being profiled".format(name, self._owner.name))
+
+                return None
+
+            self._owner = current_thread
+
+            if name not in self.profiles:
+                self.profiles[name] = cProfile.Profile()
+
+            return self.profiles[name]
+
+    def _release(self):
+        # type: () -> None
+
+        with self._lock:
+            self._owner = None
+
+    @contextlib.contextmanager
+    def profile(self, module_name, phase):
+        # type: (str, str) -> Iterator[None]
+        """
+        Profile the code running inside the context.
+
+        :param str module_name: name of the module instance.
+        :param str phase: phase of the module, e.g. ``execute`` or ``shared.<function name>``.
+        """
+
+        profile = self._profile(_UNSAFE_CHARS.sub('_', '{}.{}'.format(module_name, phase)))
+        stack = self._stack()
+
+        # Another thread is being profiled, or the same profile cannot be enabled twice, e.g. for a recursive
+        # shared function - it already covers the code.
+        if profile is None or profile in stack:
+            yield
+            return
+
+        if stack:
+            stack[-1].disable()
+
+        stack.append(profile)
+        profile.enable()
+
+        try:
+            yield
+
+        finally:
+            profile.disable()
+            stack.pop()
+
+            if stack:
+                stack[-1].enable()
+
+            else:
+                self._release()
+
+    def report(self, top=None):
+        # type: (Optional[int]) -> None
+        """
+        Write profiles into the directory, and log the top functions of all profiles merged together.
+
+        :param int top: number of functions to log. :py:data:`DEFAULT_PROFILE_TOP` is used by default.
+        """
+
+        top = top or DEFAULT_PROFILE_TOP
+
+        if not self.profiles:
+            return
+
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+        paths = []
+
+        with self._lock:
+            for name, profile in sorted(self.profiles.items()):
+                path = os.path.join(self.directory, '{}.pstats'.format(name))
+
+                profile.dump_stats(path)
+                paths.append(path)
+
+        self.info('module profiles written into {}'.format(self.directory))
+
+        output = StringIO()
+
+        stats = pstats.Stats(*paths, stream=output)
+        stats.sort_stats('cumulative').print_stats(top)
+
+        log_blob(self.info, 'top {} functions of all module profiles'.format(top), output.getvalue())
@@ -0,0 +1,291 @@
+"""
+Scheduling of concurrent work by resource classes.
+
+When several modules or pipelines run concurrently, they may easily oversubscribe resources like CPU, disk I/O
+or rate limits of remote APIs. Modules therefore declare *resource classes* - arbitrary names like ``cpu``,
+``disk`` or ``api:koji`` - and weights of their work in each class (see :py:attr:`gluetool.glue.Module.resources`),
+and the work is admitted only when its weight fits into the capacity of the class. Capacities of resource
+classes are set by ``resource-limits`` option of gluetool, usually in its configuration file:
+
+.. code-block:: ini
+
+   [default]
+   resource-limits = cpu=4, disk=2, api:koji=10
+
+Resource classes without capacity set are not limited at all. Time spent by work waiting for its admission
+is recorded for each class, and reported when gluetool finishes, to show where the throughput is limited.
+"""
+
+import contextlib
+import threading
+import time
+
+from six import iteritems
+
+from .glue import GlueError
+from .log import Logging, LoggerMixin, log_table
+
+# Type annotations
+# pylint: disable=unused-import, wrong-import-order
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple  # noqa
+
+if TYPE_CHECKING:
+    from .log import ContextAdapter  # noqa
+
+ClaimsType = Dict[str, int]  # pylint: disable=invalid-name
+
+
+# Per-thread stack of scheduled work - scheduler and claims of external commands run by the work.
+_CURRENT = threading.local()
+
+
+def _current_stack():
+    # type: () -> List[Tuple[ResourceScheduler, Optional[ClaimsType]]]
+
+    if not hasattr(_CURRENT, 'stack'):
+        _CURRENT.stack = []
+
+    return _CURRENT.stack  # type: ignore  # thread-local attributes are untyped
+
+
+def parse_limits(specs):
+    # type: (List[str]) -> Dict[str, int]
+    """
+    Parse capacities of resource classes.
+
+    :param list(str) specs: list of ``<class>=<capacity>`` strings.
+    :rtype: dict(str, int)
+    :raises gluetool.glue.GlueError: when a spec is malformed.
+    """
+
+    limits = {}
+
+    for spec in specs:
+        name, sep, capacity = spec.rpartition('=')
+
+        name = name.strip()
+
+        if not sep or not name:
+            raise GlueError("Resource limit '{}' is not in form <class>=<capacity>".format(spec))
+
+        try:
+            limits[name] = int(capacity)
+
+        except ValueError:
+            raise GlueError("Capacity of resource class '{}' must be an integer, '{}' found".format(name, capacity))
+
+        if limits[name] <= 0:
+            raise GlueError("Capacity of resource class '{}' must be positive".format(name))
+
+    return limits
+
+
+class ResourceClass(object):
+    """
+    Resource class with a limited capacity - a weighted semaphore, recording how long its users had to wait.
+
+    :param str name: name of the class.
+    :param int capacity: capacity of the class.
+    """
+
+    def __init__(self, name, capacity):
+        # type: (str, int) -> None
+
+        self.name = name
+        self.capacity = capacity
+
+        self.available = capacity
+
+        #: Number of admitted claims.
+        self.admissions = 0
+
+        #: Total and longest time claims waited for their admission, in seconds.
+        self.total_delay = 0.0
+        self.max_delay = 0.0
+
+        self._condition = threading.Condition()
+
+    def __repr__(self):
+        # type: () -> str
+
+        return '<ResourceClass {}: {} of {} available>'.format(self.name, self.available, self.capacity)
+
+    def acquire(self, weight):
+        # type: (int) -> int
+        """
+        Wait until the given weight fits into the available capacity, and take it.
+
+        :param int weight: weight of the claim. Weights larger than the capacity are capped, such claims would
+            never be admitted otherwise.
+        :returns: the weight actually taken, to be passed to :py:meth:`release`.
+        """
+
+        weight = min(weight, self.capacity)
+
+        start = time.time()
+
+        with self._condition:
+            while self.available < weight:
+                self._condition.wait()
+
+            self.available -= weight
+
+            delay = time.time() - start
+
+            self.admissions += 1
+            self.total_delay += delay
+            self.max_delay = max(self.max_delay, delay)
+
+        return weight
+
+    def release(self, weight):
+        # type: (int) -> None
+        """
+        Return previously taken weight.
+
+        :param int weight: weight returned by :py:meth:`acquire`.
+        """
+
+        with self._condition:
+            self.available += weight
+            self._condition.notify_all()
+
+
+class ResourceScheduler(LoggerMixin, object):
+    """
+    Admits work through resource classes with limited capacities.
+
+    :param dict(str, int) limits: capacities of resource classes.
+    :param ContextAdapter logger: logger used for logging.
+    """
+
+    def __init__(self, limits=None, logger=None):
+        # type: (Optional[Dict[str, int]], Optional[ContextAdapter]) -> None
+
+        super(ResourceScheduler, self).__init__(logger or Logging.get_logger())
+
+        self.classes = {
+            name: ResourceClass(name, capacity) for name, capacity in iteritems(limits or {})
+        }  # type: Dict[str, ResourceClass]
+
+        # Resource classes held by each thread, with their taken weights - nested claims of the same class are
+        # admitted immediately, e.g. a shared function called by a module which already holds the class. Waiting
+        # for them would lead to a deadlock.
+        self._held = threading.local()
+
+    @contextlib.contextmanager
+    def admit(self, claims, command_claims=None):
+        # type: (Optional[ClaimsType], Optional[ClaimsType]) -> Iterator[None]
+        """
+        Context manager wrapping a piece of work - it waits until the work can be admitted by all resource classes
+        it claims, and returns taken weights when the work is finished.
+
+        Classes are always acquired in the order of their names, to avoid deadlocks between threads. Should
+        the thread already hold classes ordered after some of the claimed ones - e.g. a command claiming
+        a class while its module holds another one - these are released, and acquired again in the right order,
+        together with the claimed ones.
+
+        :param dict(str, int) claims: mapping between resource classes and weights the work claims.
+        :param dict(str, int) command_claims: claims of external commands the work runs via
+            :py:class:`gluetool.utils.Command`. See :py:func:`command_admission`.
+        """
+
+        if not self.classes:
+            yield
+            return
+
+        held = self._held.__dict__.setdefault('classes', {})  # type: Dict[str, int]
+
+        pending = {}  # type: ClaimsType
+
+        for name, weight in sorted(iteritems(claims or {})):
+            if name not in self.classes or weight <= 0:
+                continue
+
+            if name in held:
+                self.debug("resource class '{}' already held by this thread, not claiming it again".format(name))
+                continue
+
+            pending[name] = weight
+
+        # Held classes which must be acquired again, after the pending ones ordered before them.
+        reordered = {
+            name: weight for name, weight in iteritems(held) if pending and name > min(pending)
+        }  # type: ClaimsType
+
+        if reordered:
+            self.debug('releasing resource classes {} to acquire {} in order'.format(
+                ', '.join(sorted(reordered)), ', '.join(sorted(pending))
+            ))
+
+            for name, weight in iteritems(reordered):
+                del held[name]
+                self.classes[name].release(weight)
+
+        stack = _current_stack()
+        stack.append((self, command_claims))
+
+        try:
+            for name in sorted(set(pending) | set(reordered)):
+                held[name] = self.classes[name].acquire(pending.get(name) or reordered[name])
+
+            yield
+
+        finally:
+            stack.pop(-1)
+
+            # Release only what's been acquired - some classes may have been released by interrupted nested
+            # claims, and not acquired again.
+            for name in sorted(pending, reverse=True):
+                if name in held:
+                    self.classes[name].release(held.pop(name))
+
+    def report(self):
+        # type: () -> None
+        """
+        Log queueing delays of all resource classes.
+        """
+
+        if not self.classes:
+            return
+
+        table = [
+            [
+                name,
+                resource_class.capacity,
+                resource_class.admissions,
+                '{:.3f}'.format(resource_class.total_delay),
+                '{:.3f}'.format(resource_class.total_delay / resource_class.admissions
+                                if resource_class.admissions else 0.0),
+                '{:.3f}'.format(resource_class.max_delay)
+            ]
+            for name, resource_class in sorted(iteritems(self.classes))
+        ]
+
+        log_table(self.info, 'queueing delay per resource class', table,
+                  headers=['Class', 'Capacity', 'Admissions', 'Total delay (s)', 'Mean delay (s)', 'Max delay (s)'],
+                  tablefmt='psql')
+
+
+def command_admission():
+    # type: () -> Any
+    """
+    Return a context manager admitting an external command, using claims of the work running in the current
+    thread, e.g. ``execute`` method of a module. When no such work is running, the command is not limited.
+    """
+
+    stack = _current_stack()
+
+    if not stack or not stack[-1][1]:
+        return _null_context()
+
+    scheduler, command_claims = stack[-1]
+
+    return scheduler.admit(command_claims)
+
+
+@contextlib.contextmanager
+def _null_context():
+    # type: () -> Iterator[None]
+
+    yield
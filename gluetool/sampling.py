@@ -0,0 +1,256 @@
+"""
+Inspecting what a running ``gluetool`` is doing.
+
+When ``gluetool`` receives a signal set by ``--stack-dump-signal`` option - ``SIGUSR2`` by default - it logs
+stacks of all its threads, together with unfinished actions (see :py:mod:`gluetool.action`) of each thread.
+
+.. code-block:: bash
+
+   kill -USR2 <gluetool PID>
+
+When ``--sampling-duration`` is set as well, the signal also starts a sampling profiler: for the given number
+of seconds, stacks of all threads are sampled every ``--sampling-interval`` milliseconds, and when done,
+the samples are written into a file in the "collapsed stacks" format, accepted by flame graph tools, e.g.
+``flamegraph.pl`` or `speedscope <https://www.speedscope.app/>`_. Each stack starts with the thread name,
+followed by labels of unfinished actions and the name of the module being executed, if any:
+
+.. code-block:: none
+
+   MainThread;action:running pipeline;action:executing module;module:koji;run (tool.py:590);... 17
+"""
+
+import os
+import sys
+import threading
+import time
+import traceback
+
+from six import iteritems
+
+from .action import Action
+from .log import Logging, LoggerMixin, log_blob
+
+# Type annotations
+# pylint: disable=unused-import, wrong-import-order
+from typing import TYPE_CHECKING, Any, Dict, List, Optional  # noqa
+
+if TYPE_CHECKING:
+    from .log import ContextAdapter  # noqa
+
+
+#: Default signal triggering the dump of stacks.
+DEFAULT_STACK_DUMP_SIGNAL = 'SIGUSR2'
+
+#: Default sampling interval, in milliseconds.
+DEFAULT_SAMPLING_INTERVAL = 10
+
+#: Default path of the collapsed stacks file. ``{pid}`` and ``{time}`` are replaced by the process ID and
+#: the time the sampling started.
+DEFAULT_SAMPLING_OUTPUT = 'gluetool-stacks-{pid}-{time}.collapsed'
+
+
+def _thread_names():
+    # type: () -> Dict[Optional[int], str]
+
+    return {
+        thread.ident: thread.name for thread in threading.enumerate()
+    }
+
+
+def _annotations(actions):
+    # type: (List[Action]) -> List[str]
+    """
+    Describe unfinished actions of a thread, and the module being executed or destroyed.
+    """
+
+    annotations = ['action:{}'.format(action.label) for action in actions]
+
+    modules = [action.tags['unique-name'] for action in actions if 'unique-name' in action.tags]
+
+    if modules:
+        annotations.append('module:{}'.format(modules[-1]))
+
+    return annotations
+
+
+def format_thread_stacks():
+    # type: () -> str
+    """
+    Format stacks and unfinished actions of all threads.
+
+    :rtype: str
+    """
+
+    names = _thread_names()
+    action_stacks = Action.thread_action_stacks()
+
+    output = []
+
+    # pylint: disable=protected-access
+    for ident, frame in sorted(iteritems(sys._current_frames()), key=lambda item: names.get(item[0], '')):
+        output.append('Thread {} ({}):'.format(names.get(ident, '<unknown>'), ident))
+
+        for annotation in _annotations(action_stacks.get(ident, [])):
+            output.append('  {}'.format(annotation))
+
+        output.append(''.join(traceback.format_stack(frame)))
+
+    return '\n'.join(output)
+
+
+def dump_stacks(logger):
+    # type: (ContextAdapter) -> None
+    """
+    Log stacks and unfinished actions of all threads.
+
+    :param ContextAdapter logger: logger to use.
+    """
+
+    log_blob(logger.warning, 'stacks of all threads', format_thread_stacks())
+
+
+def _frame_label(frame):
+    # type: (Any) -> str
+
+    code = frame.f_code
+
+    return '{} ({}:{})'.format(code.co_name, os.path.basename(code.co_filename), code.co_firstlineno)
+
+
+class StackSampler(LoggerMixin, threading.Thread):
+    """
+    Samples stacks of all threads, and writes them into a file in the collapsed stacks format.
+
+    :param float interval: sampling interval, in seconds.
+    :param float duration: how long to sample, in seconds.
+    :param str output: path of the collapsed stacks file.
+    :param ContextAdapter logger: logger used for logging.
+    """
+
+    def __init__(self, interval, duration, output, logger=None):
+        # type: (float, float, str, Optional[ContextAdapter]) -> None
+
+        super(StackSampler, self).__init__(logger or Logging.get_logger(), name='stack-sampler')
+
+        self.daemon = True
+
+        self.interval = interval
+        self.duration = duration
+        self.output = output
+
+        #: Number of samples of each collapsed stack.
+        self.samples = {}  # type: Dict[str, int]
+
+        self._stop_event = threading.Event()
+
+    def sample(self):
+        # type: () -> None
+        """
+        Take one sample of stacks of all threads but the sampler itself.
+        """
+
+        names = _thread_names()
+        action_stacks = Action.thread_action_stacks()
+
+        # pylint: disable=protected-access
+        for ident, frame in iteritems(sys._current_frames()):
+            if ident == self.ident:
+                continue
+
+            frames = []
+
+            while frame is not None:
+                frames.append(_frame_label(frame))
+                frame = frame.f_back
+
+            labels = [names.get(ident, str(ident))] + _annotations(action_stacks.get(ident, [])) + frames[::-1]
+
+            # Semicolons separate frames in the collapsed format.
+            stack = ';'.join(label.replace(';', ':') for label in labels)
+
+            self.samples[stack] = self.samples.get(stack, 0) + 1
+
+    def write(self):
+        # type: () -> None
+        """
+        Write samples into the output file.
+        """
+
+        with open(self.output, 'w') as f:
+            for stack, count in sorted(iteritems(self.samples)):
+                f.write('{} {}\n'.format(stack, count))
+
+    def stop(self):
+        # type: () -> None
+        """
+        Stop sampling before the duration elapses.
+        """
+
+        self._stop_event.set()
+
+    def run(self):
+        # type: () -> None
+
+        self.info('sampling stacks every {:.0f} ms for {} seconds'.format(self.interval * 1000, self.duration))
+
+        deadline = time.time() + self.duration
+
+        while time.time() < deadline and not self._stop_event.is_set():
+            self.sample()
+
+            self._stop_event.wait(self.interval)
+
+        try:
+            self.write()
+
+        except (IOError, OSError) as exc:
+            self.error("Cannot write sampled stacks to '{}': {}".format(self.output, exc))
+            return
+
+        self.info("{} samples of stacks written to '{}'".format(sum(self.samples.values()), self.output))
+
+
+class StackInspector(LoggerMixin, object):
+    """
+    Reacts to a signal by dumping stacks of all threads and, when configured, by sampling them for a while.
+
+    :param float sampling_interval: sampling interval, in seconds.
+    :param float sampling_duration: how long to sample, in seconds. If not set, stacks are not sampled.
+    :param str sampling_output: path of the collapsed stacks file, see :py:data:`DEFAULT_SAMPLING_OUTPUT`.
+    :param ContextAdapter logger: logger used for logging.
+    """
+
+    def __init__(self, sampling_interval=DEFAULT_SAMPLING_INTERVAL / 1000.0, sampling_duration=None,
+                 sampling_output=DEFAULT_SAMPLING_OUTPUT, logger=None):
+        # type: (float, Optional[float], str, Optional[ContextAdapter]) -> None
+
+        super(StackInspector, self).__init__(logger or Logging.get_logger())
+
+        self.sampling_interval = sampling_interval
+        self.sampling_duration = sampling_duration
+        self.sampling_output = sampling_output
+
+        self.sampler = None  # type: Optional[StackSampler]
+
+    def __call__(self, signum=None, frame=None):
+        # type: (Optional[int], Any) -> None
+
+        # pylint: disable=unused-argument
+
+        dump_stacks(self.logger)
+
+        if not self.sampling_duration:
+            return
+
+        if self.sampler is not None and self.sampler.is_alive():
+            self.warning('stacks are already being sampled')
+            return
+
+        self.sampler = StackSampler(
+            self.sampling_interval,
+            self.sampling_duration,
+            self.sampling_output.format(pid=os.getpid(), time=int(time.time())),
+            logger=self.logger
+        )
+
+        self.sampler.start()
@@ -0,0 +1,262 @@
+"""
+Passing large data - arrays and byte blobs - between modules via shared memory.
+
+Some shared functions return large structures, and when modules run in separate processes, these would be
+pickled and copied. Instead, a module can publish the data in a shared memory block, and hand out just
+a small, picklable handle, :py:class:`SharedBlob`. Consumers then access the data via a :py:class:`memoryview`
+of the shared memory, without copying it.
+
+Blocks are owned by the pipeline which published them, and they are released when the pipeline finishes,
+after its modules were destroyed. Consumers must not use their views past this point.
+
+Modules access the registry of blocks via ``shared_memory`` shared function, provided by
+:py:class:`gluetool.glue.Glue`:
+
+.. code-block:: python
+
+   def results(self):
+       return self.shared('shared_memory').publish(self._parsed_results)
+
+   ...
+
+   view = self.shared('results').view()
+
+Requires Python 3.8 or newer, with :py:mod:`multiprocessing.shared_memory` available.
+"""
+
+import threading
+
+from .glue import GlueError
+from .log import Logging, LoggerMixin
+
+try:
+    from multiprocessing import shared_memory
+
+except ImportError:
+    shared_memory = None  # type: ignore  # pylint: disable=invalid-name
+
+# Type annotations
+# pylint: disable=unused-import, wrong-import-order
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, List, Optional, Tuple  # noqa
+
+if TYPE_CHECKING:
+    from .log import ContextAdapter  # noqa
+
+
+def _check_support():
+    # type: () -> None
+
+    if shared_memory is None:
+        raise GlueError('Shared memory is not supported by this Python version')
+
+
+class SharedBlob(object):
+    """
+    Handle of data published in a shared memory block. Handles are cheap to pickle, only the name of the block
+    and the description of data travel with them.
+
+    :param str name: name of the shared memory block.
+    :param int nbytes: size of the data, in bytes. The block may be larger.
+    :param str fmt: format of the data items, as understood by :py:mod:`struct` and :py:class:`memoryview`.
+    :param tuple(int) shape: shape of the data, as understood by :py:class:`memoryview`.
+    """
+
+    def __init__(self, name, nbytes, fmt='B', shape=None):
+        # type: (str, int, str, Optional[Tuple[int, ...]]) -> None
+
+        self.name = name
+        self.nbytes = nbytes
+        self.fmt = fmt
+        self.shape = shape
+
+        self._shm = None  # type: Any
+        self._views = []  # type: List[memoryview]
+
+    def __getstate__(self):
+        # type: () -> Dict[str, Any]
+
+        return {
+            'name': self.name,
+            'nbytes': self.nbytes,
+            'fmt': self.fmt,
+            'shape': self.shape
+        }
+
+    def __setstate__(self, state):
+        # type: (Dict[str, Any]) -> None
+
+        self.__init__(state['name'], state['nbytes'], fmt=state['fmt'], shape=state['shape'])  # type: ignore
+
+    def __repr__(self):
+        # type: () -> str
+
+        return '<SharedBlob {}: {} bytes, format {}, shape {}>'.format(self.name, self.nbytes, self.fmt, self.shape)
+
+    def _attach(self):
+        # type: () -> Any
+
+        if self._shm is not None:
+            return self._shm
+
+        _check_support()
+
+        self._shm = shared_memory.SharedMemory(name=self.name)
+
+        # Before Python 3.13, attaching to a block registers it with resource tracker of this process, which
+        # would then destroy the block when this process exits - but the block belongs to its publisher.
+        try:
+            # pylint: disable=protected-access
+            from multiprocessing import resource_tracker
+
+            resource_tracker.unregister(self._shm._name, 'shared_memory')  # type: ignore
+
+        # pylint: disable=broad-except
+        except Exception:
+            pass
+
+        return self._shm
+
+    def view(self):
+        # type: () -> memoryview
+        """
+        Return a zero-copy view of the data.
+
+        :rtype: memoryview
+        """
+
+        view = memoryview(self._attach().buf)[:self.nbytes]
+
+        if self.fmt != 'B' or self.shape is not None:
+            view = view.cast(self.fmt, self.shape) if self.shape is not None else view.cast(self.fmt)
+
+        self._views.append(view)
+
+        return view
+
+    def tobytes(self):
+        # type: () -> bytes
+        """
+        Return a copy of the data, as a ``bytes`` object.
+        """
+
+        return bytes(memoryview(self._attach().buf)[:self.nbytes])
+
+    def close(self):
+        # type: () -> None
+        """
+        Release all views handed out by this handle, and detach from the shared memory block.
+        """
+
+        for view in self._views:
+            try:
+                view.release()
+
+            except BufferError:
+                # There's still a view derived from this one, e.g. a slice. Nothing we can do about it.
+                pass
+
+        self._views = []
+
+        if self._shm is None:
+            return
+
+        try:
+            self._shm.close()
+
+        except BufferError:
+            pass
+
+        self._shm = None
+
+
+class SharedMemoryRegistry(LoggerMixin, object):
+    """
+    Keeps track of shared memory blocks published by pipelines.
+
+    :param callable owner: when called, returns an object to which published blocks would be tied, e.g.
+        the current pipeline. See :py:meth:`release`.
+    :param ContextAdapter logger: logger used for logging.
+    """
+
+    def __init__(self, owner=None, logger=None):
+        # type: (Optional[Callable[[], Hashable]], Optional[ContextAdapter]) -> None
+
+        super(SharedMemoryRegistry, self).__init__(logger or Logging.get_logger())
+
+        self._owner = owner or (lambda: None)
+
+        self._lock = threading.Lock()
+        self._blocks = {}  # type: Dict[Hashable, List[Tuple[Any, SharedBlob]]]
+
+    def publish(self, data):
+        # type: (Any) -> SharedBlob
+        """
+        Copy data into a new shared memory block.
+
+        :param data: data to publish - ``bytes``, ``bytearray``, :py:class:`array.array` or any other object
+            supporting the buffer protocol. Non-contiguous buffers are published in C order.
+        :rtype: SharedBlob
+        :returns: handle of the published data.
+        """
+
+        _check_support()
+
+        source = memoryview(data)
+
+        # Shared memory blocks cannot be empty.
+        shm = shared_memory.SharedMemory(create=True, size=max(source.nbytes, 1))
+
+        # Items of non-contiguous buffers, e.g. slices with a step, must be gathered first, they cannot be copied
+        # as a single block of bytes.
+        if source.c_contiguous:
+            shm.buf[:source.nbytes] = source.cast('B')
+
+        else:
+            shm.buf[:source.nbytes] = source.tobytes()
+
+        blob = SharedBlob(
+            shm.name,
+            source.nbytes,
+            fmt=source.format,
+            shape=source.shape if source.ndim > 1 else None
+        )
+
+        # Publisher's handle can reuse the block directly.
+        # pylint: disable=protected-access
+        blob._shm = shm
+
+        with self._lock:
+            self._blocks.setdefault(self._owner(), []).append((shm, blob))
+
+        self.debug('published {} bytes in shared memory block {}'.format(source.nbytes, shm.name))
+
+        return blob
+
+    def release(self, owner):
+        # type: (Hashable) -> None
+        """
+        Destroy all blocks published by an owner, e.g. when a pipeline finishes.
+
+        :param owner: owner of the blocks.
+        """
+
+        with self._lock:
+            blocks = self._blocks.pop(owner, [])
+
+        for shm, blob in blocks:
+            blob.close()
+
+            try:
+                shm.close()
+
+            except BufferError:
+                self.warn('Shared memory block {} is still in use'.format(shm.name))
+
+            try:
+                shm.unlink()
+
+            except OSError as exc:
+                self.warn('Cannot remove shared memory block {}: {}'.format(shm.name, exc))
+                continue
+
+            self.debug('released shared memory block {}'.format(shm.name))
@@ -2,6 +2,7 @@
 
 import pytest
 
+import gluetool.help
 import gluetool.log
 
 from . import CaplogWrapper
@@ -28,6 +29,15 @@ def fixture_enable_logger_propagate():
     gluetool.log.Logging.logger.propagate = True
 
 
+@pytest.fixture(name='disable_help_cache', scope='session', autouse=True)
+def fixture_disable_help_cache():
+    """
+    Do not let tests read or modify the persistent cache of rendered help texts of the user running them.
+    """
+
+    gluetool.help._HELP_CACHE = gluetool.help.HelpCache(None)
+
+
 @pytest.fixture(name='log', scope='function')
 def fixture_log(caplog):
     """
@@ -0,0 +1,209 @@
+# pylint: disable=blacklisted-name
+
+import errno
+import os
+
+import pytest
+
+import gluetool
+import gluetool.artifacts
+
+try:
+    import fcntl
+
+except ImportError:
+    pass
+
+from . import NonLoadingGlue
+
+
+@pytest.fixture(name='store')
+def fixture_store(tmpdir):
+    return gluetool.artifacts.ArtifactStore(str(tmpdir.join('store')), max_size=1024)
+
+
+def _create_file(tmpdir, name, content):
+    f = tmpdir.join(name)
+    f.write(content)
+
+    return str(f)
+
+
+def test_put_get(store, tmpdir):
+    filepath = _create_file(tmpdir, 'foo', 'some content')
+
+    digest = store.put(filepath, name='http://example.com/foo')
+
+    assert store.has(digest)
+    assert store.has('http://example.com/foo')
+    assert not store.has('http://example.com/bar')
+    assert not store.has(str(tmpdir))
+
+    # The same content is stored just once.
+    assert store.put(_create_file(tmpdir, 'bar', 'some content')) == digest
+    assert store.size == len('some content')
+
+    with open(store.get('http://example.com/foo'), 'r') as f:
+        assert f.read() == 'some content'
+
+    destination = str(tmpdir.join('copy'))
+
+    assert store.get(digest, destination=destination) == destination
+
+    with open(destination, 'r') as f:
+        assert f.read() == 'some content'
+
+    assert store.get('does-not-exist') is None
+
+
+def test_eviction(store, tmpdir):
+    owner = object()
+    store._owner = lambda: owner
+
+    first = store.put(_create_file(tmpdir, 'first', 'a' * 600))
+    store._index.used(first, 600, when=0)
+
+    # Both artifacts are referenced, neither can be evicted.
+    second = store.put(_create_file(tmpdir, 'second', 'b' * 600))
+
+    assert store.has(first)
+    assert store.has(second)
+
+    # When references are released, the least recently used one goes away.
+    store.release(owner)
+
+    assert not store.has(first)
+    assert store.has(second)
+    assert store.size == 600
+
+
+@pytest.mark.skipif(gluetool.artifacts.fcntl is None, reason='file locks are not supported')
+def test_eviction_other_process(store, tmpdir):
+    first = store.put(_create_file(tmpdir, 'first', 'a' * 600))
+    store.release(None)
+
+    # Another process references the artifact - it holds a shared lock of its lock file.
+    fd = os.open(store._lock_path(first), os.O_RDWR)
+    fcntl.flock(fd, fcntl.LOCK_SH)
+
+    try:
+        second = store.put(_create_file(tmpdir, 'second', 'b' * 600))
+
+        assert store.has(first)
+
+    finally:
+        os.close(fd)
+
+    store._evict()
+
+    assert not store.has(first)
+    assert store.has(second)
+    assert not os.path.exists(store._lock_path(first))
+
+
+def test_source_untouched(store, tmpdir):
+    filepath = _create_file(tmpdir, 'foo', 'some content')
+    os.utime(filepath, (0, 0))
+
+    digest = store.put(filepath)
+    store.get(digest)
+
+    assert os.stat(filepath).st_mtime == 0
+
+
+def test_source_modified(store, tmpdir):
+    filepath = _create_file(tmpdir, 'foo', 'some content')
+
+    digest = store.put(filepath)
+
+    # Caller modifies its file in place, the artifact must stay intact.
+    with open(filepath, 'w') as f:
+        f.write('other content')
+
+    with open(store.get(digest), 'r') as f:
+        assert f.read() == 'some content'
+
+
+def test_put_move(store, tmpdir):
+    filepath = _create_file(tmpdir, 'foo', 'some content')
+
+    digest = store.put(filepath, move=True)
+
+    assert not os.path.exists(filepath)
+
+    with open(store.get(digest), 'r') as f:
+        assert f.read() == 'some content'
+
+    # Already stored content - the moved file is not needed.
+    filepath = _create_file(tmpdir, 'bar', 'some content')
+
+    assert store.put(filepath, move=True) == digest
+    assert not os.path.exists(filepath)
+    assert [name for name in os.listdir(store._objects_dir) if name.startswith('.tmp-')] == []
+
+
+def test_put_move_other_filesystem(store, tmpdir, monkeypatch):
+    filepath = _create_file(tmpdir, 'foo', 'some content')
+    original_rename = os.rename
+
+    def _rename(src, dst):
+        if src == filepath:
+            raise OSError(errno.EXDEV, 'Invalid cross-device link')
+
+        original_rename(src, dst)
+
+    monkeypatch.setattr(gluetool.artifacts.os, 'rename', _rename)
+
+    digest = store.put(filepath, move=True)
+
+    assert not os.path.exists(filepath)
+
+    with open(store.get(digest), 'r') as f:
+        assert f.read() == 'some content'
+
+
+def test_existing_objects(store, tmpdir):
+    digest = store.put(_create_file(tmpdir, 'foo', 'some content'))
+
+    # Store created before the index existed.
+    os.unlink(os.path.join(store.path, 'index.db'))
+
+    store = gluetool.artifacts.ArtifactStore(store.path, max_size=1024)
+
+    assert store.size == len('some content')
+    assert store._index.least_recently_used() == [(digest, len('some content'))]
+
+
+def test_clone_file(tmpdir):
+    src = _create_file(tmpdir, 'src', 'some content')
+    dst = str(tmpdir.join('dst'))
+
+    assert gluetool.artifacts.clone_file(src, dst) in ('reflink', 'copy')
+
+    with open(dst, 'r') as f:
+        assert f.read() == 'some content'
+
+    # Files do not share their content.
+    with open(src, 'w') as f:
+        f.write('other content')
+
+    with open(dst, 'r') as f:
+        assert f.read() == 'some content'
+
+
+def test_shared_function(tmpdir):
+    glue = NonLoadingGlue()
+    glue._config['artifact-store'] = str(tmpdir.join('store'))
+
+    store = glue.shared('artifact_store')
+
+    assert isinstance(store, gluetool.artifacts.ArtifactStore)
+    assert glue.shared('artifact_store') is store
+
+    def _put(glue):
+        glue.shared('artifact_store').put(_create_file(tmpdir, 'foo', 'foo'))
+
+    assert glue.run_modules([gluetool.glue.PipelineStepCallback('put', _put)]) == (None, None)
+
+    # Pipeline is gone, and so are its references.
+    assert not store._refcounts
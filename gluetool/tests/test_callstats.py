@@ -0,0 +1,134 @@
+# pylint: disable=blacklisted-name
+
+import pytest
+
+import gluetool
+import gluetool.callstats
+
+from gluetool.callstats import LatencyHistogram, SharedFunctionStats, NO_CALLER
+
+from . import NonLoadingGlue
+
+
+class ProviderModule(gluetool.Module):
+    name = 'provider'
+
+    shared_functions = ['foo', 'bar']
+
+    def foo(self, fail=False):
+        if fail:
+            raise gluetool.GlueError('foo failed')
+
+        return 'foo'
+
+    def bar(self):
+        return self.shared('foo')
+
+
+class ConsumerModule(gluetool.Module):
+    name = 'consumer'
+
+    def execute(self):
+        assert self.shared('foo') == 'foo'
+        assert self.shared('bar') == 'foo'
+
+        with pytest.raises(gluetool.GlueError):
+            self.shared('foo', fail=True)
+
+
+def test_histogram():
+    histogram = LatencyHistogram()
+
+    assert histogram.percentile(50) is None
+
+    for value in range(1, 1001):
+        histogram.record(value)
+
+    assert histogram.count == 1000
+    assert histogram.max == 1000
+
+    # Buckets bound the relative error.
+    for pct in (50, 90, 99):
+        assert pct * 10 <= histogram.percentile(pct) <= pct * 10 * (1 + 1.0 / 2 ** gluetool.callstats.SUB_BUCKET_BITS)
+
+    assert histogram.percentile(100) == 1000
+
+    # Small values are exact.
+    assert LatencyHistogram._bucket(7) == (7, 7)
+
+
+def test_nested_caller():
+    stats = SharedFunctionStats()
+
+    assert stats.call('outer', 'provider', None, lambda: stats.call('inner', 'other', 'ignored', lambda: 17)) == 17
+
+    assert sorted(stats.stats) == [('inner', 'provider'), ('outer', NO_CALLER)]
+
+
+def test_pipeline(log):
+    glue = NonLoadingGlue()
+    glue.modules['provider'] = gluetool.glue.DiscoveredModule(klass=ProviderModule, group='none')
+    glue.modules['consumer'] = gluetool.glue.DiscoveredModule(klass=ConsumerModule, group='none')
+
+    glue._config['shared-stats'] = True
+
+    pipeline = gluetool.glue.Pipeline(glue, [
+        gluetool.glue.PipelineStepModule('provider'),
+        gluetool.glue.PipelineStepModule('consumer')
+    ])
+
+    assert glue.run_pipeline(pipeline) == (None, None)
+
+    stats = glue.shared_function_stats.stats
+
+    assert sorted(stats) == [('bar', 'consumer'), ('foo', 'consumer'), ('foo', 'provider')]
+
+    assert stats[('foo', 'consumer')].calls == 2
+    assert stats[('foo', 'consumer')].errors == 1
+    assert stats[('foo', 'provider')].calls == 1
+    assert stats[('foo', 'provider')].errors == 0
+
+    glue.shared_function_stats.report()
+
+    assert [row[:4] for row in log.records[-1].raw_table] == [
+        ['bar', 'consumer', 1, 0],
+        ['foo', 'consumer', 2, 1],
+        ['foo', 'provider', 1, 0]
+    ]
+
+
+def test_disabled():
+    assert NonLoadingGlue().shared_function_stats is None
+
+
+def test_plain_calls(monkeypatch, tmpdir):
+    glue = NonLoadingGlue()
+    glue._config['shared-stats'] = False
+
+    provider = ProviderModule(glue, 'provider')
+    provider.add_shared()
+
+    assert glue.shared('foo') == 'foo'
+    assert glue._shared_calls.plain is True
+
+    # Options are not looked up again, and the call is not wrapped.
+    def _fail(*args, **kwargs):
+        raise AssertionError('not a plain call')
+
+    monkeypatch.setattr(glue, 'option', _fail)
+    monkeypatch.setattr(gluetool.glue, 'partial', _fail)
+
+    assert glue.shared('foo') == 'foo'
+    assert glue.shared('does-not-exist') is None
+
+    monkeypatch.undo()
+
+    # Parsing options resolves the setup again.
+    config = tmpdir.join('gluetool')
+    config.write('[default]\nshared-stats = yes\n')
+
+    gluetool.Glue.parse_config(glue, [str(config)])
+
+    assert glue.shared('foo') == 'foo'
+    assert glue._shared_calls.plain is False
+    assert glue.shared_function_stats.stats[('foo', NO_CALLER)].calls == 1
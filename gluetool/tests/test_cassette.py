@@ -0,0 +1,146 @@
+# pylint: disable=blacklisted-name
+
+import pytest
+
+import gluetool
+import gluetool.cassette
+
+from gluetool.cassette import Cassette
+
+from . import NonLoadingGlue
+
+
+class ProviderModule(gluetool.Module):
+    name = 'provider'
+
+    shared_functions = ['foo', 'bar']
+
+    def __init__(self, *args, **kwargs):
+        super(ProviderModule, self).__init__(*args, **kwargs)
+
+        self.calls = 0
+
+    def foo(self, value, fail=False):
+        self.calls += 1
+
+        if fail:
+            raise gluetool.GlueError('foo failed')
+
+        return [value, self.calls]
+
+    def bar(self):
+        return 'bar'
+
+
+class ConsumerModule(gluetool.Module):
+    name = 'consumer'
+
+    def execute(self):
+        assert self.has_shared('foo')
+
+        assert self.shared('foo', 1) == [1, 1]
+        assert self.shared('foo', 2) == [2, 2]
+        assert self.shared('foo', 1) == [1, 3]
+
+        with pytest.raises(gluetool.GlueError, match=r'^foo failed$'):
+            self.shared('foo', 1, fail=True)
+
+
+def _glue(path, record=None, replay=None, provider=True):
+    glue = NonLoadingGlue()
+    glue.modules['provider'] = gluetool.glue.DiscoveredModule(klass=ProviderModule, group='none')
+    glue.modules['consumer'] = gluetool.glue.DiscoveredModule(klass=ConsumerModule, group='none')
+
+    glue._config['cassette'] = path
+    glue._config['record-shared'] = record or []
+    glue._config['replay-shared'] = replay or []
+
+    steps = [gluetool.glue.PipelineStepModule('consumer')]
+
+    if provider:
+        steps.insert(0, gluetool.glue.PipelineStepModule('provider'))
+
+    return glue, gluetool.glue.Pipeline(glue, steps)
+
+
+def test_record_replay(tmpdir):
+    path = str(tmpdir.join('cassette'))
+
+    glue, pipeline = _glue(path, record=['foo'])
+
+    assert glue.run_pipeline(pipeline) == (None, None)
+
+    assert [interaction.funcname for interaction in Cassette(path).interactions] == ['foo'] * 4
+
+    # Replay without the provider - consumer must get the very same results, in order.
+    glue, pipeline = _glue(path, replay=['foo'], provider=False)
+
+    assert glue.run_pipeline(pipeline) == (None, None)
+
+    # Shared functions not replayed are not affected.
+    assert glue.has_shared('bar') is False
+
+
+def test_rerecord(tmpdir):
+    path = str(tmpdir.join('cassette'))
+
+    for _ in range(2):
+        glue, pipeline = _glue(path, record=['foo'])
+
+        assert glue.run_pipeline(pipeline) == (None, None)
+
+    # Calls recorded by the first run were dropped.
+    assert len(Cassette(path).interactions) == 4
+
+
+def test_replay_repeated(tmpdir):
+    path = str(tmpdir.join('cassette'))
+
+    cassette = Cassette(path, record=['foo'])
+    cassette.record('foo', (1,), {}, lambda: 'first')
+    cassette.record('foo', (1,), {}, lambda: 'second')
+    cassette.save()
+
+    cassette = Cassette(path, replay=['foo'])
+
+    assert cassette.replay('foo', 1) == 'first'
+    assert cassette.replay('foo', 1) == 'second'
+    assert cassette.replay('foo', 1) == 'second'
+
+    with pytest.raises(gluetool.GlueError, match=r"^No call of shared function 'foo' with arguments \(2,\)"):
+        cassette.replay('foo', 2)
+
+
+def test_unpicklable(log, tmpdir):
+    cassette = Cassette(str(tmpdir.join('cassette')), record=['foo'])
+
+    result = cassette.record('foo', (), {}, lambda: lambda: None)
+
+    assert callable(result)
+    assert cassette.interactions == []
+    assert log.records[-1].message.startswith("Cannot record call of shared function 'foo'")
+
+
+def test_missing(tmpdir):
+    path = str(tmpdir.join('cassette'))
+
+    with pytest.raises(gluetool.GlueError, match=r"^Cassette '{}' does not exist$".format(path)):
+        Cassette(path, replay=['foo'])
+
+
+def test_disabled():
+    assert NonLoadingGlue().cassette is None
+
+
+def test_options_resolved_once(monkeypatch, tmpdir):
+    glue, _ = _glue(str(tmpdir.join('cassette')), record=['foo'])
+
+    assert glue.has_shared('foo') is False
+
+    def _fail(name):
+        raise AssertionError("option '{}' looked up".format(name))
+
+    monkeypatch.setattr(glue, 'option', _fail)
+
+    assert glue.has_shared('foo') is False
+    assert glue.get_shared('foo') is None
@@ -0,0 +1,114 @@
+# pylint: disable=blacklisted-name
+
+import os
+
+import pytest
+
+import gluetool
+
+from gluetool.configindex import ConfigIndex
+
+from . import NonLoadingGlue
+
+
+class DummyModule(gluetool.Module):
+    name = 'dummy'
+
+    options = {
+        'foo': {},
+        'bar': {
+            'type': int
+        }
+    }
+
+
+def _write(path, content):
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def test_read(tmpdir):
+    first, second = tmpdir.mkdir('first'), tmpdir.mkdir('second')
+
+    _write(str(first.join('dummy')), '[default]\nfoo = first\nbar = 1\n')
+    _write(str(second.join('dummy')), '[default]\nfoo = %(bar)s second\n')
+
+    paths = [str(first.join('dummy')), str(second.join('dummy')), str(tmpdir.join('missing', 'dummy'))]
+
+    index = ConfigIndex()
+
+    parser, parsed_paths = index.read(paths)
+
+    assert parsed_paths == paths[:2]
+    assert parser.get('default', 'foo') == '1 second'
+
+    # Parsed configuration is reused.
+    assert index.read(paths)[0] is parser
+
+
+def test_revalidate(tmpdir, monkeypatch):
+    directory = tmpdir.mkdir('config')
+    path = str(directory.join('dummy'))
+
+    _write(path, '[default]\nfoo = old\n')
+
+    index = ConfigIndex(revalidate_interval=0)
+
+    assert index.read([path])[0].get('default', 'foo') == 'old'
+    assert index.exists(path)
+    assert not index.exists(str(directory.join('other')))
+
+    # Not changed - no listing, no reading.
+    def _fail(*args, **kwargs):
+        raise AssertionError('directory listed again')
+
+    monkeypatch.setattr(os, 'listdir', _fail)
+
+    assert index.read([path])[0].get('default', 'foo') == 'old'
+
+    monkeypatch.undo()
+
+    _write(str(directory.join('dummy.new')), '[default]\nfoo = new\n')
+    os.rename(str(directory.join('dummy.new')), path)
+
+    # Make sure the modification time differs even on filesystems with coarse timestamps.
+    mtime = os.stat(str(directory)).st_mtime + 10
+    os.utime(str(directory), (mtime, mtime))
+
+    assert index.read([path])[0].get('default', 'foo') == 'new'
+
+
+def test_module(tmpdir):
+    config_dir, data_dir = tmpdir.mkdir('config'), tmpdir.mkdir('data')
+
+    _write(str(config_dir.join('dummy')), '[default]\nfoo = from-config\nbar = 17\n')
+    data_dir.mkdir('dummy')
+
+    glue = NonLoadingGlue()
+    glue._config['module-config-path'] = [str(config_dir)]
+    glue._config['module-data-path'] = [str(data_dir)]
+
+    module = DummyModule(glue, 'dummy')
+    module.parse_config()
+
+    assert module.option('foo') == 'from-config'
+    assert module.option('bar') == 17
+    assert module.data_path == str(data_dir.join('dummy'))
+
+    # Another instance is served from the index.
+    other = DummyModule(glue, 'dummy')
+    other.parse_config()
+
+    assert other.option('bar') == 17
+
+
+def test_invalid_value(tmpdir):
+    config_dir = tmpdir.mkdir('config')
+
+    _write(str(config_dir.join('dummy')), '[default]\nbar = not-a-number\n')
+
+    glue = NonLoadingGlue()
+    glue._config['module-config-path'] = [str(config_dir)]
+
+    with pytest.raises(gluetool.GlueError, match=r"Value of option 'bar' expected to be 'int'"):
+        DummyModule(glue, 'dummy').parse_config()
@@ -208,3 +208,35 @@ def test_callback_module_instantiate():
 
     mod.execute()
     callback.assert_called_once()
+    assert mod.logger is not None
+    assert not isinstance(mod, MagicMock)
+
+    mod.sanity()
+    mod.destroy()
+    callback.assert_called_once()
+
+
+def test_callback_step_run(log):
+    """
+    Run a pipeline with callback steps, and check arguments and failure propagation.
+    """
+
+    glue = NonLoadingGlue()
+
+    callback = MagicMock()
+
+    def _broken_callback(glue):
+        raise Exception('dummy failure')
+
+    failure, destroy_failure = glue.run_modules([
+        gluetool.glue.PipelineStepCallback('callback', callback, 1, foo='bar'),
+        gluetool.glue.PipelineStepCallback('broken-callback', _broken_callback)
+    ])
+
+    callback.assert_called_once_with(glue, 1, foo='bar')
+
+    assert destroy_failure is None
+    assert isinstance(failure, gluetool.Failure)
+    assert failure.module.unique_name == 'broken-callback'
+    assert str(failure.exception) == 'dummy failure'
+    assert log.match(message='Exception raised: dummy failure', levelno=logging.ERROR)
@@ -1,4 +1,5 @@
 import string
+import sys
 import types
 
 import pytest
@@ -8,6 +9,7 @@ from mock import MagicMock
 from hypothesis import example, given, strategies as st
 
 import gluetool
+import gluetool.utils
 from gluetool import GlueError
 
 
@@ -132,3 +134,24 @@ def test_failure(module, exc_info):
     else:
         assert failure.exception is None
         assert failure.soft is False
+
+
+def test_failure_compact_command_output():
+    output = gluetool.utils.ProcessOutput(['/bin/false'], 1, 'a' * 100 + 'tail', None, {})
+
+    try:
+        raise gluetool.GlueCommandError(['/bin/false'], output)
+
+    except gluetool.GlueCommandError:
+        failure = gluetool.Failure(None, sys.exc_info())
+
+    failure.compact(max_output_length=4)
+
+    assert failure.exc_info[2] is None
+    assert output.stdout == '... (100 characters truncated)\ntail'
+    assert output.stderr is None
+
+    # Compacting twice is fine.
+    failure.compact(max_output_length=4)
+
+    assert output.stdout == '... (100 characters truncated)\ntail'
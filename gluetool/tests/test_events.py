@@ -0,0 +1,151 @@
+# pylint: disable=blacklisted-name
+
+import json
+import os
+import socket
+import threading
+
+import pytest
+
+import gluetool
+import gluetool.events
+
+from gluetool.events import EventStream
+
+from . import NonLoadingGlue
+
+
+class DummyModule(gluetool.Module):
+    name = 'Dummy module'
+
+    shared_functions = ['foo']
+
+    options = {
+        'fail': {
+            'action': 'store_true'
+        }
+    }
+
+    def execute(self):
+        if self.option('fail'):
+            raise gluetool.GlueError('failed as requested')
+
+    def foo(self):
+        pass
+
+
+class Receiver(threading.Thread):
+    """
+    Collects events from a socket - the kernel queues just a few datagrams, the rest would be dropped.
+    """
+
+    def __init__(self, path):
+        super(Receiver, self).__init__()
+
+        self.path = path
+        self.events = []
+
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.bind(path)
+        self._socket.settimeout(0.5)
+
+    def run(self):
+        while True:
+            try:
+                self.events.append(json.loads(self._socket.recv(65536).decode('utf-8')))
+
+            except socket.timeout:
+                return
+
+    def collect(self):
+        self.join()
+        self._socket.close()
+
+        return self.events
+
+
+@pytest.fixture(name='receiver')
+def fixture_receiver(tmpdir):
+    receiver = Receiver(str(tmpdir.join('events.sock')))
+    receiver.start()
+
+    return receiver
+
+
+def test_emit(receiver):
+    stream = EventStream(receiver.path)
+
+    with gluetool.action.Action('some action'):
+        stream.emit('some-event', foo='bar', baz=object)
+
+    stream.close()
+
+    events = receiver.collect()
+
+    assert len(events) == 1
+    assert events[0]['event'] == 'some-event'
+    assert events[0]['foo'] == 'bar'
+    assert events[0]['baz'] == repr(object)
+    assert events[0]['actions'][-1] == 'some action'
+    assert events[0]['pid'] == os.getpid()
+    assert 'monotonic' in events[0]
+
+
+def test_no_consumer(tmpdir):
+    stream = EventStream(str(tmpdir.join('events.sock')))
+
+    stream.emit('some-event')
+
+    assert stream.dropped == 1
+
+
+def test_fifo(tmpdir):
+    path = str(tmpdir.join('events.fifo'))
+    os.mkfifo(path)
+
+    stream = EventStream(path)
+
+    # No reader yet.
+    stream.emit('dropped-event')
+
+    assert stream.dropped == 1
+
+    reader = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+
+    stream.emit('some-event')
+    stream.close()
+
+    lines = os.read(reader, 65536).decode('utf-8').splitlines()
+
+    os.close(reader)
+
+    assert [json.loads(line)['event'] for line in lines] == ['some-event']
+
+
+def test_pipeline_events(receiver):
+    glue = NonLoadingGlue()
+    glue.modules['Dummy module'] = gluetool.glue.DiscoveredModule(klass=DummyModule, group='none')
+    glue._config['event-socket'] = receiver.path
+
+    failure, _ = glue.run_module('Dummy module', ['--fail'])
+
+    assert failure is not None
+
+    events = [
+        (event['event'], event.get('phase'), event.get('function')) for event in receiver.collect()
+    ]
+
+    assert events == [
+        ('pipeline-started', None, None),
+        ('module-phase-started', 'setup', None),
+        ('module-phase-finished', 'setup', None),
+        ('module-phase-started', 'sanity', None),
+        ('module-phase-finished', 'sanity', None),
+        ('module-phase-started', 'execute', None),
+        ('failure', None, None),
+        ('shared-function-registered', None, 'foo'),
+        ('module-phase-finished', 'execute', None),
+        ('module-phase-started', 'destroy', None),
+        ('module-phase-finished', 'destroy', None),
+        ('pipeline-finished', None, None)
+    ]
@@ -0,0 +1,94 @@
+import gc
+
+import pytest
+
+import gluetool
+
+from gluetool.gctuning import DEFAULT_STARTUP_GC_THRESHOLD, GCTuner
+
+
+@pytest.fixture(name='gc_state', autouse=True)
+def fixture_gc_state():
+    enabled, thresholds = gc.isenabled(), gc.get_threshold()
+
+    yield
+
+    gc.set_threshold(*thresholds)
+
+    if enabled:
+        gc.enable()
+
+    if hasattr(gc, 'unfreeze'):
+        gc.unfreeze()
+
+
+def test_unknown_strategy():
+    with pytest.raises(gluetool.GlueError, match=r"Unknown GC strategy 'foo'"):
+        GCTuner('foo')
+
+
+def test_default():
+    thresholds = gc.get_threshold()
+
+    tuner = GCTuner('default')
+    tuner.begin_startup()
+
+    assert gc.isenabled()
+    assert gc.get_threshold() == thresholds
+
+    tuner.end_startup()
+
+    assert gc.get_threshold() == thresholds
+
+
+def test_threshold():
+    thresholds = gc.get_threshold()
+
+    tuner = GCTuner('threshold')
+    tuner.begin_startup()
+
+    assert gc.get_threshold() == (DEFAULT_STARTUP_GC_THRESHOLD,) + thresholds[1:]
+
+    tuner.end_startup()
+
+    assert gc.get_threshold() == thresholds
+
+
+def test_disable():
+    tuner = GCTuner('disable')
+    tuner.begin_startup()
+
+    assert not gc.isenabled()
+
+    tuner.end_startup()
+
+    assert gc.isenabled()
+
+
+def test_switch():
+    thresholds = gc.get_threshold()
+
+    tuner = GCTuner('threshold')
+    tuner.begin_startup()
+
+    tuner.switch('disable')
+
+    assert not gc.isenabled()
+    assert gc.get_threshold() == thresholds
+
+    tuner.end_startup()
+
+    assert gc.isenabled()
+
+
+@pytest.mark.skipif(not hasattr(gc, 'freeze'), reason='gc.freeze() not available')
+def test_freeze():
+    tuner = GCTuner('freeze')
+    tuner.begin_startup()
+
+    objects = [[] for _ in range(1000)]  # noqa
+
+    tuner.end_startup()
+
+    assert gc.isenabled()
+    assert gc.get_freeze_count() >= 1000
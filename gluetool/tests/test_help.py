@@ -1,8 +1,13 @@
+import time
+
 import pytest
 
+import gluetool
 import gluetool.glue
 import gluetool.help
 
+from . import NonLoadingGlue, create_module
+
 
 def do_test_extract_eval_context_info(source_class, expected):
     assert gluetool.help.extract_eval_context_info(source_class()) == expected
@@ -50,3 +55,210 @@ def test_extract_eval_context_info_unchanged():
             return {}
 
     do_test_extract_eval_context_info(DummyModule, {})
+
+
+class HelpfulModule(gluetool.Module):
+    name = 'helpful'
+
+    options = {
+        'foo': {
+            'help': """
+                    Foo with ``literal``, spanning
+                    multiple lines (default: %(default)s).
+                    """,
+            'default': 'bar'
+        },
+        'baz': {
+            'help': 'Baz without help.'
+        }
+    }
+
+
+def test_option_help_lazy(monkeypatch):
+    raw_help = HelpfulModule.options['foo']['help']
+
+    def _fail(text):
+        raise AssertionError('option help rendered')
+
+    monkeypatch.setattr(gluetool.help, 'rst_to_text', _fail)
+
+    glue = NonLoadingGlue()
+    module = HelpfulModule(glue, 'helpful')
+    module._parse_args([])
+
+    # Declaration was not touched.
+    assert HelpfulModule.options['foo']['help'] == raw_help
+
+    monkeypatch.undo()
+
+    rendered = []
+    original_rst_to_text = gluetool.help.rst_to_text
+
+    def _rst_to_text(text):
+        rendered.append(text)
+
+        return original_rst_to_text(text)
+
+    monkeypatch.setattr(gluetool.help, 'rst_to_text', _rst_to_text)
+    monkeypatch.setattr(gluetool.help, '_OPTION_HELP_CACHE', {})
+
+    for _ in range(2):
+        parser, _ = HelpfulModule._get_args_parser(formatter_class=gluetool.help.LineWrapRawTextHelpFormatter)
+
+        help_text = ' '.join(parser.format_help().split())
+
+        assert 'Foo with literal, spanning multiple lines (default: bar).' in help_text
+        assert 'Baz without help.' in help_text
+
+    # Each text was rendered just once.
+    assert 'Baz without help.' in rendered
+    assert len(rendered) == len(set(rendered))
+
+    # Rendering for a different width is not served from the cache.
+    del rendered[:]
+
+    monkeypatch.setattr(gluetool.help, 'CROP_WIDTH', gluetool.help.CROP_WIDTH + 1)
+
+    assert gluetool.help.option_help('Baz without help.') == 'Baz without help.'
+    assert rendered == ['Baz without help.']
+
+
+class DocumentedModule(gluetool.Module):
+    """
+    Module with ``documentation``.
+    """
+
+    name = 'documented'
+
+    options_note = 'Some note.'
+
+    shared_functions = ['foo']
+
+    def foo(self):
+        """
+        Foo, shared.
+        """
+
+
+def test_help_lazy(monkeypatch, capsys):
+    def _fail(*args, **kwargs):
+        raise AssertionError('help generated')
+
+    monkeypatch.setattr(gluetool.help, 'rst_to_text', _fail)
+    monkeypatch.setattr(gluetool.glue, 'eval_context_help', _fail)
+
+    _, module = create_module(DocumentedModule, name='documented')
+
+    module.parse_args([])
+
+    monkeypatch.undo()
+
+    with pytest.raises(SystemExit):
+        module.parse_args(['--help'])
+
+    help_text = capsys.readouterr().out
+
+    assert 'Module with documentation.' in help_text
+    assert 'Some note.' in help_text
+    assert 'Foo, shared.' in help_text
+
+
+def test_format_help_callables():
+    calls = []
+
+    def _text(text):
+        def _callback():
+            calls.append(text)
+            return text
+
+        return _callback
+
+    parser, _ = DocumentedModule._get_args_parser(description=_text('Lazy description.'), epilog=_text('Lazy epilog.'))
+
+    assert calls == []
+
+    help_text = parser.format_help()
+
+    assert 'Lazy description.' in help_text
+    assert 'Lazy epilog.' in help_text
+    assert calls == ['Lazy description.', 'Lazy epilog.']
+
+    # resolved texts are kept by the parser
+    parser.format_help()
+
+    assert calls == ['Lazy description.', 'Lazy epilog.']
+
+
+def test_help_cache(monkeypatch, tmpdir):
+    path = str(tmpdir.join('cache', 'help.json'))
+
+    monkeypatch.setattr(gluetool.help, '_HELP_CACHE', gluetool.help.HelpCache(path, version='1.0'))
+
+    assert gluetool.help.rst_to_text('Some ``text``.').strip() == 'Some text.'
+
+    gluetool.help.help_cache().save()
+
+    # Served from the cache, without rendering.
+    def _fail(text):
+        raise AssertionError('text rendered')
+
+    monkeypatch.setattr(gluetool.help, '_render_rst', _fail)
+    monkeypatch.setattr(gluetool.help, '_HELP_CACHE', gluetool.help.HelpCache(path, version='1.0'))
+
+    assert gluetool.help.rst_to_text('Some ``text``.').strip() == 'Some text.'
+
+    # Different width, or a different version of gluetool, are not served from the cache.
+    monkeypatch.setattr(gluetool.help, 'CROP_WIDTH', gluetool.help.CROP_WIDTH + 1)
+
+    with pytest.raises(AssertionError, match=r'^text rendered$'):
+        gluetool.help.rst_to_text('Some ``text``.')
+
+    monkeypatch.undo()
+
+    cache = gluetool.help.HelpCache(path, version='2.0')
+
+    assert cache.get(cache.key('Some ``text``.', gluetool.help.CROP_WIDTH, False)) is None
+
+
+def test_help_cache_key():
+    key = gluetool.help.HelpCache.key(u'Some \u00e9 text.', 80, False)
+
+    assert key == gluetool.help.HelpCache.key(u'Some \u00e9 text.'.encode('utf-8'), 80, False)
+    assert key != gluetool.help.HelpCache.key(u'Some \u00e9 text.', 80, True)
+
+
+def test_help_cache_prune(tmpdir):
+    path = str(tmpdir.join('help.json'))
+
+    cache = gluetool.help.HelpCache(path, version='1.0', max_entries=2)
+    cache.put('first', 'first text')
+    cache.put('second', 'second text')
+    cache.save()
+
+    time.sleep(0.01)
+
+    # Use the first entry, and add another one - the second entry is the least recently used one.
+    cache = gluetool.help.HelpCache(path, version='1.0', max_entries=2)
+    assert cache.get('first') == 'first text'
+    cache.put('third', 'third text')
+    cache.save()
+
+    cache = gluetool.help.HelpCache(path, version='1.0', max_entries=2)
+
+    assert cache.get('first') == 'first text'
+    assert cache.get('second') is None
+    assert cache.get('third') == 'third text'
+
+
+def test_help_cache_broken(tmpdir):
+    path = tmpdir.join('help.json')
+    path.write('not a JSON')
+
+    cache = gluetool.help.HelpCache(str(path), version='1.0')
+
+    assert cache.get('foo') is None
+
+    cache.put('foo', 'bar')
+    cache.save()
+
+    assert gluetool.help.HelpCache(str(path), version='1.0').get('foo') == 'bar'
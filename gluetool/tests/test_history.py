@@ -0,0 +1,185 @@
+# pylint: disable=blacklisted-name
+
+import sqlite3
+
+import pytest
+
+import gluetool
+import gluetool.history
+
+from gluetool.glue import ModuleTiming, PipelineStepModule
+from gluetool.history import RunHistory, percentile
+
+from . import NonLoadingGlue
+
+
+class DummyModule(gluetool.Module):
+    name = 'Dummy module'
+
+    options = {
+        'fail': {
+            'action': 'store_true'
+        }
+    }
+
+    def execute(self):
+        if self.option('fail'):
+            raise gluetool.SoftGlueError('failed softly')
+
+
+class FakePipeline(object):
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, started, durations):
+        self.started = started
+        self.finished = started + sum(durations)
+        self.timings = [
+            ModuleTiming('Dummy module', 'dummy', 'execute', started, duration, None) for duration in durations
+        ]
+
+
+@pytest.fixture(name='history')
+def fixture_history(tmpdir):
+    return RunHistory(str(tmpdir.join('history.db')))
+
+
+@pytest.fixture(name='glue')
+def fixture_glue(tmpdir):
+    glue = NonLoadingGlue()
+    glue.modules['Dummy module'] = gluetool.glue.DiscoveredModule(klass=DummyModule, group='none')
+
+    glue._config['history'] = True
+    glue._config['history-db'] = str(tmpdir.join('history.db'))
+
+    return glue
+
+
+def test_percentile():
+    assert percentile([], 50) is None
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([4.0, 1.0, 3.0, 2.0], 50) == 2.5
+    assert percentile(list(range(101)), 95) == 95
+
+
+def test_record_pipeline(glue):
+    assert glue.run_module('Dummy module') == (None, None)
+
+    pipeline_run = glue.run_history._connection().execute(
+        'SELECT started, finished, failure_class FROM runs'
+    ).fetchall()
+
+    assert len(pipeline_run) == 1
+    assert pipeline_run[0][0] <= pipeline_run[0][1]
+    assert pipeline_run[0][2] is None
+
+    phases = glue.run_history._connection().execute('SELECT module, phase FROM phases').fetchall()
+
+    assert sorted(phases) == [
+        ('Dummy module', 'destroy'),
+        ('Dummy module', 'execute'),
+        ('Dummy module', 'sanity'),
+        ('Dummy module', 'setup')
+    ]
+
+
+def test_record_fingerprint(glue, monkeypatch):
+    calls = []
+
+    def _options_fingerprint(module):
+        calls.append(module.unique_name)
+
+        return 'dummy-fingerprint'
+
+    monkeypatch.setattr(DummyModule, 'options_fingerprint', _options_fingerprint)
+
+    glue.run_module('Dummy module')
+
+    assert calls == ['Dummy module']
+    assert glue.run_history._connection().execute(
+        'SELECT DISTINCT fingerprint FROM phases'
+    ).fetchall() == [('dummy-fingerprint',)]
+
+    glue._config['history'] = False
+    del calls[:]
+
+    glue.run_module('Dummy module')
+
+    assert calls == []
+
+
+def test_record_failure(glue):
+    failure, _ = glue.run_module('Dummy module', ['--fail'])
+
+    assert isinstance(failure.exception, gluetool.SoftGlueError)
+
+    assert glue.run_history._connection().execute(
+        'SELECT failure_class, failure_module, failure_soft FROM runs'
+    ).fetchall() == [('SoftGlueError', 'Dummy module', 1)]
+
+
+def test_record_rss_growth(history, monkeypatch):
+    monkeypatch.setattr(gluetool.history, 'peak_rss', lambda: 1500)
+
+    history.record(FakePipeline(1.0, [1.0]), rss_baseline=1000)
+    history.record(FakePipeline(2.0, [1.0]))
+
+    assert history._connection().execute(
+        'SELECT peak_rss, peak_rss_growth FROM runs ORDER BY started'
+    ).fetchall() == [(None, 500), (None, None)]
+
+
+def test_migration(tmpdir):
+    path = str(tmpdir.join('history.db'))
+
+    # Database created before fingerprints were recorded.
+    connection = sqlite3.connect(path)
+    connection.executescript(gluetool.history.SCHEMA)
+    connection.execute('INSERT INTO runs (started, finished) VALUES (1.0, 2.0)')
+    connection.execute(
+        "INSERT INTO phases (run_id, module, unique_name, phase, started, duration) "
+        "VALUES (1, 'Dummy module', 'dummy', 'execute', 1.0, 1.0)"
+    )
+    connection.commit()
+    connection.close()
+
+    history = RunHistory(path)
+
+    assert history._connection().execute('PRAGMA user_version').fetchone()[0] == len(gluetool.history.MIGRATIONS)
+
+    history.record(FakePipeline(3.0, [2.0]))
+
+    assert history.durations() == {('Dummy module', 'execute'): [1.0, 2.0]}
+    assert history.execute_durations('Dummy module', None) == []
+
+    # Opening the database again must not apply migrations again.
+    RunHistory(path)
+
+
+def test_history_disabled():
+    glue = NonLoadingGlue()
+
+    assert glue.run_history is None
+
+
+def test_report(history):
+    now = 100 * 24 * 3600
+
+    # Baseline: 10 runs, 1 second each, then the module got 2x slower.
+    for day in range(20, 10, -1):
+        history.record(FakePipeline(now - day * 24 * 3600, [1.0]))
+
+    for day in range(5, 0, -1):
+        history.record(FakePipeline(now - day * 24 * 3600, [2.0]))
+
+    report = history.report(now=now)
+
+    assert len(report) == 1
+    assert report[0]['module'] == 'Dummy module'
+    assert report[0]['phase'] == 'execute'
+    assert report[0]['runs'] == 5
+    assert report[0]['p95'] == 2.0
+    assert report[0]['baseline-p95'] == 1.0
+    assert report[0]['regression'] is True
+
+    # Not enough samples for flagging a regression.
+    assert history.report(now=now, min_samples=10)[0]['regression'] is False
@@ -0,0 +1,167 @@
+# pylint: disable=blacklisted-name
+
+import pytest
+
+import gluetool
+import gluetool.incremental
+import gluetool.version
+
+from . import NonLoadingGlue
+
+
+class DeterministicModule(gluetool.Module):
+    name = 'deterministic'
+
+    options = {
+        'foo': {},
+        'input-file': {}
+    }
+
+    shared_functions = ('result', 'publish')
+
+    deterministic = True
+    deterministic_results = ('result',)
+    incremental_environment = ['GLUETOOL_TEST_INCREMENTAL']
+    incremental_files = ['input-file']
+
+    executed = 0
+    published = []
+
+    def execute(self):
+        DeterministicModule.executed += 1
+
+        self._result = 'result of {}'.format(self.option('foo'))
+
+    def result(self):
+        return self._result
+
+    def publish(self, destination):
+        DeterministicModule.published.append(destination)
+
+
+@pytest.fixture(name='glue')
+def fixture_glue(tmpdir):
+    glue = NonLoadingGlue()
+
+    glue._config.update({
+        'incremental': True,
+        'incremental-store': str(tmpdir.join('store'))
+    })
+
+    glue.modules['deterministic'] = gluetool.glue.DiscoveredModule(klass=DeterministicModule, group='none')
+
+    DeterministicModule.executed = 0
+    DeterministicModule.published = []
+
+    return glue
+
+
+def _run(glue, **options):
+    results = []
+
+    def _collect(glue):
+        results.append(glue.shared('result'))
+
+    assert glue.run_modules([
+        gluetool.glue.PipelineStepModule('deterministic', options=options),
+        gluetool.glue.PipelineStepCallback('collect', _collect)
+    ]) == (None, None)
+
+    return results[0]
+
+
+def test_skip_unchanged(glue, tmpdir, monkeypatch):
+    input_file = tmpdir.join('input')
+    input_file.write('some input')
+
+    monkeypatch.setenv('GLUETOOL_TEST_INCREMENTAL', 'foo')
+
+    assert _run(glue, foo='bar', **{'input-file': str(input_file)}) == 'result of bar'
+    assert DeterministicModule.executed == 1
+
+    # Nothing changed, module should not run and its result should be restored.
+    assert _run(glue, foo='bar', **{'input-file': str(input_file)}) == 'result of bar'
+    assert DeterministicModule.executed == 1
+
+    # Change an option...
+    assert _run(glue, foo='baz', **{'input-file': str(input_file)}) == 'result of baz'
+    assert DeterministicModule.executed == 2
+
+    # ... environment variable...
+    monkeypatch.setenv('GLUETOOL_TEST_INCREMENTAL', 'bar')
+
+    assert _run(glue, foo='baz', **{'input-file': str(input_file)}) == 'result of baz'
+    assert DeterministicModule.executed == 3
+
+    # ... and content of an input file.
+    input_file.write('some other input')
+
+    assert _run(glue, foo='baz', **{'input-file': str(input_file)}) == 'result of baz'
+    assert DeterministicModule.executed == 4
+
+
+def test_code_changed(glue, monkeypatch):
+    assert _run(glue, foo='bar') == 'result of bar'
+    assert DeterministicModule.executed == 1
+
+    # Pretend the module comes from another file, e.g. it's been updated.
+    monkeypatch.setattr(gluetool.glue.inspect, 'getsourcefile', lambda klass: gluetool.incremental.__file__)
+
+    assert _run(glue, foo='bar') == 'result of bar'
+    assert DeterministicModule.executed == 2
+
+    monkeypatch.setattr(gluetool.version, '__version__', 'some-other-version', raising=False)
+
+    assert _run(glue, foo='bar') == 'result of bar'
+    assert DeterministicModule.executed == 3
+
+
+def test_results_declared(glue):
+    assert _run(glue, foo='bar') == 'result of bar'
+    assert _run(glue, foo='bar') == 'result of bar'
+
+    assert DeterministicModule.executed == 1
+
+    # Only declared results are stored - other shared functions are not called.
+    assert DeterministicModule.published == []
+
+
+def test_restored_result():
+    restored = gluetool.incremental.RestoredResult('result', 'some value')
+
+    assert restored() == 'some value'
+
+    with pytest.raises(gluetool.GlueError, match=r"Shared function 'result' of a skipped deterministic module"):
+        restored('foo')
+
+    with pytest.raises(gluetool.GlueError):
+        restored(foo='bar')
+
+
+def test_disabled(glue):
+    glue._config['incremental'] = False
+
+    assert glue.incremental_store is None
+
+    _run(glue, foo='bar')
+    _run(glue, foo='bar')
+
+    assert DeterministicModule.executed == 2
+
+
+def test_fingerprint():
+    assert gluetool.incremental.fingerprint({'foo': 1, 'bar': object}) \
+        == gluetool.incremental.fingerprint({'bar': object, 'foo': 1})
+
+    assert gluetool.incremental.fingerprint({'foo': 1}) != gluetool.incremental.fingerprint({'foo': 2})
+
+
+def test_store_broken_entry(tmpdir):
+    store = gluetool.incremental.IncrementalStore(str(tmpdir))
+
+    store.save('abcdef', {'foo': 'bar'})
+    assert store.load('abcdef') == {'foo': 'bar'}
+
+    tmpdir.join('ab', 'abcdef').write('garbage')
+    assert store.load('abcdef') is None
+    assert store.load('does-not-exist') is None
@@ -0,0 +1,180 @@
+# pylint: disable=blacklisted-name
+
+import pytest
+
+import gluetool
+
+from . import create_module
+
+
+class DummyModule(gluetool.Module):
+    """
+    Dummy module, implementing necessary methods and attributes
+    to pass through Glue's internal machinery.
+    """
+
+    name = 'Dummy module'
+
+    options = [
+        ('Some options', {
+            ('f', 'foo', 'foo-alias'): {},
+            'bar': {
+                'type': int,
+                'default': 79
+            },
+            'baz': {
+                'choices': ('a', 'b')
+            }
+        }),
+        {
+            'enable-qux': {
+                'action': 'store_true'
+            },
+            'quux': {
+                'action': 'append',
+                'type': int,
+                'default': []
+            }
+        }
+    ]
+
+    required_options = ('foo',)
+
+
+class ActionsModule(gluetool.Module):
+    name = 'Actions module'
+
+    options = {
+        'timeout': {
+            'type': int,
+            'default': '60'
+        },
+        'verbose': {
+            'action': 'count'
+        },
+        'tag': {
+            'action': 'append_const',
+            'const': 'tagged',
+            'default': ['initial']
+        }
+    }
+
+
+@pytest.fixture(name='module')
+def fixture_module():
+    return create_module(DummyModule)[1]
+
+
+@pytest.fixture(name='actions_module')
+def fixture_actions_module():
+    return create_module(ActionsModule)[1]
+
+
+def test_defaults(module):
+    module._inject_options({})
+
+    assert module._config == {
+        'foo': None,
+        'bar': 79,
+        'baz': None,
+        'enable-qux': False,
+        'quux': []
+    }
+
+
+def test_values(module):
+    module._inject_options({
+        'foo-alias': 'some foo',
+        'bar': '17',
+        'baz': 'b',
+        'enable-qux': 'yes',
+        'quux': ['1', 2]
+    })
+
+    assert module.option('foo', 'bar', 'baz', 'enable-qux', 'quux') == ('some foo', 17, 'b', True, [1, 2])
+
+
+def test_text_values(module):
+    module._inject_options({
+        'bar': u'17',
+        'quux': [u'1']
+    })
+
+    assert module.option('bar', 'quux') == (17, [1])
+
+
+def test_actions_defaults(actions_module):
+    actions_module._inject_options({})
+
+    # Like argument parser, string defaults are converted.
+    assert actions_module.option('timeout', 'verbose', 'tag') == (60, None, ['initial'])
+
+
+def test_actions_values(actions_module):
+    actions_module._inject_options({
+        'timeout': '30',
+        'verbose': '2',
+        'tag': True
+    })
+
+    assert actions_module.option('timeout', 'verbose', 'tag') == (30, 2, ['initial', 'tagged'])
+
+
+def test_actions_match_parser(actions_module):
+    actions_module._parse_args(['--verbose', '--verbose', '--tag'])
+    parsed = dict(actions_module._config)
+
+    actions_module._config = {}
+    actions_module._inject_options({'verbose': 2, 'tag': True})
+
+    assert actions_module._config == parsed
+
+
+def test_invalid_count(actions_module):
+    with pytest.raises(gluetool.GlueError, match=r"Value of option 'verbose' expected to be 'int'"):
+        actions_module._inject_options({'verbose': 'many'})
+
+
+def test_config_not_overwritten(module):
+    module._config['bar'] = 13
+
+    module._inject_options({})
+
+    assert module.option('bar') == 13
+
+
+def test_unknown_option(module):
+    with pytest.raises(gluetool.GlueError, match=r"Unknown option\(s\) 'does-not-exist'"):
+        module._inject_options({'does-not-exist': 1})
+
+
+def test_invalid_type(module):
+    with pytest.raises(gluetool.GlueError, match=r"Value of option 'bar' expected to be 'int' but cannot be parsed"):
+        module._inject_options({'bar': 'not a number'})
+
+
+def test_invalid_choice(module):
+    with pytest.raises(gluetool.GlueError, match=r"Value of option 'baz' must be one of 'a', 'b', 'c' found"):
+        module._inject_options({'baz': 'c'})
+
+
+def test_required(module):
+    module._inject_options({})
+
+    with pytest.raises(gluetool.GlueError, match=r"Missing required 'foo' option"):
+        module.check_required_options()
+
+
+def test_pipeline_step(monkeypatch):
+    glue, _ = create_module(DummyModule)
+
+    glue.modules['Dummy module'] = gluetool.glue.DiscoveredModule(klass=DummyModule, group='none')
+
+    pipeline = gluetool.glue.Pipeline(glue, [
+        gluetool.glue.PipelineStepModule('Dummy module', options={'foo': 'some foo'})
+    ])
+
+    monkeypatch.setattr(DummyModule, 'parse_args', lambda *args, **kwargs: pytest.fail('parse_args called'))
+
+    assert pipeline._setup() is None
+    assert pipeline.modules[0].option('foo', 'bar') == ('some foo', 79)
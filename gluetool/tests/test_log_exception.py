@@ -95,3 +95,49 @@ def test_sanity():
         # match lines one by one, using expected as a regex pattern
         for l1, l2 in zip(EXPECTED.split('\n'), gluetool.log.LoggingFormatter._format_exception_chain(excinfo).split('\n')):
             assert re.match('^' + l1 + '$', l2)
+
+
+class Sentinel(object):
+    # pylint: disable=too-few-public-methods
+    pass
+
+
+def leaky():
+    sentinel = Sentinel()  # noqa
+    blob = 'x' * 1000  # noqa
+
+    foo()
+
+
+def test_compact():
+    import gc
+    import weakref
+
+    try:
+        leaky()
+
+    except gluetool.GlueError:
+        failure = gluetool.Failure(None, sys.exc_info())
+
+    sentinels = [obj for obj in gc.get_objects() if isinstance(obj, Sentinel)]
+    assert len(sentinels) == 1
+
+    sentinel_ref = weakref.ref(sentinels[0])
+    del sentinels
+
+    failure.compact(max_repr_length=20)
+
+    assert failure.compacted is True
+    assert failure.exc_info[2] is None
+    assert failure.exception.caused_by[2] is None
+
+    gc.collect()
+    assert sentinel_ref() is None
+
+    output = gluetool.log.LoggingFormatter._format_exception_chain(failure.exc_info)
+
+    assert 'At {}:81, in foo:'.format(__file__) in output
+    assert 'At {}:69, in baz:'.format(__file__) in output
+    assert "blob = 'xxxxxxxxxxxxxxxxxxx... (982 characters truncated)" in output
+
+    assert 'line 81, in foo' in failure.serialize_to_json()['traceback']
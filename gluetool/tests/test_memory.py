@@ -0,0 +1,121 @@
+# pylint: disable=blacklisted-name
+
+import gc
+import weakref
+
+import gluetool
+import gluetool.memory
+
+from gluetool.memory import MemorySnapshot, current_rss, take_snapshot
+
+from . import NonLoadingGlue
+
+
+class HungryModule(gluetool.Module):
+    name = 'Hungry module'
+
+    shared_functions = ['foo']
+
+    options = {
+        'fail': {
+            'action': 'store_true'
+        }
+    }
+
+    instances = []
+
+    def __init__(self, *args, **kwargs):
+        super(HungryModule, self).__init__(*args, **kwargs)
+
+        HungryModule.instances.append(weakref.ref(self))
+
+    def execute(self):
+        # pylint: disable=attribute-defined-outside-init
+        self.blob = [[] for _ in range(20000)]
+
+        if self.option('fail'):
+            raise gluetool.GlueError('failed as requested')
+
+    def destroy(self, failure=None):
+        del self.blob
+
+    def foo(self):
+        pass
+
+
+def test_snapshot():
+    snapshot = take_snapshot()
+
+    assert isinstance(snapshot, MemorySnapshot)
+    assert snapshot.gc_objects > 0
+    assert snapshot.rss > 0
+    assert current_rss() > 0
+
+
+def test_memory_accounting(log):
+    glue = NonLoadingGlue()
+    glue.modules['Hungry module'] = gluetool.glue.DiscoveredModule(klass=HungryModule, group='none')
+    glue._config['memory-accounting'] = True
+
+    pipeline = gluetool.glue.Pipeline(glue, [gluetool.glue.PipelineStepModule('Hungry module')])
+
+    # Collections running during the pipeline would spoil object counts.
+    gc.disable()
+
+    try:
+        assert glue.run_pipeline(pipeline) == (None, None)
+
+    finally:
+        gc.enable()
+
+    assert [(measurement.module, measurement.phase) for measurement in pipeline.memory] == [
+        ('Hungry module', 'execute'),
+        ('Hungry module', 'destroy')
+    ]
+
+    execute, destroy = pipeline.memory
+
+    assert execute.after.gc_objects - execute.before.gc_objects >= 10000
+    assert destroy.after.gc_objects - destroy.before.gc_objects <= -10000
+
+    record = [record for record in log.records if getattr(record, 'raw_intro', None) == 'memory usage per module']
+
+    assert len(record) == 1
+    assert [row[:2] for row in record[0].raw_table] == [['Hungry module', 'execute'], ['Hungry module', 'destroy']]
+
+
+def test_memory_accounting_disabled():
+    glue = NonLoadingGlue()
+    glue.modules['Hungry module'] = gluetool.glue.DiscoveredModule(klass=HungryModule, group='none')
+
+    pipeline = gluetool.glue.Pipeline(glue, [gluetool.glue.PipelineStepModule('Hungry module')])
+
+    glue.run_pipeline(pipeline)
+
+    assert pipeline.memory == []
+
+
+def test_release_modules():
+    HungryModule.instances = []
+
+    glue = NonLoadingGlue()
+    glue.modules['Hungry module'] = gluetool.glue.DiscoveredModule(klass=HungryModule, group='none')
+
+    pipeline = gluetool.glue.Pipeline(glue, [
+        gluetool.glue.PipelineStepModule('Hungry module'),
+        gluetool.glue.PipelineStepModule('Hungry module', argv=['--fail'])
+    ])
+
+    failure, _ = glue.run_pipeline(pipeline)
+
+    assert pipeline.modules == []
+    assert pipeline.shared_functions == {}
+    assert pipeline.current_module is None
+
+    # The failing module is still referenced by the failure, but it no longer holds the module whose shared
+    # function it overloaded.
+    assert failure.module._overloaded_shared_functions == {}
+
+    gc.collect()
+
+    assert [instance() is None for instance in HungryModule.instances] == [True, False]
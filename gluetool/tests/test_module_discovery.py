@@ -154,3 +154,96 @@ def test_check_pm_file(log, tmpdir, glue, expected, error_message, content):
 def test_check_pm_file_missing(log, tmpdir, glue):
     with pytest.raises(gluetool.GlueError, match=r"Unable to check check module file 'foo\.txt': \[Errno 2\] No such file or directory: 'foo\.txt'"):
         glue._check_pm_file('foo.txt')
+
+
+def test_discover_eval_context_info(log, tmpdir, glue):
+    tmpdir.join('providers.py').write('''
+import gluetool
+
+from gluetool.glue import Configurable
+
+
+class ProviderModule(gluetool.Module):
+    name = 'provider'
+
+    @property
+    def eval_context(self):
+        __content__ = {
+            'FOO': """
+                   Foo, provided.
+                   """
+        }
+
+        raise AssertionError('eval context evaluated')
+
+
+class DerivedModule(ProviderModule):
+    name = 'derived'
+
+
+class SilentModule(gluetool.Module):
+    name = 'silent'
+
+    @property
+    def eval_context(self):
+        return {}
+
+
+class PlainModule(gluetool.Module):
+    name = 'plain'
+
+    def __init__(self, *args, **kwargs):
+        raise AssertionError('module instantiated')
+''')
+
+    registry = glue.discover_modules(entry_points=[], paths=[str(tmpdir)])
+
+    assert registry['provider'].eval_context_info() == {'FOO': 'Foo, provided.'}
+    assert registry['derived'].eval_context_info() == {'FOO': 'Foo, provided.'}
+    assert registry['silent'].eval_context_info() == {}
+    assert registry['plain'].eval_context_info() == {}
+
+
+def test_discover_eval_context_info_lazy(monkeypatch, log, tmpdir, glue):
+    tmpdir.join('broken.py').write('''
+import gluetool
+
+
+class BrokenModule(gluetool.Module):
+    name = 'broken'
+
+    @property
+    def eval_context(self):
+        __content__ = {
+            'FOO': some_function()
+        }
+''')
+
+    calls = []
+
+    def _extract(*args, **kwargs):
+        calls.append(args)
+
+        return original_extract(*args, **kwargs)
+
+    original_extract = gluetool.glue.extract_eval_context_info_from_ast
+    monkeypatch.setattr(gluetool.glue, 'extract_eval_context_info_from_ast', _extract)
+
+    registry = glue.discover_modules(entry_points=[], paths=[str(tmpdir)])
+
+    assert calls == []
+    assert not any(record.levelno == logging.WARNING for record in log.records)
+
+    assert registry['broken'].eval_context_info() == {}
+    assert registry['broken'].eval_context_info() == {}
+
+    assert len(calls) == 1
+    assert any(record.message.startswith("Cannot read eval context info from 'BrokenModule'") for record in log.records)
+
+
+def test_discover_eval_context_info_unknown(log, glue):
+    registry = {}
+
+    glue._register_module(registry, 'dummy-group', DummyModule, 'dummy-filepath')
+
+    assert registry['dummy-module'].eval_context_info is None
@@ -56,3 +56,61 @@ def test_multiple_options(configured_module):
 def test_no_option(module):
     with pytest.raises(gluetool.GlueError, match=r'Specify at least one option'):
         module.option()
+
+
+def test_args_parser_reused(module):
+    module.parse_args(['--foo', 'first'])
+
+    other = create_module(DummyModule, name='other-module')[1]
+    other.parse_args(['--bar', 'second'])
+
+    assert module.option('foo') == 'first'
+    assert other.option('foo') is None
+    assert other.option('bar') == 'second'
+
+    parsers = [
+        entry for key, entry in gluetool.glue.Configurable._args_parsers.items() if key[0] is DummyModule
+    ]
+
+    assert len(parsers) == 1
+
+    # Each instance gets its own usage.
+    parser, _ = other._get_args_parser(usage='other usage')
+
+    assert parser.usage == 'other usage'
+    assert parsers[0][1].usage != 'other usage'
+
+
+def test_args_parser_copy(module):
+    module.parse_args([])
+
+    parser, _ = module._get_args_parser()
+
+    parser.add_argument('--baz')
+    parser._action_groups[-1].add_argument('--qux')
+    parser.add_mutually_exclusive_group().add_argument('--quux', action='store_true')
+    parser.set_defaults(foo='default foo')
+
+    assert parser.parse_args(['--baz', 'some baz', '--qux', 'some qux', '--quux']).baz == 'some baz'
+    assert parser.parse_args([]).foo == 'default foo'
+
+    cached, _ = module._get_args_parser()
+
+    for option in ('--baz', '--qux', '--quux'):
+        assert option not in cached._option_string_actions
+        assert option not in cached.format_help()
+
+    assert not cached._mutually_exclusive_groups
+    assert cached.parse_args([]).foo is None
+
+    with pytest.raises(gluetool.GlueError, match=r'unrecognized arguments: --baz'):
+        cached.parse_args(['--baz', 'some baz'])
+
+
+def test_args_parser_declaration_intact():
+    options = gluetool.Glue.options[-1]
+
+    gluetool.Glue._create_args_parser()
+    gluetool.Glue._create_args_parser()
+
+    assert options['pipeline']['raw'] is True
@@ -33,6 +33,16 @@ TESTCASES = [
         ('module', 'module', ['foo', 'bar']),
         "PipelineStepModule('module', actual_module='module', argv=['foo', 'bar'])",
         'module'
+    ],
+    # options mapping
+    [
+        ('module',),
+        {
+            'options': {'foo': 'bar'}
+        },
+        ('module', 'module', []),
+        "PipelineStepModule('module', actual_module='module', argv=[], options={'foo': 'bar'})",
+        'module'
     ]
 ]
 
@@ -0,0 +1,120 @@
+# pylint: disable=blacklisted-name
+
+import os
+import pstats
+import threading
+
+import gluetool
+import gluetool.profiling
+
+from gluetool.profiling import ModuleProfiler
+
+from . import NonLoadingGlue
+
+
+def provider_work():
+    return sum(range(1000))
+
+
+def consumer_work():
+    return sum(range(1000))
+
+
+class ProviderModule(gluetool.Module):
+    name = 'provider'
+
+    shared_functions = ['foo']
+
+    def foo(self):
+        return provider_work()
+
+
+class ConsumerModule(gluetool.Module):
+    name = 'consumer'
+
+    def execute(self):
+        consumer_work()
+
+        self.shared('foo')
+
+
+def _functions(path):
+    return [function for _, _, function in pstats.Stats(path).stats]
+
+
+def test_nested_profiles(tmpdir):
+    profiler = ModuleProfiler(str(tmpdir))
+
+    with profiler.profile('consumer', 'execute'):
+        consumer_work()
+
+        with profiler.profile('provider', 'shared.foo'):
+            provider_work()
+
+    profiler.report()
+
+    assert sorted(os.listdir(str(tmpdir))) == ['consumer.execute.pstats', 'provider.shared.foo.pstats']
+
+    assert 'consumer_work' in _functions(str(tmpdir.join('consumer.execute.pstats')))
+    assert 'provider_work' not in _functions(str(tmpdir.join('consumer.execute.pstats')))
+    assert 'provider_work' in _functions(str(tmpdir.join('provider.shared.foo.pstats')))
+
+
+def test_parallel_threads(tmpdir, log):
+    profiler = ModuleProfiler(str(tmpdir))
+
+    def _other_thread():
+        with profiler.profile('provider', 'execute'):
+            provider_work()
+
+    with profiler.profile('consumer', 'execute'):
+        thread = threading.Thread(target=_other_thread, name='other-thread')
+        thread.start()
+        thread.join()
+
+        consumer_work()
+
+    assert sorted(profiler.profiles.keys()) == ['consumer.execute']
+    assert log.match(message="Not profiling 'provider.execute', thread 'MainThread' is being profiled")
+
+    # Once the first thread finished, others can be profiled.
+    thread = threading.Thread(target=_other_thread)
+    thread.start()
+    thread.join()
+
+    assert sorted(profiler.profiles.keys()) == ['consumer.execute', 'provider.execute']
+
+
+def test_pipeline(tmpdir, log):
+    glue = NonLoadingGlue()
+    glue.modules['provider'] = gluetool.glue.DiscoveredModule(klass=ProviderModule, group='none')
+    glue.modules['consumer'] = gluetool.glue.DiscoveredModule(klass=ConsumerModule, group='none')
+
+    glue._config['profile-modules'] = str(tmpdir)
+    glue._config['profile-shared'] = True
+
+    pipeline = gluetool.glue.Pipeline(glue, [
+        gluetool.glue.PipelineStepModule('provider'),
+        gluetool.glue.PipelineStepModule('consumer')
+    ])
+
+    assert glue.run_pipeline(pipeline) == (None, None)
+
+    glue.module_profiler.report(top=5)
+
+    assert sorted(os.listdir(str(tmpdir))) == [
+        'consumer.destroy.pstats',
+        'consumer.execute.pstats',
+        'consumer.sanity.pstats',
+        'provider.destroy.pstats',
+        'provider.execute.pstats',
+        'provider.sanity.pstats',
+        'provider.shared.foo.pstats'
+    ]
+
+    assert 'provider_work' in _functions(str(tmpdir.join('provider.shared.foo.pstats')))
+    assert log.match(message='module profiles written into {}'.format(str(tmpdir)))
+
+
+def test_disabled():
+    assert NonLoadingGlue().module_profiler is None
@@ -0,0 +1,267 @@
+# pylint: disable=blacklisted-name
+
+import threading
+import time
+
+import pytest
+
+import gluetool
+
+from gluetool.resources import ResourceScheduler, command_admission, parse_limits
+
+from . import NonLoadingGlue
+
+
+def test_parse_limits():
+    assert parse_limits(['cpu=4', 'api:koji = 10']) == {'cpu': 4, 'api:koji': 10}
+
+
+@pytest.mark.parametrize('spec, error', [
+    ('cpu', r"Resource limit 'cpu' is not in form <class>=<capacity>"),
+    ('cpu=many', r"Capacity of resource class 'cpu' must be an integer, 'many' found"),
+    ('cpu=0', r"Capacity of resource class 'cpu' must be positive")
+])
+def test_parse_limits_malformed(spec, error):
+    with pytest.raises(gluetool.GlueError, match=error):
+        parse_limits([spec])
+
+
+def _run_concurrently(scheduler, claims, count=4):
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def _work():
+        with scheduler.admit(claims):
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+
+            time.sleep(0.05)
+
+            with lock:
+                running.pop()
+
+    threads = [threading.Thread(target=_work) for _ in range(count)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    return max(peak)
+
+
+def test_admit_limits_concurrency():
+    scheduler = ResourceScheduler(limits={'cpu': 2})
+
+    assert _run_concurrently(scheduler, {'cpu': 1}) == 2
+
+    cpu = scheduler.classes['cpu']
+
+    assert cpu.available == 2
+    assert cpu.admissions == 4
+    assert cpu.max_delay > 0.0
+
+
+def test_admit_heavy_claim():
+    scheduler = ResourceScheduler(limits={'cpu': 2})
+
+    # Claims heavier than the capacity are capped, and admitted one by one.
+    assert _run_concurrently(scheduler, {'cpu': 5}) == 1
+
+
+def test_admit_unlimited_class():
+    scheduler = ResourceScheduler(limits={'cpu': 1})
+
+    assert _run_concurrently(scheduler, {'disk': 1}) == 4
+
+
+def test_admit_nested():
+    scheduler = ResourceScheduler(limits={'cpu': 1})
+
+    # Nested claim of a class held by the thread must not wait for itself.
+    with scheduler.admit({'cpu': 1}):
+        with scheduler.admit({'cpu': 1}):
+            assert scheduler.classes['cpu'].available == 0
+
+    assert scheduler.classes['cpu'].available == 1
+
+
+def test_admit_nested_logged(log):
+    scheduler = ResourceScheduler(limits={'cpu': 1})
+
+    with scheduler.admit({'cpu': 1}):
+        with scheduler.admit({'cpu': 1}):
+            pass
+
+    assert log.match(message="resource class 'cpu' already held by this thread, not claiming it again")
+
+
+def test_admit_nested_order(log):
+    scheduler = ResourceScheduler(limits={'api': 1, 'disk': 1})
+
+    # Two modules hold one class each, and run commands claiming the other one.
+    both_admitted = threading.Event()
+    admitted = []
+    finished = []
+
+    def _work(claims, command_claims):
+        with scheduler.admit(claims, command_claims=command_claims):
+            admitted.append(1)
+
+            if len(admitted) == 2:
+                both_admitted.set()
+
+            both_admitted.wait(10)
+
+            with command_admission():
+                time.sleep(0.05)
+
+        finished.append(1)
+
+    threads = [
+        threading.Thread(target=_work, args=({'disk': 1}, {'api': 1})),
+        threading.Thread(target=_work, args=({'api': 1}, {'disk': 1}))
+    ]
+
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    for thread in threads:
+        thread.join(10)
+
+    assert len(finished) == 2
+    assert log.match(message='releasing resource classes disk to acquire api in order')
+
+    assert scheduler.classes['api'].available == 1
+    assert scheduler.classes['disk'].available == 1
+
+
+def test_command_admission():
+    scheduler = ResourceScheduler(limits={'disk': 1})
+
+    with command_admission():
+        assert scheduler.classes['disk'].available == 1
+
+    with scheduler.admit({}, command_claims={'disk': 1}):
+        with command_admission():
+            assert scheduler.classes['disk'].available == 0
+
+        assert scheduler.classes['disk'].available == 1
+
+
+def test_command_run_admitted():
+    scheduler = ResourceScheduler(limits={'disk': 1})
+
+    with scheduler.admit({}, command_claims={'disk': 1}):
+        gluetool.utils.Command(['/bin/true']).run()
+
+    assert scheduler.classes['disk'].admissions == 1
+
+
+def test_report(log):
+    scheduler = ResourceScheduler(limits={'cpu': 1})
+
+    with scheduler.admit({'cpu': 1}):
+        pass
+
+    scheduler.report()
+
+    assert log.records[-1].message.startswith('queueing delay per resource class:')
+    assert log.records[-1].raw_table[0][:3] == ['cpu', 1, 1]
+
+
+def test_pipelines_share_limits():
+    glue = NonLoadingGlue()
+    glue._config['resource-limits'] = ['cpu=1']
+
+    running = []
+    peak = []
+
+    class BusyModule(gluetool.Module):
+        name = 'Busy module'
+
+        resources = {
+            'execute': {'cpu': 1}
+        }
+
+        def execute(self):
+            running.append(self)
+            peak.append(len(running))
+            time.sleep(0.05)
+            running.remove(self)
+
+    glue.modules['Busy module'] = gluetool.glue.DiscoveredModule(klass=BusyModule, group='none')
+
+    pipelines = [
+        gluetool.glue.Pipeline(glue, [
+            gluetool.glue.PipelineStepModule('busy-{}'.format(i), actual_module='Busy module')
+        ])
+        for i in range(3)
+    ]
+
+    assert glue.run_pipelines(pipelines) == [(None, None)] * 3
+    assert max(peak) == 1
+    assert glue.resource_scheduler.classes['cpu'].admissions == 3
+
+
+def test_shared_function_claims():
+    glue = NonLoadingGlue()
+    glue._config['resource-limits'] = ['api:koji=2']
+
+    seen = []
+
+    class ApiModule(gluetool.Module):
+        name = 'API module'
+
+        shared_functions = ['fetch']
+
+        resources = {
+            'fetch': {'api:koji': 1}
+        }
+
+        def fetch(self):
+            seen.append(glue.resource_scheduler.classes['api:koji'].available)
+
+    glue.modules['API module'] = gluetool.glue.DiscoveredModule(klass=ApiModule, group='none')
+
+    def _fetch(glue):
+        glue.shared('fetch')
+
+    assert glue.run_modules([
+        gluetool.glue.PipelineStepModule('API module'),
+        gluetool.glue.PipelineStepCallback('fetch', _fetch)
+    ]) == (None, None)
+
+    assert seen == [1]
+
+
+def test_shared_function_unlimited(monkeypatch):
+    glue = NonLoadingGlue()
+    glue._config['shared-stats'] = True
+
+    class ApiModule(gluetool.Module):
+        name = 'API module'
+
+        shared_functions = ['fetch']
+
+        resources = {
+            'fetch': {'api:koji': 1}
+        }
+
+        def fetch(self):
+            return 'fetched'
+
+    ApiModule(glue, 'API module').add_shared()
+
+    # Without limits, the scheduler is not used at all, even when calls are wrapped by other features.
+    def _fail(*args, **kwargs):
+        raise AssertionError('scheduler used')
+
+    monkeypatch.setattr(ResourceScheduler, 'admit', _fail)
+
+    assert glue.shared('fetch') == 'fetched'
+    assert glue._shared_calls.scheduler is None
@@ -1,6 +1,8 @@
 # pylint: disable=blacklisted-name
 
 import inspect
+import threading
+import time
 import pytest
 
 from mock import MagicMock
@@ -276,3 +278,75 @@ def test_module_has_shared(module, monkeypatch):
 
     assert module.has_shared('foo') == 17
     module.glue.has_shared.assert_called_once_with('foo')
+
+
+def test_run_pipelines(glue):
+    class SiblingModule(gluetool.Module):
+        name = 'Sibling module'
+        shared_functions = ('sibling',)
+
+        def execute(self):
+            assert self.shared('parent') == 17
+
+        def sibling(self):
+            return self.unique_name
+
+    glue.modules['Sibling module'] = gluetool.glue.DiscoveredModule(klass=SiblingModule, group='none')
+
+    parent = gluetool.glue.Pipeline(glue, [])
+    parent.shared_functions['parent'] = (None, MagicMock(return_value=17))
+    glue.pipelines.append(parent)
+
+    # Each pipeline waits until all its siblings registered their shared functions, then checks what it can see.
+    registered = threading.Condition()
+    seen = {}
+
+    def _check(glue, index):
+        with registered:
+            seen[index] = None
+            registered.notify_all()
+
+            deadline = time.time() + 10
+
+            while len(seen) < 3 and time.time() < deadline:
+                registered.wait(0.1)
+
+        seen[index] = glue.shared('sibling')
+
+    pipelines = [
+        gluetool.glue.NamedPipeline(glue, 'pipeline-{}'.format(i), [
+            gluetool.glue.PipelineStepModule('sibling-{}'.format(i), actual_module='Sibling module'),
+            gluetool.glue.PipelineStepCallback('check-{}'.format(i), _check, i)
+        ])
+        for i in range(3)
+    ]
+
+    results = glue.run_pipelines(pipelines)
+
+    assert results == [(None, None)] * 3
+
+    # Each pipeline sees its own module's shared function, not those of its siblings.
+    assert seen == {
+        0: 'sibling-0',
+        1: 'sibling-1',
+        2: 'sibling-2'
+    }
+
+    # Sibling registries were dropped with their threads, and the parent's stack is intact.
+    assert glue.pipelines[-1] is parent
+    assert glue.has_shared('sibling') is False
+
+
+def test_run_pipelines_failure(glue):
+    pipelines = [
+        gluetool.glue.NamedPipeline(glue, 'good', [gluetool.glue.PipelineStepModule('Dummy module')]),
+        gluetool.glue.NamedPipeline(glue, 'broken', [gluetool.glue.PipelineStepModule('Broken module')])
+    ]
+
+    (good_failure, good_destroy_failure), (failure, destroy_failure) = glue.run_pipelines(pipelines)
+
+    assert good_failure is None
+    assert good_destroy_failure is None
+    assert isinstance(failure, gluetool.Failure)
+    assert str(failure.exception) == 'bar'
+    assert destroy_failure is None
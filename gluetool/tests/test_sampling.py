@@ -0,0 +1,88 @@
+import threading
+
+import gluetool
+import gluetool.sampling
+
+from gluetool.action import Action
+from gluetool.sampling import StackInspector, StackSampler, format_thread_stacks
+
+
+class Busy(threading.Thread):
+    """
+    Waits inside an action, until told to finish.
+    """
+
+    def __init__(self):
+        super(Busy, self).__init__(name='busy-thread')
+
+        self.started_event = threading.Event()
+        self.finish_event = threading.Event()
+
+    def run(self):
+        with Action('busy work', tags={'unique-name': 'busy-module'}):
+            self.started_event.set()
+            self.finish_event.wait()
+
+
+def _run_busy(callback):
+    busy = Busy()
+    busy.start()
+    busy.started_event.wait()
+
+    try:
+        return callback()
+
+    finally:
+        busy.finish_event.set()
+        busy.join()
+
+
+def test_format_thread_stacks():
+    output = _run_busy(format_thread_stacks)
+
+    assert 'Thread busy-thread' in output
+    assert '  action:busy work\n  module:busy-module\n' in output
+    assert 'in run' in output
+
+
+def test_sample():
+    sampler = StackSampler(0.01, 1, 'dummy')
+
+    _run_busy(sampler.sample)
+
+    stacks = [stack for stack in sampler.samples if stack.startswith('busy-thread;')]
+
+    assert len(stacks) == 1
+    assert stacks[0].startswith('busy-thread;action:busy work;module:busy-module;')
+    assert ';run (test_sampling.py:21);wait (threading.py:' in stacks[0]
+
+
+def test_inspector(tmpdir, log):
+    output = str(tmpdir.join('stacks-{pid}.collapsed'))
+
+    inspector = StackInspector(sampling_interval=0.01, sampling_duration=0.1, sampling_output=output)
+
+    _run_busy(inspector)
+
+    inspector.sampler.join()
+
+    assert any(record.message.startswith('stacks of all threads:') for record in log.records)
+
+    files = tmpdir.listdir()
+
+    assert len(files) == 1
+
+    for line in files[0].readlines():
+        stack, count = line.rsplit(' ', 1)
+
+        assert stack
+        assert int(count) > 0
+
+
+def test_inspector_no_sampling(log):
+    inspector = StackInspector()
+
+    inspector()
+
+    assert inspector.sampler is None
+    assert log.records[-1].message.startswith('stacks of all threads:')
@@ -0,0 +1,76 @@
+# pylint: disable=blacklisted-name
+
+import array
+import pickle
+
+import pytest
+
+import gluetool
+import gluetool.shm
+
+from . import NonLoadingGlue
+
+
+pytestmark = pytest.mark.skipif(gluetool.shm.shared_memory is None, reason='shared memory not supported')
+
+
+@pytest.fixture(name='registry')
+def fixture_registry():
+    return gluetool.shm.SharedMemoryRegistry()
+
+
+def test_publish_bytes(registry):
+    blob = registry.publish(b'some data')
+
+    assert blob.nbytes == len(b'some data')
+    assert bytes(blob.view()) == b'some data'
+    assert blob.tobytes() == b'some data'
+
+    registry.release(None)
+
+
+def test_publish_array(registry):
+    data = array.array('i', range(1000))
+
+    blob = registry.publish(data)
+
+    # Consumer gets just the handle, e.g. in another process.
+    consumer_blob = pickle.loads(pickle.dumps(blob))
+
+    view = consumer_blob.view()
+
+    assert view.format == 'i'
+    assert list(view) == list(range(1000))
+
+    consumer_blob.close()
+    registry.release(None)
+
+
+def test_publish_non_contiguous(registry):
+    data = memoryview(array.array('i', range(10)))[::2]
+
+    assert not data.c_contiguous
+
+    blob = registry.publish(data)
+
+    view = blob.view()
+
+    assert blob.nbytes == 5 * data.itemsize
+    assert view.format == 'i'
+    assert list(view) == [0, 2, 4, 6, 8]
+
+    registry.release(None)
+
+
+def test_release_with_pipeline():
+    glue = NonLoadingGlue()
+
+    blobs = []
+
+    def _publish(glue):
+        blobs.append(glue.shared('shared_memory').publish(b'foo'))
+
+    assert glue.run_modules([gluetool.glue.PipelineStepCallback('publish', _publish)]) == (None, None)
+
+    with pytest.raises(FileNotFoundError):
+        pickle.loads(pickle.dumps(blobs[0])).view()
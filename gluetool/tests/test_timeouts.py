@@ -0,0 +1,185 @@
+# pylint: disable=blacklisted-name
+
+import logging
+import time
+
+import pytest
+
+import gluetool
+import gluetool.timeouts
+
+from gluetool.glue import ModuleTiming
+from gluetool.history import RunHistory
+from gluetool.timeouts import AdaptiveTimeout, ModuleTimeoutError, Watchdog
+
+from . import NonLoadingGlue, create_module
+
+
+class SlowModule(gluetool.Module):
+    name = 'Slow module'
+
+    options = {
+        'duration': {
+            'type': float,
+            'default': 0.0
+        }
+    }
+
+    execute_timeout = 0.2
+
+    def execute(self):
+        _sleep(self.option('duration'))
+
+
+class FakePipeline(object):
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, module, durations):
+        self.started = self.finished = time.time()
+        self.timings = [
+            ModuleTiming(module.name, module.unique_name, 'execute', self.started, duration,
+                         module.options_fingerprint())
+            for duration in durations
+        ]
+
+
+def _sleep(duration):
+    # Short sleeps, the watchdog cannot interrupt a long one.
+    end = time.time() + duration
+
+    while time.time() < end:
+        time.sleep(0.01)
+
+
+def test_watchdog():
+    with pytest.raises(ModuleTimeoutError, match=r'Module timeout expired'):
+        with Watchdog(0.1) as watchdog:
+            _sleep(5)
+
+    assert watchdog.expired is True
+
+
+def test_watchdog_finished_in_time():
+    with Watchdog(1) as watchdog:
+        _sleep(0.05)
+
+    # Make sure nothing is raised later.
+    _sleep(1.1)
+
+    assert watchdog.expired is False
+
+
+def test_watchdog_command(log):
+    command = gluetool.utils.Command(['sleep', '30'])
+    start = time.time()
+
+    with pytest.raises(ModuleTimeoutError):
+        with Watchdog(0.2, kill_delay=1):
+            command.run()
+
+    assert time.time() - start < 5
+    assert command._process.poll() is not None
+    assert log.match(message='terminating child process {}'.format(command._process.pid))
+    assert not gluetool.timeouts._PROCESSES
+
+
+def test_watchdog_expired_after_block():
+    class LateWatchdog(Watchdog):
+        # The timer fires when the block already finished, but the watchdog was not disarmed yet.
+        def _disarm(self):
+            if not self.expired:
+                self._expire()
+
+            super(LateWatchdog, self)._disarm()
+
+    with LateWatchdog(60) as watchdog:
+        pass
+
+    # Make sure no exception is pending.
+    _sleep(0.1)
+
+    assert watchdog.expired is True
+
+
+def test_watchdog_disabled():
+    with Watchdog(None) as watchdog:
+        _sleep(0.05)
+
+    assert watchdog.expired is False
+
+
+def test_module_timeout(log):
+    glue = NonLoadingGlue()
+    glue.modules['Slow module'] = gluetool.glue.DiscoveredModule(klass=SlowModule, group='none')
+
+    failure, _ = glue.run_module('Slow module', ['--duration', '5'])
+
+    assert isinstance(failure.exception, ModuleTimeoutError)
+    assert log.match(message='execute timeout set to 0.200 seconds (fixed)')
+
+    assert glue.run_module('Slow module', ['--duration', '0.01']) == (None, None)
+
+
+def test_module_timeout_late(monkeypatch, log):
+    original_exit = Watchdog.__exit__
+
+    # The timer fires when `execute` already finished, and the exception is delivered while leaving the watchdog.
+    def _late_exit(self, exc_type, exc_value, tb):
+        try:
+            self._expire()
+
+            # Give the interpreter a chance to deliver the exception.
+            _sleep(0.1)
+
+        finally:
+            original_exit(self, exc_type, exc_value, tb)
+
+    monkeypatch.setattr(Watchdog, '__exit__', _late_exit)
+
+    glue = NonLoadingGlue()
+    glue.modules['Slow module'] = gluetool.glue.DiscoveredModule(klass=SlowModule, group='none')
+
+    failure, _ = glue.run_module('Slow module', ['--duration', '0.01'])
+
+    assert isinstance(failure.exception, ModuleTimeoutError)
+
+    # Handled by the pipeline like any other failure of `execute`.
+    assert log.match(levelno=logging.ERROR, message='Exception raised: Module timeout expired')
+
+
+def test_adaptive_timeout_no_history(log):
+    class AdaptiveModule(SlowModule):
+        execute_timeout = AdaptiveTimeout(default=60)
+
+    glue = NonLoadingGlue()
+    glue.modules['Slow module'] = gluetool.glue.DiscoveredModule(klass=AdaptiveModule, group='none')
+
+    assert glue.run_module('Slow module', ['--duration', '0.01']) == (None, None)
+
+    assert log.match(levelno=logging.WARNING,
+                     message='adaptive execute timeout needs run history, enable it with --history')
+    assert log.match(message='execute timeout set to 60.000 seconds (default, run history not enabled)')
+
+
+def test_adaptive_timeout(tmpdir):
+    history = RunHistory(str(tmpdir.join('history.db')))
+
+    _, module = create_module(SlowModule)
+    module._config['duration'] = 1.0
+
+    policy = AdaptiveTimeout(factor=2, default=60, min_samples=3)
+
+    assert policy.resolve(module, None) == (60, 'default, run history not enabled')
+    assert policy.resolve(module, history) == (60, 'default, only 0 past executions known')
+
+    history.record(FakePipeline(module, [1.0, 2.0, 3.0]))
+
+    timeout, reason = policy.resolve(module, history)
+
+    assert timeout == pytest.approx(2 * 2.98)
+    assert reason == '2 x p99 of 3 past executions, 2.980 seconds'
+
+    # Different options, different history.
+    module._config['duration'] = 2.0
+
+    assert policy.resolve(module, history) == (60, 'default, only 0 past executions known')
@@ -0,0 +1,256 @@
+# pylint: disable=blacklisted-name
+
+import os
+import threading
+import time
+
+import pytest
+
+import gluetool
+import gluetool.worker
+
+from gluetool.timeouts import ModuleTimeoutError
+
+from . import NonLoadingGlue
+
+
+#: Results observed by modules, by module name.
+RESULTS = {}
+
+
+class ProviderModule(gluetool.Module):
+    name = 'provider'
+
+    shared_functions = ['double']
+
+    def double(self, value):
+        if value is None:
+            raise gluetool.SoftGlueError('nothing to double')
+
+        return (os.getpid(), value * 2)
+
+
+class WorkerModule(gluetool.Module):
+    name = 'worker'
+
+    shared_functions = ['result']
+
+    execute_in_process = True
+
+    def __init__(self, *args, **kwargs):
+        super(WorkerModule, self).__init__(*args, **kwargs)
+
+        self._result = None
+        self._discarded = 'discarded'
+        self._items = ['initial']
+        self._untouched = {'foo': 'bar'}
+
+        RESULTS['untouched'] = self._untouched
+
+    def execute(self):
+        self.info('computing in worker')
+
+        assert self.has_shared('double')
+        assert not self.has_shared('triple')
+
+        with pytest.raises(gluetool.SoftGlueError, match=r'^nothing to double$'):
+            self.shared('double', None)
+
+        parent_pid, doubled = self.shared('double', 21)
+
+        self._result = (parent_pid, os.getpid(), doubled)
+
+        del self._discarded
+
+        self._items.append('added')
+
+        # Cannot be sent back to the parent.
+        self._unpicklable = lambda: None
+
+    def result(self):
+        return self._result
+
+
+class CheckerModule(gluetool.Module):
+    name = 'checker'
+
+    def execute(self):
+        worker = self.glue.current_pipeline.modules[1]
+
+        RESULTS['checker'] = {
+            'result': self.shared('result'),
+            'has-discarded': hasattr(worker, '_discarded'),
+            'has-unpicklable': hasattr(worker, '_unpicklable'),
+            'items': worker._items,
+            'untouched': worker._untouched
+        }
+
+
+class FailingModule(gluetool.Module):
+    name = 'failing'
+
+    options = {
+        'mode': {}
+    }
+
+    execute_in_process = True
+
+    def execute(self):
+        mode = self.option('mode')
+
+        if mode == 'crash':
+            # pylint: disable=protected-access
+            os._exit(3)
+
+        if mode == 'sleep':
+            time.sleep(5)
+
+        if mode == 'unpicklable':
+            exc = gluetool.GlueError('unpicklable')
+            exc.payload = lambda: None
+
+            raise exc
+
+        raise gluetool.GlueError('failed in worker')
+
+
+class PlainModule(gluetool.Module):
+    name = 'plain'
+
+    def execute(self):
+        self._pid = os.getpid()
+
+    def destroy(self, failure=None):
+        RESULTS['plain'] = self._pid
+
+
+def _run(glue, *names):
+    pipeline = gluetool.glue.Pipeline(glue, [gluetool.glue.PipelineStepModule(name) for name in names])
+
+    return pipeline, glue.run_pipeline(pipeline)
+
+
+@pytest.fixture(name='glue')
+def fixture_glue():
+    glue = NonLoadingGlue()
+
+    RESULTS.clear()
+
+    for klass in (ProviderModule, WorkerModule, FailingModule, PlainModule, CheckerModule):
+        glue.modules[klass.name] = gluetool.glue.DiscoveredModule(klass=klass, group='none')
+
+    return glue
+
+
+def test_execute(glue, log):
+    _, outcome = _run(glue, 'provider', 'worker', 'checker')
+
+    assert outcome == (None, None)
+
+    parent_pid, worker_pid, doubled = RESULTS['checker']['result']
+
+    # Shared function ran in the parent, module in the child.
+    assert parent_pid == os.getpid()
+    assert worker_pid != os.getpid()
+    assert doubled == 42
+
+    assert RESULTS['checker']['has-discarded'] is False
+    assert RESULTS['checker']['has-unpicklable'] is False
+
+    # Log records of the child were forwarded, with their contexts.
+    record = [record for record in log.records if record.message == 'computing in worker'][0]
+
+    assert record.process == worker_pid
+    assert record.contexts['module_name'][1] == 'worker'
+
+    assert log.match(
+        message="Attribute '_unpicklable' cannot be pickled, it is not sent back from the worker process"
+    )
+
+
+def test_attributes(glue):
+    _, outcome = _run(glue, 'provider', 'worker', 'checker')
+
+    assert outcome == (None, None)
+
+    # Changed in place...
+    assert RESULTS['checker']['items'] == ['initial', 'added']
+
+    # ... and not changed at all, parent keeps its own object.
+    assert RESULTS['checker']['untouched'] is RESULTS['untouched']
+
+
+def test_threads_warning(glue, log):
+    stop = threading.Event()
+    thread = threading.Thread(target=stop.wait, name='busy-thread')
+    thread.start()
+
+    try:
+        _, outcome = _run(glue, 'provider', 'worker', 'checker')
+
+    finally:
+        stop.set()
+        thread.join()
+
+    assert outcome == (None, None)
+    assert log.match(message='Forking worker process while other threads are running, it may deadlock: busy-thread')
+
+
+def test_threads_fork_safe(glue, log, monkeypatch):
+    monkeypatch.setattr(WorkerModule, 'execute_timeout', 60, raising=False)
+
+    _, outcome = _run(glue, 'provider', 'worker', 'checker')
+
+    assert outcome == (None, None)
+    assert not any(record.message.startswith('Forking worker process') for record in log.records)
+
+
+def test_option(glue):
+    glue._config['execute-in-process'] = ['plain']
+
+    _, outcome = _run(glue, 'plain')
+
+    assert outcome == (None, None)
+    assert RESULTS['plain'] != os.getpid()
+
+
+@pytest.mark.parametrize('mode, message', [
+    ('fail', r'^failed in worker$'),
+    ('unpicklable', r'^GlueError: unpicklable$'),
+    ('crash', r'^Worker process \d+ of module failing exited unexpectedly$')
+])
+def test_failure(glue, mode, message):
+    pipeline = gluetool.glue.Pipeline(glue, [gluetool.glue.PipelineStepModule('failing', argv=['--mode', mode])])
+
+    failure, destroy_failure = glue.run_pipeline(pipeline)
+
+    assert destroy_failure is None
+    assert isinstance(failure.exception, gluetool.GlueError)
+    assert failure.module.name == 'failing'
+
+    with pytest.raises(gluetool.GlueError, match=message):
+        raise failure.exception
+
+
+def test_failure_stack(glue):
+    pipeline = gluetool.glue.Pipeline(glue, [gluetool.glue.PipelineStepModule('failing', argv=['--mode', 'fail'])])
+
+    failure, _ = glue.run_pipeline(pipeline)
+
+    # Stack of the exception describes the child, where the exception was raised.
+    stack = gluetool.log._exception_stack(failure.exception, failure.exc_info[2])
+
+    assert stack[-1][2] == 'execute'
+
+
+def test_timeout(glue, monkeypatch):
+    monkeypatch.setattr(FailingModule, 'execute_timeout', 0.2, raising=False)
+
+    pipeline = gluetool.glue.Pipeline(glue, [gluetool.glue.PipelineStepModule('failing', argv=['--mode', 'sleep'])])
+
+    started = time.time()
+
+    failure, _ = glue.run_pipeline(pipeline)
+
+    assert isinstance(failure.exception, ModuleTimeoutError)
+    assert time.time() - started < 4
@@ -0,0 +1,174 @@
+# pylint: disable=blacklisted-name
+
+import json
+import os
+import socket
+import time
+
+import pytest
+
+import gluetool
+import gluetool.workqueue
+
+from gluetool.glue import PipelineStepModule
+from gluetool.workqueue import Consumer, WorkQueue, STATUS_DONE, STATUS_FAILED, STATUS_PENDING, STATUS_RUNNING
+
+from . import NonLoadingGlue
+
+
+class RecordingModule(gluetool.Module):
+    name = 'Recording module'
+
+    options = {
+        'fail': {
+            'action': 'store_true'
+        }
+    }
+
+    seen = []
+
+    def execute(self):
+        RecordingModule.seen.append(self.unique_name)
+
+        if self.option('fail'):
+            raise gluetool.GlueError('failed as requested')
+
+
+@pytest.fixture(name='queue')
+def fixture_queue(tmpdir):
+    return WorkQueue(str(tmpdir.join('queue.db')))
+
+
+@pytest.fixture(name='glue')
+def fixture_glue():
+    RecordingModule.seen = []
+
+    glue = NonLoadingGlue()
+    glue.modules['Recording module'] = gluetool.glue.DiscoveredModule(klass=RecordingModule, group='none')
+
+    return glue
+
+
+def _status(queue, job_id):
+    # pylint: disable=protected-access
+    return queue._connection().execute('SELECT status, attempts, failure FROM jobs WHERE id = ?', (job_id,)).fetchone()
+
+
+def test_claim(queue):
+    job_id = queue.submit([PipelineStepModule('foo', actual_module='Recording module', argv=['--fail'])])
+
+    job = queue.claim('worker-0')
+
+    assert job.id == job_id
+    assert job.attempts == 1
+    assert job.steps[0].module == 'foo'
+    assert job.steps[0].actual_module == 'Recording module'
+    assert job.steps[0].argv == ['--fail']
+
+    assert _status(queue, job_id)[0] == STATUS_RUNNING
+
+    # Nothing else to claim.
+    assert queue.claim('worker-1') is None
+
+
+def test_expired_lease(queue):
+    queue.lease_timeout = 0
+
+    job_id = queue.submit([PipelineStepModule('Recording module')])
+
+    assert queue.claim('worker-0').id == job_id
+
+    time.sleep(0.01)
+
+    # The first worker "crashed", its job is returned to the queue and claimed again.
+    job = queue.claim('worker-1')
+
+    assert job.id == job_id
+    assert job.attempts == 2
+
+
+def test_max_attempts(queue):
+    queue.lease_timeout = 0
+    queue.max_attempts = 2
+
+    job_id = queue.submit([PipelineStepModule('Recording module')])
+
+    assert queue.claim('worker-0').attempts == 1
+
+    time.sleep(0.01)
+
+    assert queue.claim('worker-1').attempts == 2
+
+    time.sleep(0.01)
+
+    # The job crashed both workers, it's not returned to the queue again.
+    assert queue.claim('worker-2') is None
+
+    status, attempts, failure = _status(queue, job_id)
+
+    assert status == STATUS_FAILED
+    assert attempts == 2
+    assert json.loads(failure)['message'] == 'Job lease expired 2 times, giving up'
+
+
+def test_renew(queue):
+    queue.lease_timeout = 0
+
+    job_id = queue.submit([PipelineStepModule('Recording module')])
+    job = queue.claim('worker-0')
+
+    queue.lease_timeout = 300
+    queue.renew([job.id])
+
+    assert queue.claim('worker-1') is None
+    assert _status(queue, job_id)[0] == STATUS_RUNNING
+
+
+def test_consume(glue, queue):
+    ok_id = queue.submit([PipelineStepModule('ok', actual_module='Recording module')])
+    failed_id = queue.submit([PipelineStepModule('failing', actual_module='Recording module', argv=['--fail'])])
+
+    Consumer(glue, queue, workers=2).run(exit_when_empty=True)
+
+    assert sorted(RecordingModule.seen) == ['failing', 'ok']
+
+    assert _status(queue, ok_id) == (STATUS_DONE, 1, None)
+
+    status, _, failure = _status(queue, failed_id)
+
+    assert status == STATUS_FAILED
+    assert json.loads(failure)['module'] == 'failing'
+    assert json.loads(failure)['message'] == 'failed as requested'
+    assert json.loads(failure)['soft'] is False
+
+
+def test_worker_names(glue, queue):
+    job_id = queue.submit([PipelineStepModule('Recording module')])
+
+    Consumer(glue, queue).run(exit_when_empty=True)
+
+    # pylint: disable=protected-access
+    worker = queue._connection().execute('SELECT worker FROM jobs WHERE id = ?', (job_id,)).fetchone()[0]
+
+    assert worker == '{}-{}-worker-0'.format(socket.gethostname(), os.getpid())
+
+
+def test_stats(glue, queue):
+    queue.submit([PipelineStepModule('Recording module')])
+
+    assert queue.stats()['depth'] == 1
+
+    Consumer(glue, queue).run(exit_when_empty=True)
+
+    stats = queue.stats()
+
+    assert stats['depth'] == 0
+    assert stats[STATUS_PENDING] == 0
+    assert stats[STATUS_DONE] == 1
+    assert stats['throughput'] == 1.0
+    assert stats['mean-duration'] >= 0.0
+
+
+def test_consumer_workers(glue, queue):
+    with pytest.raises(gluetool.GlueError, match=r'Number of workers must be positive'):
+        Consumer(glue, queue, workers=0)
@@ -0,0 +1,320 @@
+"""
+Timeouts of module execution.
+
+Modules can limit how long their ``execute`` method may run by setting :py:attr:`gluetool.glue.Module.execute_timeout`
+- either to a fixed number of seconds, or to an :py:class:`AdaptiveTimeout` policy, deriving the timeout from
+durations of past executions of the module with the same options, as recorded in the run history
+(see :py:mod:`gluetool.history`):
+
+.. code-block:: python
+
+   class BuildImage(gluetool.Module):
+       # 3 times the 99th percentile of past durations, or 2 hours when there's not enough data yet.
+       execute_timeout = gluetool.timeouts.AdaptiveTimeout(factor=3, default=7200)
+
+When the timeout expires, a watchdog raises :py:class:`ModuleTimeoutError` in the thread running the module. The
+exception is delivered when the thread runs Python code - a module blocked in a long system call is interrupted
+only after the call returns. Modules often block while waiting for external commands, therefore the watchdog
+terminates child processes started by the thread via :py:class:`gluetool.utils.Command` as well - they are
+sent ``SIGTERM`` first, and killed when they do not finish in :py:data:`DEFAULT_KILL_DELAY` seconds.
+"""
+
+import contextlib
+import ctypes
+import threading
+import time
+
+from .glue import GlueError
+from .log import Logging, LoggerMixin
+
+# Type annotations
+# pylint: disable=unused-import, wrong-import-order
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple, Type  # noqa
+
+if TYPE_CHECKING:
+    import subprocess  # noqa
+    from .glue import Module  # noqa
+    from .history import RunHistory  # noqa
+    from .log import ContextAdapter  # noqa
+
+
+#: Default multiple of the historical percentile used by :py:class:`AdaptiveTimeout`.
+DEFAULT_FACTOR = 3.0
+
+#: Default percentile of historical durations used by :py:class:`AdaptiveTimeout`.
+DEFAULT_PERCENTILE = 99
+
+#: Default minimal number of historical durations :py:class:`AdaptiveTimeout` needs to derive a timeout.
+DEFAULT_MIN_SAMPLES = 10
+
+#: Default age of the oldest historical durations considered by :py:class:`AdaptiveTimeout`, in seconds.
+DEFAULT_WINDOW = 30 * 24 * 3600
+
+#: How long to wait for terminated child processes of an interrupted thread before killing them, in seconds.
+DEFAULT_KILL_DELAY = 5.0
+
+
+# Child processes started by threads, by thread IDs. See :py:func:`tracked_process`.
+_PROCESSES = {}  # type: Dict[int, List[subprocess.Popen]]
+_PROCESSES_LOCK = threading.Lock()
+
+
+@contextlib.contextmanager
+def tracked_process(process):
+    # type: (subprocess.Popen) -> Iterator[None]
+    """
+    Context manager registering a child process started by the current thread, while the thread waits for it.
+    When the thread is guarded by a :py:class:`Watchdog` whose timeout expires, the process is terminated.
+
+    :param subprocess.Popen process: the child process.
+    """
+
+    thread_id = threading.current_thread().ident
+
+    assert thread_id is not None
+
+    with _PROCESSES_LOCK:
+        _PROCESSES.setdefault(thread_id, []).append(process)
+
+    try:
+        yield
+
+    finally:
+        with _PROCESSES_LOCK:
+            processes = _PROCESSES[thread_id]
+            processes.remove(process)
+
+            if not processes:
+                del _PROCESSES[thread_id]
+
+
+def _thread_processes(thread_id):
+    # type: (int) -> List[subprocess.Popen]
+    """
+    Return child processes the given thread currently waits for.
+    """
+
+    with _PROCESSES_LOCK:
+        return list(_PROCESSES.get(thread_id, []))
+
+
+def _terminate_processes(processes, kill_delay, logger):
+    # type: (List[subprocess.Popen], float, ContextAdapter) -> None
+    """
+    Terminate child processes, and kill those which do not finish in time.
+    """
+
+    for process in processes:
+        logger.warning('terminating child process {}'.format(process.pid))
+
+        try:
+            process.terminate()
+
+        except OSError:
+            pass
+
+    deadline = time.time() + kill_delay
+
+    for process in processes:
+        while process.poll() is None and time.time() < deadline:
+            time.sleep(0.1)
+
+        if process.poll() is not None:
+            continue
+
+        logger.warning('killing child process {}'.format(process.pid))
+
+        try:
+            process.kill()
+
+        except OSError:
+            pass
+
+
+class ModuleTimeoutError(GlueError):
+    """
+    Raised in a thread running a module when module's timeout expires.
+    """
+
+    def __init__(self, message='Module timeout expired', **kwargs):
+        # type: (str, **Any) -> None
+
+        super(ModuleTimeoutError, self).__init__(message, **kwargs)
+
+
+class AdaptiveTimeout(object):
+    # pylint: disable=too-few-public-methods
+    """
+    Timeout policy deriving the timeout from durations of past executions of a module with the same options:
+    the timeout is ``factor`` times the given percentile of these durations.
+
+    :param float factor: multiple of the percentile.
+    :param float default: timeout to use when there is not enough historical data. ``None`` means no timeout.
+    :param float percentile: percentile of historical durations, between 0 and 100.
+    :param int min_samples: minimal number of historical durations necessary for deriving the timeout.
+    :param int window: only durations of executions not older than this many seconds are considered.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, factor=DEFAULT_FACTOR, default=None, percentile=DEFAULT_PERCENTILE,
+                 min_samples=DEFAULT_MIN_SAMPLES, window=DEFAULT_WINDOW):
+        # type: (float, Optional[float], float, int, int) -> None
+
+        self.factor = factor
+        self.default = default
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window = window
+
+    def __repr__(self):
+        # type: () -> str
+
+        return 'AdaptiveTimeout({} x p{}, default={})'.format(self.factor, self.percentile, self.default)
+
+    def resolve(self, module, run_history):
+        # type: (Module, Optional[RunHistory]) -> Tuple[Optional[float], str]
+        """
+        Derive the timeout for a module.
+
+        :param Module module: module about to be executed.
+        :param RunHistory run_history: database of past runs. If not set, the default timeout is used.
+        :returns: the timeout, in seconds, and a human-readable explanation of where it came from.
+        """
+
+        # pylint: disable=cyclic-import
+        from .history import percentile
+
+        if run_history is None:
+            return self.default, 'default, run history not enabled'
+
+        durations = run_history.execute_durations(
+            module.name, module.options_fingerprint(), since=time.time() - self.window
+        )
+
+        if len(durations) < self.min_samples:
+            return self.default, 'default, only {} past executions known'.format(len(durations))
+
+        value = percentile(durations, self.percentile)
+
+        assert value is not None
+
+        return self.factor * value, '{} x p{} of {} past executions, {:.3f} seconds'.format(
+            self.factor, self.percentile, len(durations), value
+        )
+
+
+def _async_raise(thread_id, exc_class):
+    # type: (int, Optional[Type[BaseException]]) -> None
+
+    # Passing `None` cancels previously scheduled exception which has not been raised yet.
+    ctypes.pythonapi.PyThreadState_SetAsyncExc(
+        ctypes.c_ulong(thread_id),
+        ctypes.py_object(exc_class) if exc_class is not None else ctypes.c_void_p(None)
+    )
+
+
+class Watchdog(LoggerMixin, object):
+    """
+    Context manager raising :py:class:`ModuleTimeoutError` in the current thread when the wrapped block
+    does not finish in time. Child processes the thread waits for are terminated, see :py:func:`tracked_process`.
+
+    The exception is never raised once the block finished: the watchdog is disarmed under a lock, and an exception
+    scheduled by the watchdog but not delivered yet is cancelled.
+
+    :param float timeout: timeout, in seconds. ``None`` disables the watchdog.
+    :param str label: what is guarded by the watchdog, for logging purposes.
+    :param float kill_delay: how long to wait for terminated child processes before killing them, in seconds.
+    :param ContextAdapter logger: logger used for logging.
+    """
+
+    def __init__(self, timeout, label='block', kill_delay=DEFAULT_KILL_DELAY, logger=None):
+        # type: (Optional[float], str, float, Optional[ContextAdapter]) -> None
+
+        super(Watchdog, self).__init__(logger or Logging.get_logger())
+
+        self.timeout = timeout
+        self.label = label
+        self.kill_delay = kill_delay
+
+        #: Set when the timeout expired.
+        self.expired = False
+
+        self._thread_id = None  # type: Optional[int]
+        self._timer = None  # type: Optional[threading.Timer]
+        self._lock = threading.Lock()
+        self._armed = False
+
+    def _expire(self):
+        # type: () -> None
+
+        with self._lock:
+            if not self._armed:
+                return
+
+            self.expired = True
+
+            assert self._thread_id is not None
+
+            self.error('{} did not finish in {:.3f} seconds, interrupting'.format(self.label, self.timeout))
+
+            _async_raise(self._thread_id, ModuleTimeoutError)
+
+            # Collect processes while still armed, to not touch those started after the block finished.
+            processes = _thread_processes(self._thread_id)
+
+        # The exception is delivered only when the thread runs Python code - unblock it, if it waits for
+        # a child process.
+        _terminate_processes(processes, self.kill_delay, self.logger)
+
+    def _disarm(self):
+        # type: () -> None
+
+        with self._lock:
+            self._armed = False
+
+            # The exception may still be pending, if the guarded block finished right after the timeout expired.
+            if self.expired:
+                assert self._thread_id is not None
+
+                _async_raise(self._thread_id, None)
+
+    def __enter__(self):
+        # type: () -> Watchdog
+
+        if self.timeout is None:
+            return self
+
+        self._thread_id = threading.current_thread().ident
+        self._armed = True
+
+        # pylint: disable=cyclic-import
+        from .worker import FORK_SAFE_ATTRIBUTE
+
+        self._timer = threading.Timer(self.timeout, self._expire)
+        self._timer.daemon = True
+
+        # The timer holds no locks while waiting, modules can still be executed in worker processes.
+        setattr(self._timer, FORK_SAFE_ATTRIBUTE, True)
+        self._timer.start()
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        # type: (Any, Any, Any) -> None
+
+        if self._timer is None:
+            return
+
+        try:
+            self._disarm()
+
+        # The exception was delivered after the block finished, while disarming - ignore it, the block
+        # did finish.
+        except ModuleTimeoutError:
+            self._disarm()
+
+        self._timer.cancel()
+
+        # Do not leave the timer behind, it may still be terminating child processes.
+        if self._timer is not threading.current_thread():
+            self._timer.join()
@@ -23,15 +23,20 @@ import gluetool.sentry
 from .glue import GlueError, GlueRetryError, Failure, PipelineStepModule
 from .help import extract_eval_context_info, docstring_to_help
 from .log import log_dict
-from .utils import format_command_line, cached_property, normalize_path, render_template, normalize_multistring_option
+from .utils import format_command_line, cached_property, normalize_path, render_template, normalize_multistring_option, \
+    normalize_bool_option
 
 # Type annotations
 # pylint: disable=unused-import,wrong-import-order,ungrouped-imports
-from typing import cast, overload, Any, Callable, List, Optional, NoReturn, Union  # noqa
+from typing import TYPE_CHECKING, cast, overload, Any, Callable, Dict, List, Optional, NoReturn, Union  # noqa
 from typing_extensions import Literal  # noqa
 from types import FrameType  # noqa
 from gluetool.glue import PipelineReturnType  # noqa
 
+if TYPE_CHECKING:
+    import gluetool.gctuning  # noqa
+    import gluetool.workqueue  # noqa
+
 
 # Order is important, the later one overrides values from the former
 DEFAULT_GLUETOOL_CONFIG_PATHS = [
@@ -73,6 +78,7 @@ class Gluetool(object):
             )
 
         self.sentry = None  # type: Optional[gluetool.sentry.Sentry]
+        self.gc_tuner = None  # type: Optional[gluetool.gctuning.GCTuner]
         self.tracer = None  # type: Optional[gluetool.action.Tracer]
 
         # pylint: disable=invalid-name
@@ -298,6 +304,13 @@ Will try to submit it to Sentry but giving up on everything else.
     def setup(self):
         # type: () -> None
 
+        # pylint: disable=cyclic-import
+        from .gctuning import GCTuner
+
+        # Startup creates a lot of long-lived objects, let the GC strategy deal with them.
+        self.gc_tuner = GCTuner()
+        self.gc_tuner.begin_startup()
+
         self.sentry = gluetool.sentry.Sentry()
         self.tracer = gluetool.action.Tracer()
 
@@ -345,6 +358,11 @@ Will try to submit it to Sentry but giving up on everything else.
         Glue.parse_config(self.gluetool_config_paths)
         Glue.parse_args(sys.argv[1:])
 
+        if Glue.option('gc-strategy'):
+            self.gc_tuner.switch(Glue.option('gc-strategy'))
+
+        self._install_stack_inspector(_signal_handler)
+
         # store tool's configuration - everything till the start of "pipeline" (the first module)
         self.argv = [
             ensure_str(arg) for arg in sys.argv[1:len(sys.argv) - len(Glue.option('pipeline'))]
@@ -362,6 +380,49 @@ Will try to submit it to Sentry but giving up on everything else.
 
         Glue.modules = Glue.discover_modules()
 
+        self.gc_tuner.end_startup()
+
+    def _install_stack_inspector(self, signal_handler):
+        # type: (Callable[..., Any]) -> None
+        """
+        Install handler of ``--stack-dump-signal``, dumping stacks of all threads and, optionally, sampling them.
+
+        :param callable signal_handler: wrapper of signal handlers, accepting the actual handler
+            as ``handler`` keyword argument.
+        """
+
+        assert self.Glue is not None
+
+        # pylint: disable=cyclic-import
+        from .sampling import StackInspector, DEFAULT_STACK_DUMP_SIGNAL, DEFAULT_SAMPLING_INTERVAL, \
+            DEFAULT_SAMPLING_OUTPUT
+
+        signal_name = self.Glue.option('stack-dump-signal')
+
+        if signal_name is None:
+            signal_name = DEFAULT_STACK_DUMP_SIGNAL
+
+        if not signal_name:
+            return
+
+        signum = getattr(signal, signal_name.upper(), None)
+
+        if not isinstance(signum, int) or not signal_name.upper().startswith('SIG'):
+            raise GlueError("Unknown signal '{}'".format(signal_name))
+
+        sampling_interval = self.Glue.option('sampling-interval') or DEFAULT_SAMPLING_INTERVAL
+
+        inspector = StackInspector(
+            sampling_interval=sampling_interval / 1000.0,
+            sampling_duration=self.Glue.option('sampling-duration'),
+            sampling_output=normalize_path(
+                self.Glue.option('sampling-output') or DEFAULT_SAMPLING_OUTPUT
+            ),
+            logger=self.Glue.logger
+        )
+
+        signal.signal(signum, functools.partial(signal_handler, handler=inspector))
+
     @handle_exc
     def check_options(self):
         # type: () -> None
@@ -405,20 +466,28 @@ Will try to submit it to Sentry but giving up on everything else.
         if Glue.option('list-eval-context'):
             variables = []
 
-            def _add_variables(source):
-                # type: (gluetool.glue.Configurable) -> None
-
-                info = extract_eval_context_info(source)
+            def _add_variables(source_name, info):
+                # type: (str, Dict[str, str]) -> None
 
                 for name, description in iteritems(info):
                     variables.append([
-                        name, source.name, docstring_to_help(description, line_prefix='')
+                        name, source_name, docstring_to_help(description, line_prefix='')
                     ])
 
+            # Modules are not instantiated - information extracted during discovery is used, with a fallback
+            # to inspecting module classes, e.g. for modules coming from entry points.
             for mod_name in sorted(iterkeys(Glue.modules)):
-                _add_variables(Glue.init_module(mod_name))
+                discovered = Glue.modules[mod_name]
+
+                info = discovered.eval_context_info() if discovered.eval_context_info else None
+
+                if info is None:
+                    info = extract_eval_context_info(discovered.klass)
 
-            _add_variables(Glue)
+                # Show module's own name, just like its instance would, not the name it's been discovered under.
+                _add_variables(discovered.klass.name, info)
+
+            _add_variables(Glue.name, extract_eval_context_info(Glue))
 
             if variables:
                 variables = sorted(variables, key=lambda row: row[0])
@@ -436,6 +505,104 @@ Will try to submit it to Sentry but giving up on everything else.
 
             sys.exit(0)
 
+        if Glue.option('history-report'):
+            self._history_report()
+            sys.exit(0)
+
+        if Glue.option('queue-stats'):
+            # pylint: disable=cyclic-import
+            from .workqueue import log_stats
+
+            log_stats(self._work_queue(), Glue.logger)
+            sys.exit(0)
+
+        if Glue.option('enqueue'):
+            if not self.pipeline_desc:
+                raise GlueError('No module specified, use -l to list available')
+
+            job_id = self._work_queue().submit(self.pipeline_desc)
+
+            Glue.info('pipeline added to the queue as job {}'.format(job_id))
+            sys.exit(0)
+
+    def _history_report(self):
+        # type: () -> None
+
+        Glue = self.Glue
+        assert Glue is not None
+
+        # pylint: disable=cyclic-import
+        from .history import RunHistory, DEFAULT_HISTORY_DB
+
+        run_history = RunHistory(
+            normalize_path(Glue.option('history-db') or DEFAULT_HISTORY_DB),
+            logger=Glue.logger
+        )
+
+        def _format(value):
+            # type: (Optional[float]) -> str
+
+            return '{:.3f}'.format(value) if value is not None else '-'
+
+        rows = [
+            [
+                row['module'],
+                row['phase'],
+                row['runs'],
+                _format(row['p50']),
+                _format(row['p95']),
+                _format(row['p99']),
+                _format(row['baseline-p95']),
+                'REGRESSION' if row['regression'] else ''
+            ]
+            for row in run_history.report()
+        ]
+
+        if not rows:
+            rows = [['-- no recorded runs --', '', '', '', '', '', '', '']]
+
+        sys.stdout.write("""Module phase durations (seconds)
+
+{}
+""".format(tabulate.tabulate(
+            rows,
+            ['Module', 'Phase', 'Runs', 'p50', 'p95', 'p99', 'Baseline p95', ''],
+            tablefmt='simple'
+        )))
+
+    def _work_queue(self):
+        # type: () -> gluetool.workqueue.WorkQueue
+
+        Glue = self.Glue
+        assert Glue is not None
+
+        if not Glue.option('queue'):
+            raise GlueError('Work queue not specified, use --queue')
+
+        # pylint: disable=cyclic-import
+        from .workqueue import WorkQueue, DEFAULT_LEASE_TIMEOUT, DEFAULT_MAX_ATTEMPTS
+
+        return WorkQueue(
+            normalize_path(Glue.option('queue')),
+            lease_timeout=Glue.option('lease-timeout') or DEFAULT_LEASE_TIMEOUT,
+            max_attempts=Glue.option('max-attempts') or DEFAULT_MAX_ATTEMPTS,
+            logger=Glue.logger
+        )
+
+    @handle_exc
+    def consume(self):
+        # type: () -> None
+
+        Glue = self.Glue
+        assert Glue is not None
+
+        # pylint: disable=cyclic-import
+        from .workqueue import Consumer
+
+        consumer = Consumer(Glue, self._work_queue(), workers=Glue.option('workers'))
+
+        consumer.run(exit_when_empty=normalize_bool_option(Glue.option('exit-when-empty')))
+
     @handle_exc
     def run_pipeline(self):
         # type: () -> PipelineReturnType
@@ -476,14 +643,43 @@ Will try to submit it to Sentry but giving up on everything else.
 
         return None, None
 
+    def _report(self):
+        # type: () -> None
+        """
+        Log reports collected while running pipelines.
+        """
+
+        assert self.Glue is not None
+
+        self.Glue.resource_scheduler.report()
+
+        shared_function_stats = self.Glue.shared_function_stats
+
+        if shared_function_stats is not None:
+            shared_function_stats.report()
+
+        module_profiler = self.Glue.module_profiler
+
+        if module_profiler is not None:
+            module_profiler.report(top=self.Glue.option('profile-top'))
+
     def main(self):
         # type: () -> None
 
         self.setup()
         self.check_options()
 
+        assert self.Glue is not None
+
+        if self.Glue.option('consume'):
+            self.consume()
+            self._report()
+            self._quit(0)
+
         failure, destroy_failure = self.run_pipeline()
 
+        self._report()
+
         if destroy_failure:
             if failure:
                 self._handle_failure(failure, do_quit=False)
@@ -32,7 +32,9 @@ from six.moves import http_client, urllib
 import ruamel.yaml
 
 from .glue import GlueError, SoftGlueError, GlueCommandError
+from .resources import command_admission
 from .result import Result
+from .timeouts import tracked_process
 from .log import Logging, ContextAdapter, PackageAdapter, LoggerMixin, BlobLogger, \
     log_blob, log_dict, print_wrapper
 
@@ -669,13 +671,17 @@ class Command(LoggerMixin, object):
         log_blob(self.debug, 'runnable (copy & paste)', format_command_line([self._command]))
 
         try:
-            self._process = subprocess.Popen(self._command, **self._popen_kwargs)
+            # Admit the command through resource classes claimed for commands by the module running it.
+            with command_admission():
+                self._process = subprocess.Popen(self._command, **self._popen_kwargs)
 
-            if inspect is True:
-                self._communicate_inspect(inspect_callback)
+                # Let a watchdog guarding this thread terminate the process when the timeout expires.
+                with tracked_process(self._process):
+                    if inspect is True:
+                        self._communicate_inspect(inspect_callback)
 
-            else:
-                self._communicate_batch()
+                    else:
+                        self._communicate_batch()
 
         except OSError as e:
             if e.errno == errno.ENOENT:
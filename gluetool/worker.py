@@ -0,0 +1,514 @@
+"""
+Executing modules in worker processes.
+
+Because of the GIL, CPU-heavy modules - e.g. parsing large results or computing diffs - cannot really run
+in parallel with other code, even when running in threads. A module can opt in to have its ``execute`` method
+run in a child process, by setting :py:attr:`gluetool.glue.Module.execute_in_process`, or by being listed
+in ``--execute-in-process`` option.
+
+The child process is forked right before ``execute`` is called, therefore it starts with the very same state
+as the parent, and the module does not need to be picklable. While the child is running:
+
+* calls of shared functions made by the child are forwarded to the parent, and performed there. Arguments and
+  return values are pickled, they must be picklable;
+* log records emitted by the child are forwarded to the parent, and passed to its logging handlers, contexts
+  included;
+* when ``execute`` finishes, attributes of the module it changed are sent back to the parent and set on its
+  instance of the module - shared functions, provided by the module and called later in the parent, see them.
+  Values are pickled just once, after ``execute`` finished: attributes holding immutable values are sent only when
+  they were set to another value, mutable values are always sent, and the parent keeps its own value when it is
+  equal to the one it received. Attributes that cannot be pickled are not sent, with a warning;
+* when ``execute`` raises an exception, it is raised in the parent again, and becomes a failure of the module.
+  Exceptions that cannot be pickled are replaced by :py:class:`gluetool.glue.GlueError` with the same message.
+
+Worker processes are available on POSIX systems only, as they rely on :py:func:`os.fork`. Forking a process
+running multiple threads is dangerous - the child inherits locks held by other threads, but not the threads,
+and may deadlock. The parent warns when other threads are alive, unless they are marked as safe for forking
+by :py:data:`FORK_SAFE_ATTRIBUTE`, like timers of watchdogs (see :py:mod:`gluetool.timeouts`).
+"""
+
+import logging
+import os
+import pickle
+import signal
+import sys
+import threading
+
+from multiprocessing import Pipe
+
+from six import binary_type, integer_types, iteritems, text_type
+
+from .glue import Failure, GlueError, SoftGlueError
+from .log import STACK_SNAPSHOT_ATTRIBUTE
+
+# Type annotations
+# pylint: disable=unused-import, wrong-import-order
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple  # noqa
+
+if TYPE_CHECKING:
+    from multiprocessing.connection import Connection  # noqa
+    from .glue import Module  # noqa
+
+
+#: How often does the parent check whether it has been interrupted while waiting for messages from the child,
+#: e.g. by a watchdog, in seconds.
+POLL_INTERVAL = 0.1
+
+#: Attributes of modules which are never sent back to the parent.
+SKIPPED_ATTRIBUTES = ('glue',)
+
+#: Name of the log record attribute marking records already forwarded to the parent.
+FORWARDED_ATTRIBUTE = 'gluetool_forwarded'
+
+#: Name of the thread attribute marking threads which are safe to be alive when forking a worker process.
+FORK_SAFE_ATTRIBUTE = 'gluetool_fork_safe'
+
+#: Values of these types cannot change in place.
+IMMUTABLE_TYPES = (type(None), bool, float, complex, text_type, binary_type, frozenset) + integer_types
+
+
+def _dumps(value):
+    # type: (Any) -> Optional[bytes]
+    """
+    Pickle a value, or return ``None`` when it cannot be pickled.
+    """
+
+    try:
+        return pickle.dumps(value, protocol=2)
+
+    # Pickling arbitrary objects may fail in many ways.
+    # pylint: disable=broad-except
+    except Exception:
+        return None
+
+
+def _portable_exception(exc_info):
+    # type: (Any) -> BaseException
+    """
+    Prepare an exception for being sent to another process: its traceback is replaced by a snapshot,
+    and when the exception cannot be pickled, it is replaced by a :py:class:`GlueError`.
+    """
+
+    failure = Failure(module=None, exc_info=exc_info)
+    failure.compact()
+
+    exc = failure.exception
+
+    try:
+        pickle.loads(pickle.dumps(exc, protocol=2))
+
+        return exc
+
+    # pylint: disable=broad-except
+    except Exception:
+        pass
+
+    klass = SoftGlueError if failure.soft else GlueError
+
+    replacement = klass('{}: {}'.format(type(exc).__name__, exc))
+    replacement.caused_by = None
+
+    # Snapshot of the original stack is still useful, and it can be pickled.
+    setattr(replacement, STACK_SNAPSHOT_ATTRIBUTE, getattr(exc, STACK_SNAPSHOT_ATTRIBUTE, None))
+
+    return replacement
+
+
+def _serialize_record(record):
+    # type: (logging.LogRecord) -> Dict[str, Any]
+    """
+    Prepare a log record for being sent to another process. The message is formatted, exception gets
+    a snapshot of its traceback, and fields that cannot be pickled are dropped.
+    """
+
+    fields = dict(record.__dict__)
+
+    fields.pop(FORWARDED_ATTRIBUTE, None)
+
+    fields['msg'] = record.getMessage()
+    fields['args'] = None
+    fields['exc_text'] = None
+
+    if record.exc_info and record.exc_info != (None, None, None):
+        exc = _portable_exception(record.exc_info)
+
+        fields['exc_info'] = (type(exc), exc, None)
+
+    else:
+        fields['exc_info'] = None
+
+    for name, value in list(iteritems(fields)):
+        if _dumps(value) is None:
+            del fields[name]
+
+    return fields
+
+
+class _Channel(object):
+    """
+    Pickled messages over a connection, usable by multiple threads.
+    """
+
+    def __init__(self, connection):
+        # type: (Connection) -> None
+
+        self.connection = connection
+
+        self._send_lock = threading.Lock()
+        self._call_lock = threading.Lock()
+
+    def send(self, *message):
+        # type: (*Any) -> None
+
+        payload = _dumps(message)
+
+        if payload is None:
+            raise GlueError("Cannot send '{}' message to the parent process, it cannot be pickled".format(
+                message[0]
+            ))
+
+        with self._send_lock:
+            self.connection.send_bytes(payload)
+
+    def call(self, *request):
+        # type: (*Any) -> Any
+        """
+        Send a request to the parent, and wait for its reply.
+        """
+
+        with self._call_lock:
+            self.send(*request)
+
+            status, value = pickle.loads(self.connection.recv_bytes())
+
+        if status == 'error':
+            raise value
+
+        return value
+
+    def shared(self, funcname, *args, **kwargs):
+        # type: (str, *Any, **Any) -> Any
+
+        return self.call('shared', funcname, args, kwargs)
+
+    def has_shared(self, funcname):
+        # type: (str) -> bool
+
+        return self.call('has-shared', funcname)  # type: ignore  # parent replies with a bool
+
+    def get_shared(self, funcname):
+        # type: (str) -> Any
+
+        if not self.has_shared(funcname):
+            return None
+
+        def _shared(*args, **kwargs):
+            # type: (*Any, **Any) -> Any
+
+            return self.shared(funcname, *args, **kwargs)
+
+        return _shared
+
+
+class _ForwardingHandler(logging.Handler):
+    """
+    Sends log records to the parent process.
+    """
+
+    def __init__(self, channel):
+        # type: (_Channel) -> None
+
+        super(_ForwardingHandler, self).__init__()
+
+        self.channel = channel
+
+    def emit(self, record):
+        # type: (logging.LogRecord) -> None
+
+        # The handler replaces handlers of several loggers, and a record may propagate through more than one
+        # of them. The parent takes care of propagation on its own.
+        if getattr(record, FORWARDED_ATTRIBUTE, False):
+            return
+
+        setattr(record, FORWARDED_ATTRIBUTE, True)
+
+        try:
+            self.channel.send('log', _serialize_record(record))
+
+        # pylint: disable=broad-except
+        except Exception:
+            self.handleError(record)
+
+
+def _forward_logging(channel):
+    # type: (_Channel) -> None
+    """
+    Replace handlers of all loggers with a handler forwarding records to the parent process.
+    """
+
+    handler = _ForwardingHandler(channel)
+
+    loggers = [logging.getLogger()] + [
+        logger for logger in logging.Logger.manager.loggerDict.values() if isinstance(logger, logging.Logger)
+    ]
+
+    for logger in loggers:
+        if logger.handlers:
+            logger.handlers = [handler]
+
+
+def _attribute_snapshot(module):
+    # type: (Module) -> Dict[str, int]
+
+    return {
+        name: id(value)
+        for name, value in iteritems(vars(module)) if name not in SKIPPED_ATTRIBUTES
+    }
+
+
+def _changed_attributes(module, snapshot):
+    # type: (Module, Dict[str, int]) -> Tuple[Dict[str, bytes], List[str]]
+    """
+    Find attributes of the module which may have changed since the snapshot was taken - those set to other values,
+    and those holding mutable values.
+
+    :returns: pickled values of changed attributes, and names of deleted attributes.
+    """
+
+    changed = {}  # type: Dict[str, bytes]
+
+    for name, value in iteritems(vars(module)):
+        if name in SKIPPED_ATTRIBUTES:
+            continue
+
+        previous_id = snapshot.get(name)
+
+        if id(value) == previous_id and isinstance(value, IMMUTABLE_TYPES):
+            continue
+
+        current = _dumps(value)
+
+        if current is None:
+            if id(value) != previous_id:
+                module.warn("Attribute '{}' cannot be pickled, it is not sent back from the worker process".format(
+                    name
+                ))
+
+            continue
+
+        changed[name] = current
+
+    deleted = [name for name in snapshot if name not in vars(module)]
+
+    return changed, deleted
+
+
+def _equal(first, second):
+    # type: (Any, Any) -> bool
+
+    try:
+        return type(first) is type(second) and bool(first == second)
+
+    # Comparing arbitrary objects may fail in many ways.
+    # pylint: disable=broad-except
+    except Exception:
+        return False
+
+
+def _check_threads(module):
+    # type: (Module) -> None
+    """
+    Warn when threads, other than the current one and those marked as safe, are alive.
+    """
+
+    current_thread = threading.current_thread()
+
+    threads = [
+        thread.name for thread in threading.enumerate()
+        if thread is not current_thread and not getattr(thread, FORK_SAFE_ATTRIBUTE, False)
+    ]
+
+    if threads:
+        module.warn('Forking worker process while other threads are running, it may deadlock: {}'.format(
+            ', '.join(sorted(threads))
+        ))
+
+
+def _run_child(module, channel):
+    # type: (Module, _Channel) -> int
+    """
+    Execute the module in the child process.
+
+    :returns: exit code of the child process.
+    """
+
+    _forward_logging(channel)
+
+    # Shared functions are provided by modules living in the parent process.
+    glue = module.glue
+
+    glue.shared = channel.shared  # type: ignore  # replacing a method on purpose
+    glue.has_shared = channel.has_shared  # type: ignore  # replacing a method on purpose
+    glue.get_shared = channel.get_shared  # type: ignore  # replacing a method on purpose
+
+    snapshot = _attribute_snapshot(module)
+
+    try:
+        module.execute()
+
+    # pylint: disable=broad-except
+    except Exception:
+        channel.send('failed', _portable_exception(sys.exc_info()))
+        return 1
+
+    changed, deleted = _changed_attributes(module, snapshot)
+
+    channel.send('finished', changed, deleted)
+
+    return 0
+
+
+def _serve_child(module, channel, pid):
+    # type: (Module, _Channel, int) -> None
+    """
+    Serve requests of the child process until it finishes executing the module.
+    """
+
+    connection = channel.connection
+
+    while True:
+        # Polling with a timeout gives the thread a chance to notice exceptions raised asynchronously,
+        # e.g. by a watchdog.
+        if not connection.poll(POLL_INTERVAL):
+            continue
+
+        try:
+            message = pickle.loads(connection.recv_bytes())
+
+        except EOFError:
+            raise GlueError('Worker process {} of module {} exited unexpectedly'.format(pid, module.unique_name))
+
+        kind = message[0]
+
+        if kind == 'log':
+            record = logging.makeLogRecord(message[1])
+
+            # pylint: disable=no-member
+            logger = logging.getLogger() if record.name == 'root' else logging.getLogger(record.name)
+
+            logger.handle(record)
+
+        elif kind in ('shared', 'has-shared'):
+            try:
+                if kind == 'shared':
+                    reply = ('result', module.glue.shared(message[1], *message[2], **message[3]))  # type: Any
+
+                else:
+                    reply = ('result', module.glue.has_shared(message[1]))
+
+            # pylint: disable=broad-except
+            except Exception:
+                reply = ('error', _portable_exception(sys.exc_info()))
+
+            payload = _dumps(reply)
+
+            if payload is None:
+                payload = _dumps(('error', GlueError(
+                    "Result of shared function '{}' cannot be pickled, it cannot be sent to the worker process".format(
+                        message[1]
+                    )
+                )))
+
+            connection.send_bytes(payload)
+
+        elif kind == 'finished':
+            changed, deleted = message[1], message[2]
+
+            for name, payload in iteritems(changed):
+                value = pickle.loads(payload)
+
+                # Keep the original object when the child did not change it.
+                if name in vars(module) and _equal(getattr(module, name), value):
+                    continue
+
+                setattr(module, name, value)
+
+            for name in deleted:
+                delattr(module, name)
+
+            return
+
+        elif kind == 'failed':
+            raise message[1]
+
+
+def _reap(pid):
+    # type: (int) -> None
+    """
+    Wait for the child process, killing it first if it is still running.
+    """
+
+    reaped_pid, _ = os.waitpid(pid, os.WNOHANG)
+
+    if reaped_pid != 0:
+        return
+
+    try:
+        os.kill(pid, signal.SIGKILL)
+
+    except OSError:
+        pass
+
+    os.waitpid(pid, 0)
+
+
+def execute_in_process(module):
+    # type: (Module) -> None
+    """
+    Run module's ``execute`` method in a child process. See the module documentation for details.
+
+    :param gluetool.glue.Module module: module to execute.
+    :raises GlueError: when the child process dies before the module finishes.
+    """
+
+    if not hasattr(os, 'fork'):
+        raise GlueError('Worker processes are not supported on this platform')
+
+    _check_threads(module)
+
+    parent_connection, child_connection = Pipe()
+
+    # Anything buffered would be written by both processes.
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    pid = os.fork()
+
+    if pid == 0:
+        parent_connection.close()
+
+        exit_code = 1
+
+        try:
+            exit_code = _run_child(module, _Channel(child_connection))
+
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+
+            finally:
+                # pylint: disable=protected-access
+                os._exit(exit_code)
+
+    child_connection.close()
+
+    module.debug('executing in worker process {}'.format(pid))
+
+    try:
+        _serve_child(module, _Channel(parent_connection), pid)
+
+    finally:
+        parent_connection.close()
+
+        _reap(pid)
@@ -0,0 +1,444 @@
+"""
+Work queue of pipelines, backed by a local SQLite database.
+
+Producers add pipeline descriptions to the queue (``gluetool --queue FILE --enqueue <pipeline>``), and consumers
+(``gluetool --queue FILE --consume --workers N``) poll the queue, claim pending jobs and run them, each job
+in its own pipeline. No external broker is needed, multiple producers and consumers can share the same database
+file, as long as it resides on a local filesystem.
+
+Jobs are claimed atomically, and a claim is a *lease*: a consumer renews leases of the jobs it is running, and
+when a consumer crashes, its leases expire, and the jobs are returned to the queue, to be claimed by another
+consumer. A job whose lease expired too many times - e.g. a job crashing every consumer running it - is not
+returned to the queue, it is marked as failed instead. Status, duration and failure of each finished job
+are recorded in the queue database.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+
+from six import iteritems
+
+from .db import Database
+from .glue import GlueError, Pipeline, PipelineStepModule
+from .log import LoggerMixin, log_dict
+
+# Type annotations
+# pylint: disable=unused-import, wrong-import-order
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set  # noqa
+
+if TYPE_CHECKING:
+    from .glue import Failure, Glue  # noqa
+    from .log import ContextAdapter  # noqa
+
+
+#: How long a job remains claimed by a consumer without the consumer renewing its claim, in seconds.
+DEFAULT_LEASE_TIMEOUT = 300
+
+#: How many times can a job be claimed before it is marked as failed instead of being returned to the queue.
+DEFAULT_MAX_ATTEMPTS = 3
+
+#: How long consumers wait before checking the queue again when there are no pending jobs, in seconds.
+DEFAULT_POLL_INTERVAL = 5
+
+#: Length of the window used to compute throughput statistics, in seconds.
+DEFAULT_STATS_WINDOW = 3600
+
+#: Job is waiting to be claimed by a consumer.
+STATUS_PENDING = 'pending'
+
+#: Job is being run by a consumer.
+STATUS_RUNNING = 'running'
+
+#: Job finished successfully.
+STATUS_DONE = 'done'
+
+#: Job finished with a failure.
+STATUS_FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    pipeline TEXT NOT NULL,
+    status TEXT NOT NULL,
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    duration REAL,
+    failure TEXT
+);
+
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+"""
+
+
+class Job(object):
+    # pylint: disable=too-few-public-methods
+    """
+    Job claimed by a consumer.
+
+    :param int job_id: ID of the job.
+    :param list(PipelineStepModule) steps: pipeline to run.
+    :param int attempts: how many times has the job been claimed, including this claim.
+    """
+
+    def __init__(self, job_id, steps, attempts):
+        # type: (int, List[PipelineStepModule], int) -> None
+
+        self.id = job_id  # pylint: disable=invalid-name
+        self.steps = steps
+        self.attempts = attempts
+
+    def __repr__(self):
+        # type: () -> str
+
+        return 'Job({}, {}, attempts={})'.format(self.id, self.steps, self.attempts)
+
+
+class WorkQueue(Database):
+    """
+    Queue of pipelines, stored in a SQLite database.
+
+    :param str path: path to the database file. It is created when it does not exist yet.
+    :param int lease_timeout: how long a job remains claimed without its lease being renewed, in seconds.
+    :param int max_attempts: how many times can a job be claimed. When its lease expires after the last attempt,
+        the job is marked as failed.
+    :param ContextAdapter logger: logger used for logging.
+    """
+
+    def __init__(self, path, lease_timeout=DEFAULT_LEASE_TIMEOUT, max_attempts=DEFAULT_MAX_ATTEMPTS, logger=None):
+        # type: (str, int, int, Optional[ContextAdapter]) -> None
+
+        super(WorkQueue, self).__init__(path, SCHEMA, logger=logger)
+
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+
+    def submit(self, steps):
+        # type: (List[PipelineStepModule]) -> int
+        """
+        Add a pipeline to the queue.
+
+        :param list(PipelineStepModule) steps: pipeline to run.
+        :returns: ID of the new job.
+        """
+
+        pipeline = json.dumps([step.serialize_to_json() for step in steps])
+
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                'INSERT INTO jobs (pipeline, status, created) VALUES (?, ?, ?)',
+                (pipeline, STATUS_PENDING, time.time())
+            )
+
+        job_id = cursor.lastrowid
+
+        self.debug('submitted job {}: {}'.format(job_id, pipeline))
+
+        return job_id
+
+    def claim(self, worker):
+        # type: (str) -> Optional[Job]
+        """
+        Claim the oldest pending job. Jobs whose leases expired are returned to the queue first, unless they
+        ran out of attempts - such jobs are marked as failed.
+
+        :param str worker: name of the claiming worker.
+        :returns: claimed job, or ``None`` when there are no pending jobs.
+        """
+
+        now = time.time()
+
+        failure = json.dumps({
+            'module': None,
+            'exception': None,
+            'message': 'Job lease expired {} times, giving up'.format(self.max_attempts),
+            'soft': False,
+            'traceback': None,
+            'sentry_event_id': None
+        })
+
+        with self._transaction() as connection:
+            abandoned = connection.execute(
+                'UPDATE jobs SET status = ?, lease_expires = NULL, finished = ?, failure = ? '
+                'WHERE status = ? AND lease_expires < ? AND attempts >= ?',
+                (STATUS_FAILED, now, failure, STATUS_RUNNING, now, self.max_attempts)
+            ).rowcount
+
+            requeued = connection.execute(
+                'UPDATE jobs SET status = ?, worker = NULL, lease_expires = NULL WHERE status = ? AND lease_expires < ?',
+                (STATUS_PENDING, STATUS_RUNNING, now)
+            ).rowcount
+
+            row = connection.execute(
+                'SELECT id, pipeline, attempts FROM jobs WHERE status = ? ORDER BY id LIMIT 1',
+                (STATUS_PENDING,)
+            ).fetchone()
+
+            if row is not None:
+                connection.execute(
+                    'UPDATE jobs SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1, started = ? '
+                    'WHERE id = ?',
+                    (STATUS_RUNNING, worker, now + self.lease_timeout, now, row[0])
+                )
+
+        if abandoned:
+            self.warn('{} jobs of crashed workers ran out of attempts, marked as failed'.format(abandoned))
+
+        if requeued:
+            self.warn('{} jobs of crashed workers returned to the queue'.format(requeued))
+
+        if row is None:
+            return None
+
+        job = Job(row[0], [
+            PipelineStepModule.unserialize_from_json(step) for step in json.loads(row[1])
+        ], row[2] + 1)
+
+        self.debug('{} claimed {}'.format(worker, job))
+
+        return job
+
+    def renew(self, job_ids):
+        # type: (List[int]) -> None
+        """
+        Extend leases of jobs.
+
+        :param list(int) job_ids: IDs of jobs whose leases should be extended.
+        """
+
+        if not job_ids:
+            return
+
+        lease_expires = time.time() + self.lease_timeout
+
+        with self._transaction() as connection:
+            connection.executemany(
+                'UPDATE jobs SET lease_expires = ? WHERE id = ? AND status = ?',
+                [(lease_expires, job_id, STATUS_RUNNING) for job_id in job_ids]
+            )
+
+    def complete(self, job, duration, failure=None):
+        # type: (Job, float, Optional[Failure]) -> None
+        """
+        Record the outcome of a job.
+
+        :param Job job: finished job.
+        :param float duration: how long did it take to run the job, in seconds.
+        :param Failure failure: if set, the job failed, and this is the failure that killed its pipeline.
+        """
+
+        with self._transaction() as connection:
+            connection.execute(
+                'UPDATE jobs SET status = ?, lease_expires = NULL, finished = ?, duration = ?, failure = ? '
+                'WHERE id = ?',
+                (
+                    STATUS_FAILED if failure else STATUS_DONE,
+                    time.time(),
+                    duration,
+                    json.dumps(failure.serialize_to_json()) if failure else None,
+                    job.id
+                )
+            )
+
+    def stats(self, window=DEFAULT_STATS_WINDOW):
+        # type: (int) -> Dict[str, Any]
+        """
+        Return statistics of the queue: number of jobs in each state, queue depth, throughput (jobs finished
+        per hour) and mean duration of jobs finished recently.
+
+        :param int window: length of the window used to compute throughput, in seconds.
+        :rtype: dict
+        """
+
+        connection = self._connection()
+
+        stats = {
+            status: 0 for status in (STATUS_PENDING, STATUS_RUNNING, STATUS_DONE, STATUS_FAILED)
+        }  # type: Dict[str, Any]
+
+        for status, count in connection.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status'):
+            stats[status] = count
+
+        finished, mean_duration = connection.execute(
+            'SELECT COUNT(*), AVG(duration) FROM jobs WHERE finished >= ?',
+            (time.time() - window,)
+        ).fetchone()
+
+        stats['depth'] = stats[STATUS_PENDING]
+        stats['throughput'] = float(finished) * 3600 / window
+        stats['mean-duration'] = mean_duration
+
+        return stats
+
+
+class Consumer(LoggerMixin, object):
+    """
+    Runs pipelines claimed from a work queue.
+
+    :param Glue glue: ``Glue`` instance running the pipelines.
+    :param WorkQueue queue: queue to consume.
+    :param int workers: number of jobs to run concurrently.
+    :param int poll_interval: how long to wait before checking the queue again when there are no pending jobs,
+        in seconds.
+    :param ContextAdapter logger: logger used for logging.
+    """
+
+    def __init__(self, glue, queue, workers=1, poll_interval=DEFAULT_POLL_INTERVAL, logger=None):
+        # type: (Glue, WorkQueue, int, int, Optional[ContextAdapter]) -> None
+
+        super(Consumer, self).__init__(logger or glue.logger)
+
+        if workers < 1:
+            raise GlueError('Number of workers must be positive')
+
+        self.glue = glue
+        self.queue = queue
+        self.workers = workers
+        self.poll_interval = poll_interval
+
+        self._stop = threading.Event()
+
+        self._running = set()  # type: Set[int]
+        self._running_lock = threading.Lock()
+
+    def stop(self):
+        # type: () -> None
+        """
+        Ask workers to stop. Jobs being run are finished first.
+        """
+
+        self._stop.set()
+
+    def _run_job(self, job, parent_stack, parent_action):
+        # type: (Job, List[Pipeline], Any) -> None
+
+        with self._running_lock:
+            self._running.add(job.id)
+
+        start = time.time()
+
+        try:
+            # pylint: disable=protected-access
+            failure, destroy_failure = self.glue._run_pipeline_in_thread(
+                Pipeline(self.glue, job.steps), parent_stack, parent_action
+            )
+
+        finally:
+            with self._running_lock:
+                self._running.discard(job.id)
+
+        duration = time.time() - start
+
+        self.queue.complete(job, duration, failure=failure or destroy_failure)
+
+        self.info('job {} {} in {:.3f} seconds'.format(
+            job.id, 'failed' if failure or destroy_failure else 'finished', duration
+        ))
+
+    def _work(self, name, exit_when_empty, parent_stack, parent_action):
+        # type: (str, bool, List[Pipeline], Any) -> None
+
+        try:
+            while not self._stop.is_set():
+                job = self.queue.claim(name)
+
+                if job is None:
+                    if exit_when_empty:
+                        return
+
+                    self._stop.wait(self.poll_interval)
+                    continue
+
+                self._run_job(job, parent_stack, parent_action)
+
+        finally:
+            self.queue.close()
+
+    def _renew_leases(self):
+        # type: () -> None
+
+        try:
+            while not self._stop.wait(float(self.queue.lease_timeout) / 3):
+                with self._running_lock:
+                    job_ids = list(self._running)
+
+                self.queue.renew(job_ids)
+
+        finally:
+            self.queue.close()
+
+    def run(self, exit_when_empty=False):
+        # type: (bool) -> None
+        """
+        Claim and run jobs until asked to stop.
+
+        :param bool exit_when_empty: if set, workers stop when there are no more pending jobs.
+        """
+
+        # Avoid circullar imports
+        # pylint: disable=cyclic-import
+        from .utils import WorkerThread
+
+        # pylint: disable=protected-access
+        parent_stack, parent_action = self.glue._thread_context()
+
+        self._stop.clear()
+
+        # Workers of all consumers sharing the queue must have unique names.
+        prefix = '{}-{}'.format(socket.gethostname(), os.getpid())
+
+        workers = [
+            WorkerThread(
+                self.logger,
+                self._work,
+                fn_args=('{}-worker-{}'.format(prefix, index), exit_when_empty, parent_stack, parent_action),
+                name='worker-{}'.format(index)
+            )
+            for index in range(self.workers)
+        ]
+
+        renewer = WorkerThread(self.logger, self._renew_leases, name='lease-renewer')
+
+        renewer.start()
+
+        for worker in workers:
+            worker.start()
+
+        try:
+            for worker in workers:
+                # Joining with a timeout lets the main thread react to signals, e.g. Ctrl+C.
+                while worker.is_alive():
+                    worker.join(1)
+
+        finally:
+            self.stop()
+
+            for worker in workers:
+                worker.join()
+
+            renewer.join()
+
+        for worker in workers:
+            if isinstance(worker.result, Exception):
+                raise GlueError('Worker {} crashed: {}'.format(worker.name, worker.result))
+
+        log_stats(self.queue, self.logger)
+
+
+def log_stats(queue, logger, window=DEFAULT_STATS_WINDOW):
+    # type: (WorkQueue, ContextAdapter, int) -> None
+    """
+    Log statistics of a queue in a human-readable form.
+    """
+
+    stats = queue.stats(window=window)
+
+    log_dict(logger.info, 'work queue statistics', {
+        name: (round(value, 3) if isinstance(value, float) else value) for name, value in iteritems(stats)
+    })